@@ -0,0 +1,260 @@
+"""Local SQLite broker shared by API and pipeline worker processes."""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from app.core import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Claim:
+    """A job leased to a worker."""
+
+    job_id: str
+    payload: dict[str, Any]
+    api_key: str
+    priority: int
+    # Earlier leases on the job that expired, i.e. workers that died running it
+    lost_leases: int
+
+
+class Broker:
+    """
+    Job queue and progress event log in one SQLite (WAL) database.
+
+    API processes enqueue jobs and relay events to their websocket clients;
+    worker processes claim jobs and publish events. Any number of processes
+    on the same node can share the database file.
+
+    A claim leases the job to a worker rather than removing it. The worker
+    renews the lease while the job runs and acknowledges the job once it has
+    finished; if the worker dies, the lease expires and the job is claimed
+    again by another worker.
+
+    Each job's OpenAI API key is kept in its own column rather than in the
+    payload: a worker needs it to run the job, including after another
+    worker died with the lease. The database is readable by its owner only,
+    and deleted rows are overwritten, so a key does not outlive its job's
+    acknowledgement on disk.
+    """
+
+    def __init__(self, db_path: str, event_retention: float = 600.0):
+        self.db_path = db_path
+        self.event_retention = event_retention
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        # SQLite creates the WAL and shared-memory files with the database file's mode
+        os.close(os.open(db_path, os.O_CREAT | os.O_RDWR, 0o600))
+        for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+            if os.path.exists(path):
+                os.chmod(path, 0o600)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA secure_delete=ON")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS queue (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL UNIQUE,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                api_key TEXT,
+                claimed_by TEXT,
+                lease_until REAL,
+                lost_leases INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_queue_order ON queue (priority DESC, seq);
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_created_at ON events (created_at);
+            """
+        )
+
+    # Job queue
+
+    def enqueue(self, job_id: str, payload: dict[str, Any], api_key: str, priority: int = 0):
+        """Add a job to the shared queue, with the API key it runs under."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO queue (job_id, priority, payload, api_key) VALUES (?, ?, ?, ?)",
+                (job_id, priority, json.dumps(payload), api_key),
+            )
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Claim | None:
+        """
+        Atomically lease the highest-priority waiting job to a worker.
+
+        Jobs whose lease has expired are waiting again. The row, including
+        the job's API key, stays on disk until the job is acknowledged.
+
+        Returns:
+            The claim, or None if no job is waiting
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT seq, job_id, payload, priority, claimed_by, lost_leases, api_key FROM queue "
+                    "WHERE lease_until IS NULL OR lease_until < ? ORDER BY priority DESC, seq LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    lost_leases = row[5] + (row[4] is not None)
+                    self._conn.execute(
+                        "UPDATE queue SET claimed_by = ?, lease_until = ?, lost_leases = ? WHERE seq = ?",
+                        (worker_id, now + lease_seconds, lost_leases, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        if row[4] is not None:
+            logger.warning(f"Reclaiming job {row[1]} from unresponsive worker {row[4]}")
+        return Claim(row[1], json.loads(row[2]), row[6], row[3], lost_leases)
+
+    def claimed(self, worker_id: str) -> list[str]:
+        """Return the IDs of the jobs leased to a worker."""
+        with self._lock:
+            rows = self._conn.execute("SELECT job_id FROM queue WHERE claimed_by = ?", (worker_id,)).fetchall()
+        return [job_id for (job_id,) in rows]
+
+    def renew(self, worker_id: str, lease_seconds: float):
+        """Extend the leases of every job held by a worker."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE queue SET lease_until = ? WHERE claimed_by = ?",
+                (time.time() + lease_seconds, worker_id),
+            )
+
+    def ack(self, job_id: str):
+        """
+        Remove a finished or failed job from the queue.
+
+        secure_delete overwrites the row, API key included, in the database
+        file; the checkpoint then truncates the WAL holding earlier copies,
+        unless another process is reading it.
+        """
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM queue WHERE job_id = ?", (job_id,))
+            if cursor.rowcount:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def release(self, worker_id: str) -> list[str]:
+        """
+        Put every job leased to a worker back in the queue, e.g. on shutdown.
+
+        Returns:
+            IDs of the released jobs
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute("SELECT job_id FROM queue WHERE claimed_by = ?", (worker_id,)).fetchall()
+                self._conn.execute(
+                    "UPDATE queue SET claimed_by = NULL, lease_until = NULL WHERE claimed_by = ?", (worker_id,)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [job_id for (job_id,) in rows]
+
+    def queued_count(self) -> int:
+        """Return the number of jobs waiting in the shared queue."""
+        with self._lock:
+            (count,) = self._conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE lease_until IS NULL OR lease_until < ?", (time.time(),)
+            ).fetchone()
+        return count
+
+    def queue_position(self, job_id: str) -> int | None:
+        """Return the 1-based position of a waiting job, or None if not waiting."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT seq, priority FROM queue WHERE job_id = ? AND (lease_until IS NULL OR lease_until < ?)",
+                (job_id, now),
+            ).fetchone()
+            if row is None:
+                return None
+            (ahead,) = self._conn.execute(
+                "SELECT COUNT(*) FROM queue WHERE (lease_until IS NULL OR lease_until < ?) "
+                "AND (priority > ? OR (priority = ? AND seq < ?))",
+                (now, row[1], row[1], row[0]),
+            ).fetchone()
+        return ahead + 1
+
+    # Progress events
+
+    def publish(self, job_id: str, data: dict[str, Any]):
+        """Append a progress event for a job."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO events (job_id, data, created_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(data, ensure_ascii=False), now),
+            )
+            if now - self._last_prune > 60:
+                self._last_prune = now
+                self._conn.execute("DELETE FROM events WHERE created_at < ?", (now - self.event_retention,))
+
+    def last_event_seq(self) -> int:
+        with self._lock:
+            (seq,) = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()
+        return seq
+
+    def events_after(self, seq: int, limit: int = 500) -> list[tuple[int, str, dict[str, Any]]]:
+        """Return up to limit events newer than seq as (seq, job_id, data)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, job_id, data FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+                (seq, limit),
+            ).fetchall()
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    async def relay_events(
+        self,
+        handler: Callable[[str, dict[str, Any], int], Awaitable[None]],
+        poll_interval: float = 0.2,
+    ):
+        """Forward events published by any process to handler(job_id, data, seq), starting from now."""
+        last_seq = await asyncio.to_thread(self.last_event_seq)
+        while True:
+            events = await asyncio.to_thread(self.events_after, last_seq)
+            for seq, job_id, data in events:
+                last_seq = seq
+                try:
+                    await handler(job_id, data, seq)
+                except Exception as e:
+                    logger.error(f"Event relay error: {e}")
+            if not events:
+                await asyncio.sleep(poll_interval)
+
+
+_broker: Broker | None = None
+
+
+def get_broker() -> Broker:
+    """Get the process-wide broker, opening the database on first use."""
+    global _broker
+    if _broker is None:
+        _broker = Broker(config.BROKER_DB_PATH)
+    return _broker
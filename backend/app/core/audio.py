@@ -0,0 +1,490 @@
+"""Audio inspection and splitting helpers using FFmpeg."""
+
+import os
+import re
+import csv
+import logging
+import subprocess
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+# ffmpeg -progress reports microseconds under either name, depending on the version
+_OUT_TIME_RE = re.compile(r"out_time_(?:us|ms)=(\d+)")
+
+
+@dataclass
+class AudioChunk:
+    path: str
+    start: float
+    end: float
+
+
+def get_duration(audio_path: str) -> float:
+    """Get audio duration in seconds using ffprobe."""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            audio_path,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip())
+
+
+def detect_silences(
+    audio_path: str,
+    noise_db: float = -35.0,
+    min_silence: float = 0.5,
+) -> list[tuple[float, float]]:
+    """Detect silent intervals as (start, end) pairs using ffmpeg silencedetect."""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+            "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+            "-f", "null", "-",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    silences = []
+    silence_start = None
+    for line in result.stderr.splitlines():
+        match = _SILENCE_START_RE.search(line)
+        if match:
+            silence_start = max(float(match.group(1)), 0.0)
+            continue
+        match = _SILENCE_END_RE.search(line)
+        if match and silence_start is not None:
+            silences.append((silence_start, float(match.group(1))))
+            silence_start = None
+    return silences
+
+
+def plan_cut_points(
+    duration: float,
+    silences: list[tuple[float, float]],
+    max_chunk_seconds: float,
+) -> list[float]:
+    """
+    Choose cut points so that no chunk exceeds max_chunk_seconds.
+
+    Each cut is placed in the middle of the latest silence that still fits the
+    budget. If a window has no silence, it is cut hard at the budget.
+
+    Returns:
+        Sorted chunk boundaries, starting with 0.0 and ending with duration
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    cuts = [0.0]
+    i = 0
+    while duration - cuts[-1] > max_chunk_seconds:
+        limit = cuts[-1] + max_chunk_seconds
+        best = None
+        while i < len(midpoints) and midpoints[i] <= limit:
+            if midpoints[i] > cuts[-1]:
+                best = midpoints[i]
+            i += 1
+        cuts.append(best if best is not None else limit)
+    cuts.append(duration)
+    return cuts
+
+
+def extract_chunk(audio_path: str, start: float, end: float, output_path: str) -> str:
+    """Copy the [start, end) range of an audio file without re-encoding."""
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{start:.3f}", "-i", audio_path,
+            "-t", f"{end - start:.3f}",
+            "-c", "copy", output_path,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return output_path
+
+
+def chunk_seconds_budget(
+    max_chunk_seconds: float, max_chunk_bytes: int, size_bytes: float, duration: float
+) -> float:
+    """
+    Return the longest chunk duration within both budgets.
+
+    The size budget is converted to seconds from the average bitrate of
+    size_bytes over duration, with headroom for bitrate variation between
+    chunks.
+    """
+    bytes_per_second = size_bytes / duration if duration > 0 else 0
+    if bytes_per_second > 0:
+        return min(max_chunk_seconds, 0.9 * max_chunk_bytes / bytes_per_second)
+    return max_chunk_seconds
+
+
+def split_on_silence(
+    audio_path: str,
+    output_dir: str,
+    max_chunk_seconds: float,
+    max_chunk_bytes: int,
+) -> list[AudioChunk]:
+    """
+    Split an audio file at silences into chunks within a duration and size budget.
+
+    Args:
+        audio_path: Path to the audio file
+        output_dir: Directory for the chunk files
+        max_chunk_seconds: Maximum chunk duration
+        max_chunk_bytes: Maximum chunk size, estimated from the average bitrate
+
+    Returns:
+        Chunks in playback order. A file that already fits the budget is
+        returned as a single chunk pointing at the original file.
+    """
+    duration = get_duration(audio_path)
+    max_chunk_seconds = chunk_seconds_budget(
+        max_chunk_seconds, max_chunk_bytes, os.path.getsize(audio_path), duration
+    )
+    if duration <= max_chunk_seconds:
+        return [AudioChunk(path=audio_path, start=0.0, end=duration)]
+
+    silences = detect_silences(audio_path)
+    cuts = plan_cut_points(duration, silences, max_chunk_seconds)
+    logger.info(f"Splitting {audio_path} into {len(cuts) - 1} chunks ({len(silences)} silences found)")
+
+    base, ext = os.path.splitext(os.path.basename(audio_path))
+    chunks = []
+    for n, (start, end) in enumerate(zip(cuts, cuts[1:])):
+        chunk_path = os.path.join(output_dir, f"{base}_part{n:03d}{ext}")
+        extract_chunk(audio_path, start, end, chunk_path)
+        chunks.append(AudioChunk(path=chunk_path, start=start, end=end))
+    return chunks
+
+
+def extract_span(parts: list[AudioChunk], start: float, end: float, output_path: str) -> str:
+    """
+    Copy the [start, end) range of consecutive segment files without re-encoding.
+
+    start and end are in the segments' shared timeline; segments outside the
+    range are skipped.
+    """
+    parts = [part for part in parts if part.end > start and part.start < end]
+    if len(parts) == 1:
+        return extract_chunk(parts[0].path, start - parts[0].start, end - parts[0].start, output_path)
+
+    list_path = f"{output_path}.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for part in parts:
+            escaped = os.path.abspath(part.path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    try:
+        subprocess.run(
+            [
+                "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "concat", "-safe", "0",
+                "-ss", f"{start - parts[0].start:.3f}", "-i", list_path,
+                "-t", f"{end - start:.3f}",
+                "-c", "copy", output_path,
+            ],
+            capture_output=True,
+            check=True,
+        )
+    finally:
+        os.remove(list_path)
+    return output_path
+
+
+class SilenceChunker:
+    """
+    Regroup fixed-length stream segments into chunks cut at silences.
+
+    ffmpeg cuts stream segments at fixed times, which can fall inside a
+    word. Each segment is scanned for silences as it arrives. Once the audio
+    since the last cut exceeds the chunk budget, it is cut like a whole file
+    in split_on_silence: in the middle of the latest silence that fits the
+    duration and size budget. The audio after the last cut is carried into
+    the next chunk.
+    """
+
+    def __init__(self, output_dir: str, max_chunk_seconds: float, max_chunk_bytes: int):
+        self.output_dir = output_dir
+        self.max_chunk_seconds = max_chunk_seconds
+        self.max_chunk_bytes = max_chunk_bytes
+        self._parts: list[AudioChunk] = []
+        self._silences: list[tuple[float, float]] = []
+        self._cut: float | None = None
+        self._bytes = 0
+        self._seconds = 0.0
+        self._count = 0
+
+    def add(self, part: AudioChunk) -> list[AudioChunk]:
+        """Take the next segment and return the chunks that are now complete."""
+        if self._cut is None:
+            self._cut = part.start
+        self._parts.append(part)
+        self._bytes += os.path.getsize(part.path)
+        self._seconds += part.end - part.start
+        self._silences += [(part.start + start, part.start + end) for start, end in detect_silences(part.path)]
+        return self._cut_chunks(final=False)
+
+    def finish(self) -> list[AudioChunk]:
+        """Return the chunks of the remaining audio after the last segment."""
+        return self._cut_chunks(final=True) if self._parts else []
+
+    def _cut_chunks(self, final: bool) -> list[AudioChunk]:
+        end = self._parts[-1].end
+        budget = chunk_seconds_budget(self.max_chunk_seconds, self.max_chunk_bytes, self._bytes, self._seconds)
+        if not final and end - self._cut <= budget:
+            return []
+
+        silences = [(start - self._cut, stop - self._cut) for start, stop in self._silences if stop > self._cut]
+        bounds = [self._cut + cut for cut in plan_cut_points(end - self._cut, silences, budget)]
+        if not final:
+            # The audio after the last cut waits for the following segments
+            bounds.pop()
+
+        chunks = []
+        ext = os.path.splitext(self._parts[0].path)[1]
+        for start, stop in zip(bounds, bounds[1:]):
+            whole = [part for part in self._parts if part.start == start and part.end == stop]
+            if whole:
+                path = whole[0].path
+            else:
+                path = extract_span(
+                    self._parts, start, stop, os.path.join(self.output_dir, f"chunk_{self._count:04d}{ext}")
+                )
+            chunks.append(AudioChunk(path=path, start=start, end=stop))
+            self._count += 1
+
+        self._cut = bounds[-1]
+        self._parts = [part for part in self._parts if part.end > self._cut]
+        self._silences = [silence for silence in self._silences if silence[1] > self._cut]
+        return chunks
+
+
+def get_codec(audio_path: str) -> str:
+    """Get the codec name of the first audio stream using ffprobe."""
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error",
+            "-select_streams", "a:0",
+            "-show_entries", "stream=codec_name",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            audio_path,
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return result.stdout.strip()
+
+
+# Encoder arguments per output codec: (ffmpeg arguments, file extension)
+_ENCODERS = {
+    "opus": (["-c:a", "libopus", "-application", "voip"], "ogg"),
+    "flac": (["-c:a", "flac", "-sample_fmt", "s16"], "flac"),
+    "mp3": (["-c:a", "libmp3lame"], "mp3"),
+}
+
+
+def encoded_extension(codec: str) -> str:
+    """Return the file extension used for a codec."""
+    if codec not in _ENCODERS:
+        raise ValueError(f"Unsupported audio codec: {codec}")
+    return _ENCODERS[codec][1]
+
+
+def _encoder_args(
+    codec: str,
+    sample_rate: int | None = None,
+    channels: int | None = None,
+    bitrate: str | None = None,
+) -> list[str]:
+    """Build ffmpeg output arguments for a codec; "copy" keeps the source stream."""
+    if codec == "copy":
+        return ["-c:a", "copy"]
+    encoded_extension(codec)
+    encoder_args = list(_ENCODERS[codec][0])
+    if sample_rate:
+        encoder_args += ["-ar", str(sample_rate)]
+    if channels:
+        encoder_args += ["-ac", str(channels)]
+    if bitrate and codec != "flac":
+        encoder_args += ["-b:a", bitrate]
+    return encoder_args
+
+
+def encode_audio(
+    input_path: str,
+    output_path: str,
+    codec: str,
+    sample_rate: int | None = None,
+    channels: int | None = None,
+    bitrate: str | None = None,
+) -> str:
+    """
+    Re-encode the audio stream of a file, optionally resampling and downmixing.
+
+    Args:
+        input_path: Source media file
+        output_path: Output file; its extension should match encoded_extension(codec)
+        codec: "opus", "flac" or "mp3"
+        sample_rate: Output sample rate in Hz, or None to keep the source rate
+        channels: Output channel count, or None to keep the source layout
+        bitrate: Target bitrate such as "24k"; ignored by lossless codecs
+
+    Returns:
+        output_path
+    """
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", input_path, "-vn", *_encoder_args(codec, sample_rate, channels, bitrate), output_path,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return output_path
+
+
+def remux_audio(input_path: str, output_path: str) -> str:
+    """Copy the audio stream into another container without re-encoding."""
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", input_path, "-vn", "-c:a", "copy", output_path,
+        ],
+        capture_output=True,
+        check=True,
+    )
+    return output_path
+
+
+def _read_segment_list(list_file, pending: str, segment_dir: str) -> tuple[list[AudioChunk], str]:
+    """Parse the complete lines appended to an ffmpeg csv segment list since the last read."""
+    pending += list_file.read()
+    *lines, pending = pending.split("\n")
+    chunks = []
+    for name, start, end in csv.reader(lines):
+        if float(end) > float(start):
+            chunks.append(AudioChunk(path=os.path.join(segment_dir, name), start=float(start), end=float(end)))
+    return chunks, pending
+
+
+def encode_segmented(
+    input_url: str,
+    output_path: str,
+    segment_dir: str,
+    segment_seconds: float,
+    codec: str,
+    sample_rate: int | None = None,
+    channels: int | None = None,
+    bitrate: str | None = None,
+    headers: dict[str, str] | None = None,
+    start: float = 0.0,
+    end: float | None = None,
+    on_segment: Callable[[AudioChunk], None] | None = None,
+    on_progress: Callable[[float], None] | None = None,
+    stop: threading.Event | None = None,
+) -> list[AudioChunk]:
+    """
+    Fetch and encode audio in one ffmpeg run, writing the full file and fixed-duration segments.
+
+    ffmpeg encodes once and the tee muxer writes both the full file and the
+    segments. A segment is reported as soon as ffmpeg closes it and lists it
+    in the segment list, while later ones are still being fetched.
+
+    Args:
+        input_url: Media URL or path for ffmpeg to read
+        output_path: Full output file
+        segment_dir: Directory for the segment files, which get output_path's extension
+        segment_seconds: Target segment duration; cuts fall on packet boundaries
+        codec: "opus", "flac", "mp3", or "copy" to keep the source stream
+        sample_rate: Output sample rate in Hz, or None to keep the source rate
+        channels: Output channel count, or None to keep the source layout
+        bitrate: Target bitrate such as "24k"; ignored by lossless codecs
+        headers: HTTP headers for fetching input_url
+        start: Input position to start from, in seconds; ffmpeg seeks there
+            without reading the audio before it
+        end: Input position to stop at, or None for the end of the input
+        on_segment: Called from this thread with each finished segment
+        on_progress: Called from this thread with the seconds encoded so far
+        stop: Terminates ffmpeg when set
+
+    Returns:
+        Segments in playback order, timed from start so the first begins at 0
+    """
+    ext = os.path.splitext(output_path)[1]
+    list_path = os.path.join(segment_dir, "segments.csv")
+    # Relative names keep the tee muxer's option syntax free of path characters
+    outputs = (
+        f"{os.path.relpath(output_path, segment_dir)}|"
+        f"[f=segment:segment_time={segment_seconds}:segment_list=segments.csv:"
+        f"segment_list_type=csv:reset_timestamps=1]part_%04d{ext}"
+    )
+    input_args = ["-headers", "".join(f"{key}: {value}\r\n" for key, value in headers.items())] if headers else []
+    if start > 0:
+        input_args += ["-ss", f"{start:.3f}"]
+    if end is not None:
+        input_args += ["-t", f"{end - start:.3f}"]
+    open(list_path, "w").close()
+
+    process = subprocess.Popen(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-y",
+            "-progress", "pipe:1",
+            *input_args, "-i", input_url,
+            "-vn", "-map", "0:a:0", *_encoder_args(codec, sample_rate, channels, bitrate),
+            "-f", "tee", outputs,
+        ],
+        cwd=segment_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    chunks: list[AudioChunk] = []
+    pending = ""
+    try:
+        with open(list_path, encoding="utf-8") as list_file:
+
+            def report_segments(finished: bool = False):
+                nonlocal pending
+                new_chunks, pending = _read_segment_list(list_file, pending, segment_dir)
+                if finished and pending:
+                    new_chunks += _read_segment_list(list_file, pending + "\n", segment_dir)[0]
+                for chunk in new_chunks:
+                    chunks.append(chunk)
+                    if on_segment:
+                        on_segment(chunk)
+
+            # -progress writes a block of key=value lines about twice a second
+            for line in process.stdout:
+                if stop is not None and stop.is_set():
+                    process.terminate()
+                    break
+                match = _OUT_TIME_RE.match(line)
+                if match and on_progress:
+                    on_progress(int(match.group(1)) / 1e6)
+                if line.startswith("progress="):
+                    report_segments()
+            stderr = process.stderr.read()
+            process.wait()
+            if stop is not None and stop.is_set():
+                raise RuntimeError("Segmented encode stopped")
+            if process.returncode != 0:
+                raise RuntimeError(f"ffmpeg failed: {stderr.strip()}")
+            report_segments(finished=True)
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+    return chunks
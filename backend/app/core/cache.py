@@ -0,0 +1,159 @@
+"""Disk-backed transcription cache keyed by audio content hash."""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+
+from app.core import transcriber
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path: str, block_size: int = 1024 * 1024) -> str:
+    """Compute the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Cache transcription results as JSON files, one per (audio hash, model).
+
+    Entries are evicted least-recently-used first once the cache grows past
+    max_bytes. A hit refreshes the entry's modification time.
+
+    An entry can also be found by a source key, built from the video and the
+    settings its audio was produced with, so a job can look it up before
+    it has the audio, e.g. before a streaming download.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, audio_path: str, model: str = transcriber.TRANSCRIPTION_MODEL) -> str:
+        """Build the cache key for an audio file and transcription model."""
+        return f"{hash_file(audio_path)}_{model}"
+
+    @staticmethod
+    def source_key(video_id: str, params: dict) -> str:
+        """Build a source key from a video ID and the parameters that determine its audio and model."""
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+        return f"{video_id}_{digest}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _source_path(self, source_key: str) -> str:
+        return os.path.join(self.cache_dir, f"{source_key}.source")
+
+    def get_by_source(self, source_key: str) -> dict | None:
+        """Return the cached transcription recorded for a source key, or None on a miss."""
+        try:
+            with open(self._source_path(source_key), encoding="utf-8") as f:
+                key = f.read().strip()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        return self.get(key)
+
+    def get(self, key: str) -> dict | None:
+        """Return the cached transcription for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            result = transcriber.load_transcription(path)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        logger.info(f"Transcription cache hit: {key}")
+        return result
+
+    def put(self, key: str, result: dict, source_key: str | None = None):
+        """Store a transcription, optionally under a source key too, and evict old entries if over budget."""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        transcriber.save_transcription(result, tmp_path)
+        os.replace(tmp_path, path)
+        if source_key:
+            source_path = self._source_path(source_key)
+            tmp_path = f"{source_path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(key)
+            os.replace(tmp_path, source_path)
+        self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        """List cache entries as (mtime, size, path)."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Delete least-recently-used entries until the cache fits max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            evicted = False
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    evicted = True
+                    logger.info(f"Transcription cache evicted: {path}")
+                except OSError:
+                    pass
+            if evicted:
+                self._remove_dangling_sources()
+
+    def _remove_dangling_sources(self):
+        """Delete source keys whose entry has been evicted."""
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".source"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    key = f.read().strip()
+                if not os.path.exists(self._path(key)):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current cache usage."""
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
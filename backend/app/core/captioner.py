@@ -1,17 +1,32 @@
-"""SRT subtitle file generation."""
+"""SRT, WebVTT and JSON-lines subtitle file generation."""
 
 import os
 import re
+import json
 import logging
+from typing import Callable, Iterable, Iterator
+
+from app.core.segments import SegmentStore
 
 logger = logging.getLogger(__name__)
 
 
+def _format_time(seconds: float, separator: str) -> str:
+    # Round to whole milliseconds first so 1.9996 becomes 00:00:02,000, not 00:00:01,1000
+    s, ms = divmod(int(round(seconds * 1000)), 1000)
+    m, s = divmod(s, 60)
+    h, m = divmod(m, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}{separator}{ms:03d}"
+
+
 def _format_srt_time(seconds: float) -> str:
     """Convert seconds to SRT time format (HH:MM:SS,ms)."""
-    m, s = divmod(seconds, 60)
-    h, m = divmod(m, 60)
-    return f"{int(h):02d}:{int(m):02d}:{int(s):02d},{int(round((s - int(s)) * 1000)):03d}"
+    return _format_time(seconds, ",")
+
+
+def _format_vtt_time(seconds: float) -> str:
+    """Convert seconds to WebVTT time format (HH:MM:SS.ms)."""
+    return _format_time(seconds, ".")
 
 
 def _split_long_line(text: str, max_length: int, has_prefix: bool) -> list[str]:
@@ -60,12 +75,12 @@ def _split_long_line(text: str, max_length: int, has_prefix: bool) -> list[str]:
 
 
 def _generate_segments_from_source(
-    segments: list[dict],
+    segments: Iterable[dict],
     max_line_length: int,
     pause_threshold: float
-) -> list[dict]:
+) -> SegmentStore:
     """Generate subtitle segments from transcription segments."""
-    final_segments = []
+    final_segments = SegmentStore()
     last_speaker_id = None
 
     for segment in segments:
@@ -107,9 +122,9 @@ def _generate_segments_from_source(
     return final_segments
 
 
-def _generate_segments_from_translation(translated_data: list[dict], max_line_length: int) -> list[dict]:
+def _generate_segments_from_translation(translated_data: Iterable[dict], max_line_length: int) -> SegmentStore:
     """Generate subtitle segments from translated data."""
-    final_segments = []
+    final_segments = SegmentStore()
     for segment in translated_data:
         start, end, text = segment['start'], segment['end'], segment['translated_text']
         lines = _split_long_line(text, max_line_length, has_prefix=True)
@@ -132,15 +147,80 @@ def _generate_segments_from_translation(translated_data: list[dict], max_line_le
     return final_segments
 
 
-def generate_srt_content(segments: list[dict]) -> str:
-    """Generate SRT content string from segments."""
-    srt_content = ""
+def iter_srt(segments: Iterable[dict]) -> Iterator[str]:
+    """Yield SRT cues one at a time."""
     for i, segment in enumerate(segments):
         start_time = _format_srt_time(segment['start'])
         end_time = _format_srt_time(segment['end'])
-        text = segment['text']
-        srt_content += f"{i + 1}\n{start_time} --> {end_time}\n{text}\n\n"
-    return srt_content
+        yield f"{i + 1}\n{start_time} --> {end_time}\n{segment['text']}\n\n"
+
+
+def iter_vtt(segments: Iterable[dict]) -> Iterator[str]:
+    """Yield a WebVTT header followed by one cue at a time."""
+    yield "WEBVTT\n\n"
+    for segment in segments:
+        start_time = _format_vtt_time(segment['start'])
+        end_time = _format_vtt_time(segment['end'])
+        yield f"{start_time} --> {end_time}\n{segment['text']}\n\n"
+
+
+def iter_jsonl(segments: Iterable[dict]) -> Iterator[str]:
+    """Yield one JSON object per cue and line."""
+    for segment in segments:
+        cue = {'start': segment['start'], 'end': segment['end'], 'text': segment['text']}
+        yield json.dumps(cue, ensure_ascii=False) + "\n"
+
+
+# Output formats: serializer, media type and file extension
+SUBTITLE_FORMATS: dict[str, tuple[Callable[[Iterable[dict]], Iterator[str]], str, str]] = {
+    'srt': (iter_srt, 'application/x-subrip', 'srt'),
+    'vtt': (iter_vtt, 'text/vtt', 'vtt'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson', 'jsonl'),
+}
+
+
+def iter_subtitle_blocks(
+    segments: Iterable[dict],
+    fmt: str = 'srt',
+    block_size: int = 64 * 1024,
+) -> Iterator[bytes]:
+    """
+    Serialize segments and yield the UTF-8 output in blocks of about block_size bytes.
+
+    Only one block is held in memory at a time, so the output can be written
+    to a file or streamed in an HTTP response without building the whole
+    document.
+    """
+    if fmt not in SUBTITLE_FORMATS:
+        raise ValueError(f"Invalid subtitle format: {fmt}")
+    serialize = SUBTITLE_FORMATS[fmt][0]
+    parts, size = [], 0
+    for cue in serialize(segments):
+        encoded = cue.encode('utf-8')
+        parts.append(encoded)
+        size += len(encoded)
+        if size >= block_size:
+            yield b"".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b"".join(parts)
+
+
+def write_subtitles(segments: Iterable[dict], filepath: str, fmt: str = 'srt'):
+    """Write segments to a subtitle file block by block."""
+    with open(filepath, 'wb') as f:
+        for block in iter_subtitle_blocks(segments, fmt):
+            f.write(block)
+
+
+def generate_srt_content(segments: Iterable[dict]) -> str:
+    """Generate SRT content string from segments."""
+    return "".join(iter_srt(segments))
+
+
+def srt_path(output_dir: str, video_id: str, lang_suffix: str) -> str:
+    """Path of the SRT file create_srt_file writes for a video and language."""
+    return os.path.join(output_dir, f"{video_id}_{lang_suffix}.srt")
 
 
 def create_srt_file(
@@ -151,14 +231,13 @@ def create_srt_file(
     output_dir: str,
     max_line_length: int,
     pause_threshold: float = 1.0,
-) -> tuple[str, list[dict]]:
+) -> tuple[str, SegmentStore]:
     """
     Create SRT subtitle file.
 
     Returns:
         Tuple of (filepath, segments)
     """
-    segments = []
     if mode == 'source':
         segments = _generate_segments_from_source(
             data.get('segments', []),
@@ -170,14 +249,10 @@ def create_srt_file(
     else:
         raise ValueError(f"Invalid mode: {mode}")
 
-    srt_content = generate_srt_content(segments)
-
     lang_suffix = lang_code if mode == 'translated' else data.get('language_code', 'source')
-    filename = f"{video_id}_{lang_suffix}.srt"
-    filepath = os.path.join(output_dir, filename)
+    filepath = srt_path(output_dir, video_id, lang_suffix)
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(srt_content)
+    write_subtitles(segments, filepath, 'srt')
     logger.info(f"SRT file created: {filepath}")
 
     return filepath, segments
@@ -0,0 +1,173 @@
+"""Shared, pooled OpenAI clients keyed by API key."""
+
+import time
+import asyncio
+import hashlib
+import logging
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.core import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    client: AsyncOpenAI
+    last_used: float = field(default_factory=time.monotonic)
+    active: int = 0
+
+
+class ClientRegistry:
+    """
+    Keep one long-lived AsyncOpenAI client per API key.
+
+    Each client owns a keep-alive connection pool, so jobs using the same key
+    reuse connections and TLS sessions. At most max_clients are kept, evicting
+    the least recently used; clients idle for idle_timeout seconds are closed
+    by a background reaper (see start_reaper) or on the next release.
+    Clients leased by a running job are never closed.
+    """
+
+    def __init__(
+        self,
+        max_clients: int = 64,
+        idle_timeout: float = 300.0,
+        max_connections: int = 32,
+        keepalive_expiry: float = 60.0,
+    ):
+        self.max_clients = max_clients
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._seen_streams: weakref.WeakSet = weakref.WeakSet()
+        self._last_cleanup = time.monotonic()
+        self._reaper: asyncio.Task | None = None
+        self.clients_created = 0
+        self.clients_closed = 0
+        self.requests = 0
+        self.connections_opened = 0
+
+    @staticmethod
+    def _key_hash(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode()).hexdigest()
+
+    async def _on_response(self, response: httpx.Response):
+        """Count requests and detect whether they opened a new connection."""
+        self.requests += 1
+        stream = response.extensions.get("network_stream")
+        if stream is not None and stream not in self._seen_streams:
+            self._seen_streams.add(stream)
+            self.connections_opened += 1
+
+    def _create_client(self, api_key: str) -> AsyncOpenAI:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            event_hooks={"response": [self._on_response]},
+        )
+        self.clients_created += 1
+        # Retries are handled by the shared rate limiter
+        return AsyncOpenAI(api_key=api_key, max_retries=0, http_client=http_client)
+
+    @asynccontextmanager
+    async def lease(self, api_key: str) -> AsyncIterator[AsyncOpenAI]:
+        """Borrow the shared client for an API key for the duration of a block."""
+        key = self._key_hash(api_key)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(client=self._create_client(api_key))
+        self._entries.move_to_end(key)
+        entry.active += 1
+        try:
+            yield entry.client
+        finally:
+            entry.active -= 1
+            entry.last_used = time.monotonic()
+            await self._maybe_cleanup()
+
+    async def _maybe_cleanup(self):
+        """Close idle and excess clients, at most once every few seconds."""
+        now = time.monotonic()
+        if len(self._entries) <= self.max_clients and now - self._last_cleanup < 5.0:
+            return
+        self._last_cleanup = now
+        await self.cleanup()
+
+    async def cleanup(self):
+        """Close clients idle past idle_timeout and evict LRU clients beyond max_clients."""
+        now = time.monotonic()
+        excess = len(self._entries) - self.max_clients
+        to_close = []
+        for key, entry in list(self._entries.items()):
+            if entry.active:
+                continue
+            if excess > 0 or now - entry.last_used > self.idle_timeout:
+                to_close.append(self._entries.pop(key).client)
+                excess -= 1
+        for client in to_close:
+            await client.close()
+            self.clients_closed += 1
+        if to_close:
+            logger.info(f"Closed {len(to_close)} idle OpenAI clients")
+
+    def start_reaper(self, interval: float | None = None):
+        """
+        Close idle clients periodically in the background, e.g. from application startup.
+
+        Without it idle clients are only closed when another client is
+        released, so a process that goes quiet would keep their connections
+        open. Stopped by close_all().
+        """
+        if self._reaper is None or self._reaper.done():
+            interval = interval or max(1.0, min(60.0, self.idle_timeout / 2))
+            self._reaper = asyncio.create_task(self._reap(interval))
+
+    async def _reap(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.cleanup()
+            except Exception as e:
+                logger.warning(f"Closing idle OpenAI clients failed: {e}")
+
+    async def close_all(self):
+        """Stop the reaper and close every client, e.g. on shutdown."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            await asyncio.gather(self._reaper, return_exceptions=True)
+            self._reaper = None
+        entries = list(self._entries.values())
+        self._entries.clear()
+        await asyncio.gather(*(entry.client.close() for entry in entries))
+        self.clients_closed += len(entries)
+
+    def stats(self) -> dict:
+        """Return client pool and connection reuse statistics."""
+        reused = self.requests - self.connections_opened
+        return {
+            "clients": len(self._entries),
+            "clients_created": self.clients_created,
+            "clients_closed": self.clients_closed,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "connection_reuse_rate": reused / self.requests if self.requests else 0.0,
+        }
+
+
+registry = ClientRegistry(
+    max_clients=config.OPENAI_MAX_CLIENTS,
+    idle_timeout=config.OPENAI_CLIENT_IDLE_TIMEOUT,
+    max_connections=config.OPENAI_MAX_CONNECTIONS,
+)
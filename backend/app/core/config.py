@@ -1,4 +1,6 @@
-"""Language configuration and utilities."""
+"""Language and pipeline configuration."""
+
+import os
 
 SUPPORTED_LANGUAGES = {
     'ko': 'Korean',
@@ -40,3 +42,86 @@ def get_language_name(code: str) -> str | None:
 def get_supported_codes() -> list[str]:
     """Get list of supported language codes."""
     return list(SUPPORTED_LANGUAGES.keys())
+
+
+# Storage and job store (overridable via environment variables)
+STORAGE_DIR = os.getenv(
+    "STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "storage"),
+)
+JOB_STORE = os.getenv("JOB_STORE", "sqlite")  # sqlite, memory
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(STORAGE_DIR, "jobs.db"))
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Pipeline tuning (overridable via environment variables)
+TRANSLATION_MAX_CONCURRENCY = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "4"))
+TRANSCRIPTION_SPLIT_ON_SILENCE = os.getenv("TRANSCRIPTION_SPLIT_ON_SILENCE", "1") == "1"
+TRANSCRIPTION_MAX_CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_MAX_CHUNK_SECONDS", "600"))
+TRANSCRIPTION_MAX_CHUNK_MB = float(os.getenv("TRANSCRIPTION_MAX_CHUNK_MB", "24"))
+TRANSCRIPTION_MAX_CONCURRENCY = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", "4"))
+TRANSCRIPTION_CACHE_MAX_MB = float(os.getenv("TRANSCRIPTION_CACHE_MAX_MB", "512"))
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "200000"))
+TRANSLATION_CHUNK_TOKENS = int(os.getenv("TRANSLATION_CHUNK_TOKENS", "100"))
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "8"))
+OPENAI_MAX_CLIENTS = int(os.getenv("OPENAI_MAX_CLIENTS", "64"))
+OPENAI_CLIENT_IDLE_TIMEOUT = float(os.getenv("OPENAI_CLIENT_IDLE_TIMEOUT", "300"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "32"))
+
+# Job scheduler: worker counts per stage and queue limits
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "4"))
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "4"))
+CAPTION_WORKERS = int(os.getenv("CAPTION_WORKERS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "100"))
+STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", "20"))
+QUEUE_RETRY_AFTER = int(os.getenv("QUEUE_RETRY_AFTER", "30"))
+
+# Process layout: "inline" runs the pipeline inside the API process; "api" only
+# enqueues jobs to the local broker, which "worker" processes (python -m app.worker) consume
+RUN_MODE = os.getenv("RUN_MODE", "inline")  # inline, api, worker
+BROKER_DB_PATH = os.getenv("BROKER_DB_PATH", os.path.join(STORAGE_DIR, "broker.db"))
+BROKER_POLL_INTERVAL = float(os.getenv("BROKER_POLL_INTERVAL", "0.2"))
+# Workers renew their job leases every third of BROKER_LEASE_SECONDS; a job whose
+# worker stopped renewing is run again, and failed after BROKER_MAX_LOST_LEASES
+BROKER_LEASE_SECONDS = float(os.getenv("BROKER_LEASE_SECONDS", "60"))
+BROKER_MAX_LOST_LEASES = int(os.getenv("BROKER_MAX_LOST_LEASES", "3"))
+
+# Maximum progress updates per second sent to clients for one job
+PROGRESS_MAX_RATE = float(os.getenv("PROGRESS_MAX_RATE", "4"))
+
+# WebSocket delivery: per-send timeout, outbound queue per client, and
+# consecutive send timeouts before a slow client is evicted
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "32"))
+WS_MAX_SEND_TIMEOUTS = int(os.getenv("WS_MAX_SEND_TIMEOUTS", "3"))
+
+# Event replay: events kept per job and jobs kept, and the SSE keep-alive interval
+EVENT_LOG_MAX_EVENTS = int(os.getenv("EVENT_LOG_MAX_EVENTS", "100"))
+EVENT_LOG_MAX_JOBS = int(os.getenv("EVENT_LOG_MAX_JOBS", "1000"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Smallest JSON response body compressed with brotli/gzip
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+
+# Number of per-track segment indexes kept for the segments query API
+SEGMENT_INDEX_CACHE_SIZE = int(os.getenv("SEGMENT_INDEX_CACHE_SIZE", "64"))
+
+# Audio extraction: "speech" converts to small mono audio for transcription,
+# "mp3" keeps the previous 192 kbps stereo MP3
+AUDIO_PROFILE = os.getenv("AUDIO_PROFILE", "speech")  # speech, mp3
+SPEECH_AUDIO_CODEC = os.getenv("SPEECH_AUDIO_CODEC", "opus")  # opus, flac, copy
+SPEECH_SAMPLE_RATE = int(os.getenv("SPEECH_SAMPLE_RATE", "16000"))
+SPEECH_AUDIO_BITRATE = os.getenv("SPEECH_AUDIO_BITRATE", "24k")
+
+# Streaming ingest (opt-in): ffmpeg fetches the audio in STREAMING_PART_SECONDS parts,
+# which are regrouped into chunks of up to STREAMING_SEGMENT_SECONDS cut at silences
+# and transcribed while the download continues
+STREAMING_INGEST = os.getenv("STREAMING_INGEST", "0") == "1"
+STREAMING_SEGMENT_SECONDS = float(os.getenv("STREAMING_SEGMENT_SECONDS", "300"))
+STREAMING_PART_SECONDS = float(os.getenv("STREAMING_PART_SECONDS", "30"))
+
+# Storage manager: disk quota for indexed artifacts (0 = unlimited), and how
+# long a job's pins protect its files before they count as stale
+STORAGE_QUOTA_MB = float(os.getenv("STORAGE_QUOTA_MB", "0"))
+STORAGE_INDEX_PATH = os.getenv("STORAGE_INDEX_PATH", os.path.join(STORAGE_DIR, "_cache", "storage.db"))
+STORAGE_PIN_TTL_SECONDS = float(os.getenv("STORAGE_PIN_TTL_SECONDS", str(6 * 3600)))
@@ -2,9 +2,16 @@
 
 import os
 import re
+import time
 import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable
 import yt_dlp
 
+from app.core import audio
+from app.core.audio import AudioChunk
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,31 +43,323 @@ def fetch_video_info(youtube_url: str) -> dict:
         raise ValueError(f"Failed to fetch video info: {e}")
 
 
-def download_youtube_audio(youtube_url: str, output_path: str, video_id: str) -> str:
-    """Download audio from YouTube and convert to mp3."""
+def _progress_hook(progress_callback: Callable[[int, str], None]) -> Callable[[dict], None]:
+    """Adapt yt-dlp progress reports to a (progress%, message) callback."""
+    def hook(status: dict):
+        if status.get("status") != "downloading":
+            return
+        total = status.get("total_bytes") or status.get("total_bytes_estimate")
+        if not total:
+            return
+        downloaded = status.get("downloaded_bytes", 0)
+        progress_callback(
+            min(100, int(downloaded * 100 / total)),
+            f"Downloading audio... {downloaded / 1e6:.1f}/{total / 1e6:.1f} MB",
+        )
+    return hook
+
+
+# Size of the 192 kbps MP3 the downloader used to produce, for bytes_saved
+LEGACY_MP3_BYTES_PER_SECOND = 192_000 / 8
+
+
+@dataclass
+class AudioDownload:
+    """Downloaded audio file with size and timing figures."""
+
+    path: str
+    codec: str
+    duration: float
+    source_bytes: int
+    audio_bytes: int
+    download_seconds: float
+    transcode_seconds: float
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes saved compared with a 192 kbps MP3 of the same duration."""
+        return max(0, int(self.duration * LEGACY_MP3_BYTES_PER_SECOND) - self.audio_bytes)
+
+    @classmethod
+    def from_stats(cls, path: str, stats: dict) -> "AudioDownload":
+        """Rebuild a download from the stats() of an earlier one, e.g. for a stored file."""
+        return cls(
+            path,
+            stats["codec"],
+            stats["duration"],
+            stats["source_bytes"],
+            stats["audio_bytes"],
+            stats["download_seconds"],
+            stats["transcode_seconds"],
+        )
+
+    def stats(self) -> dict:
+        return {
+            "codec": self.codec,
+            "duration": self.duration,
+            "source_bytes": self.source_bytes,
+            "audio_bytes": self.audio_bytes,
+            "bytes_saved": self.bytes_saved,
+            "download_seconds": round(self.download_seconds, 3),
+            "transcode_seconds": round(self.transcode_seconds, 3),
+        }
+
+
+def _audio_format(profile: str) -> str:
+    if profile not in ("speech", "mp3"):
+        raise ValueError(f"Invalid audio profile: {profile}")
+    # Prefer an Opus source so the "copy" codec can keep it
+    return 'bestaudio[acodec=opus]/bestaudio/best' if profile == "speech" else 'bestaudio/best'
+
+
+def audio_filename(video_id: str, profile: str = "speech", codec: str = "opus") -> str:
+    """File name download_audio and stream_audio write for a profile and codec."""
+    if profile == "mp3":
+        return f"{video_id}.mp3"
+    # "copy" keeps an Opus source, and encodes anything else to Opus
+    return f"{video_id}.{audio.encoded_extension('opus' if codec == 'copy' else codec)}"
+
+
+def section_duration(duration: float, section: tuple[float, float | None] | None) -> float:
+    """Length of the part of a duration-long video covered by a (start, end) section."""
+    if section is None:
+        return duration
+    start, end = section
+    if end is None or (duration and end > duration):
+        end = duration
+    return max(0.0, end - start)
+
+
+def download_audio(
+    youtube_url: str,
+    output_path: str,
+    video_id: str,
+    profile: str = "speech",
+    codec: str = "opus",
+    sample_rate: int = 16000,
+    bitrate: str = "24k",
+    section: tuple[float, float | None] | None = None,
+    progress_callback: Callable[[int, str], None] | None = None,
+) -> AudioDownload:
+    """
+    Download the audio track and convert it for transcription.
+
+    Args:
+        youtube_url: YouTube video URL
+        output_path: Directory for the audio file
+        video_id: File name for the audio, normally the YouTube video ID
+        profile: "speech" for small mono audio at sample_rate, or "mp3" for
+            192 kbps stereo MP3
+        codec: Speech profile codec: "opus", "flac", or "copy" to remux an
+            Opus source without re-encoding (other sources are encoded to Opus)
+        sample_rate: Speech profile sample rate in Hz
+        bitrate: Speech profile bitrate for Opus
+        section: Optional (start, end) in seconds to download only that part
+            of the video; end None means the end of the video. The audio
+            then starts at 0 at the section start
+        progress_callback: Optional callback for download progress (progress%, message)
+
+    Returns:
+        AudioDownload describing the converted file
+    """
     ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': os.path.join(output_path, f'{video_id}.%(ext)s'),
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192'
-        }],
+        'format': _audio_format(profile),
+        'outtmpl': os.path.join(output_path, f'{video_id}.source.%(ext)s'),
         'quiet': True,
         'no_warnings': True,
     }
+    if section:
+        # yt-dlp fetches only the requested range, cutting with ffmpeg
+        start, end = section
+        ydl_opts['download_ranges'] = yt_dlp.utils.download_range_func(
+            None, [(start, float('inf') if end is None else end)]
+        )
+        ydl_opts['force_keyframes_at_cuts'] = True
+    if progress_callback:
+        ydl_opts['progress_hooks'] = [_progress_hook(progress_callback)]
+
     try:
+        started = time.perf_counter()
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             logger.info("Starting audio download...")
-            ydl.download([youtube_url])
-            filepath = os.path.join(output_path, f"{video_id}.mp3")
-            if os.path.exists(filepath):
-                logger.info(f"Audio download complete: {filepath}")
-                return filepath
-            raise ValueError("Audio file not found after download")
+            info = ydl.extract_info(youtube_url, download=True)
+            source_path = info['requested_downloads'][0]['filepath']
+        download_seconds = time.perf_counter() - started
+    except Exception as e:
+        raise ValueError(f"Audio download failed: {e}")
+
+    try:
+        started = time.perf_counter()
+        source_codec = audio.get_codec(source_path)
+        if profile == "mp3":
+            codec = "mp3"
+            filepath = os.path.join(output_path, audio_filename(video_id, profile))
+            audio.encode_audio(source_path, filepath, "mp3", bitrate="192k")
+        elif codec == "copy" and source_codec == "opus":
+            codec = "opus"
+            filepath = os.path.join(output_path, audio_filename(video_id, profile, "copy"))
+            audio.remux_audio(source_path, filepath)
+        else:
+            codec = "opus" if codec == "copy" else codec
+            filepath = os.path.join(output_path, audio_filename(video_id, profile, codec))
+            audio.encode_audio(source_path, filepath, codec, sample_rate=sample_rate, channels=1, bitrate=bitrate)
+        transcode_seconds = time.perf_counter() - started
+        duration = audio.get_duration(filepath)
     except Exception as e:
+        raise ValueError(f"Audio conversion failed: {e}")
+
+    source_bytes = os.path.getsize(source_path)
+    os.remove(source_path)
+    result = AudioDownload(
+        path=filepath,
+        codec=codec,
+        duration=duration,
+        source_bytes=source_bytes,
+        audio_bytes=os.path.getsize(filepath),
+        download_seconds=download_seconds,
+        transcode_seconds=transcode_seconds,
+    )
+    logger.info(
+        f"Audio ready: {filepath} ({source_codec} -> {codec}, {result.audio_bytes} bytes, "
+        f"download {download_seconds:.1f}s, transcode {transcode_seconds:.1f}s)"
+    )
+    return result
+
+
+def resolve_audio_stream(youtube_url: str, profile: str = "speech") -> dict:
+    """
+    Resolve the media URL of the audio format download_audio would pick, without downloading.
+
+    Returns:
+        Dict with url, http_headers, acodec, duration and filesize (0 if unknown)
+    """
+    ydl_opts = {'format': _audio_format(profile), 'quiet': True, 'no_warnings': True}
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(youtube_url, download=False)
+    except Exception as e:
+        raise ValueError(f"Failed to resolve audio stream: {e}")
+    if not info.get('url'):
+        raise ValueError("No single audio stream to fetch")
+    return {
+        'url': info['url'],
+        'http_headers': info.get('http_headers') or {},
+        'acodec': info.get('acodec') or "",
+        'duration': float(info.get('duration') or 0),
+        'filesize': info.get('filesize') or info.get('filesize_approx') or 0,
+    }
+
+
+def stream_audio(
+    stream: dict,
+    output_path: str,
+    video_id: str,
+    segment_dir: str,
+    segment_seconds: float = 300.0,
+    profile: str = "speech",
+    codec: str = "opus",
+    sample_rate: int = 16000,
+    bitrate: str = "24k",
+    section: tuple[float, float | None] | None = None,
+    on_segment: Callable[[AudioChunk], None] | None = None,
+    progress_callback: Callable[[int, str], None] | None = None,
+    stop: threading.Event | None = None,
+) -> AudioDownload:
+    """
+    Fetch and convert audio like download_audio, handing out fixed-duration segments as they finish.
+
+    ffmpeg reads the resolved stream directly, so segments become available
+    while the rest of the audio is still downloading.
+
+    Args:
+        stream: Audio stream from resolve_audio_stream
+        output_path: Directory for the audio file
+        video_id: File name for the audio, normally the YouTube video ID
+        segment_dir: Directory for the segment files, inside output_path
+        segment_seconds: Segment duration
+        profile, codec, sample_rate, bitrate, section: As for download_audio;
+            ffmpeg seeks to the section start and reads nothing past its end
+        on_segment: Called from this thread with each finished segment
+        progress_callback: Optional callback for download progress (progress%, message)
+        stop: Stops the download when set
+
+    Returns:
+        AudioDownload describing the converted file; transcoding happens
+        during the download, so transcode_seconds is 0
+    """
+    _audio_format(profile)
+    if profile == "mp3":
+        codec, encode_codec, options = "mp3", "mp3", {"bitrate": "192k"}
+    elif codec == "copy" and stream['acodec'] == "opus":
+        codec, encode_codec, options = "opus", "copy", {}
+    else:
+        codec = "opus" if codec == "copy" else codec
+        encode_codec, options = codec, {"sample_rate": sample_rate, "channels": 1, "bitrate": bitrate}
+    filepath = os.path.join(output_path, audio_filename(video_id, profile, codec))
+
+    duration = section_duration(stream['duration'], section)
+    start, end = section or (0.0, None)
+    source_bytes = int(stream['filesize'] * duration / stream['duration']) if stream['duration'] else 0
+
+    def on_progress(seconds: float):
+        if progress_callback and duration > 0:
+            progress_callback(
+                min(100, int(seconds * 100 / duration)),
+                f"Downloading audio... {seconds / 60:.1f}/{duration / 60:.1f} min",
+            )
+
+    try:
+        started = time.perf_counter()
+        logger.info(f"Starting streaming audio download ({segment_seconds:.0f}s segments)...")
+        audio.encode_segmented(
+            stream['url'],
+            filepath,
+            segment_dir,
+            segment_seconds,
+            encode_codec,
+            headers=stream['http_headers'],
+            start=start,
+            end=end,
+            on_segment=on_segment,
+            on_progress=on_progress,
+            stop=stop,
+            **options,
+        )
+        download_seconds = time.perf_counter() - started
+        duration = audio.get_duration(filepath)
+    except Exception as e:
+        # Do not leave a truncated file that looks like a finished download
+        if os.path.exists(filepath):
+            os.remove(filepath)
         raise ValueError(f"Audio download failed: {e}")
 
+    result = AudioDownload(
+        path=filepath,
+        codec=codec,
+        duration=duration,
+        source_bytes=source_bytes,
+        audio_bytes=os.path.getsize(filepath),
+        download_seconds=download_seconds,
+        transcode_seconds=0.0,
+    )
+    logger.info(
+        f"Audio ready: {filepath} ({stream['acodec']} -> {codec}, {result.audio_bytes} bytes, "
+        f"streamed in {download_seconds:.1f}s)"
+    )
+    return result
+
+
+def download_youtube_audio(
+    youtube_url: str,
+    output_path: str,
+    video_id: str,
+    progress_callback: Callable[[int, str], None] | None = None,
+) -> str:
+    """Download audio from YouTube and convert to mp3."""
+    return download_audio(
+        youtube_url, output_path, video_id, profile="mp3", progress_callback=progress_callback
+    ).path
+
 
 def download_youtube_video(youtube_url: str, output_path: str, video_id: str, quality: str = 'high') -> str:
     """Download video from YouTube."""
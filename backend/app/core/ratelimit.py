@@ -0,0 +1,257 @@
+"""Shared rate limiting and retry for OpenAI API calls."""
+
+import re
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Awaitable, Callable, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Unknown until the first response headers arrive
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 200_000
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: str | None) -> float | None:
+    """Parse an OpenAI reset header such as "6m0s", "1.5s" or "20ms" into seconds."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity per minute. The level may go negative."""
+
+    def __init__(self, capacity: float):
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        """Take amount and return how long to wait until the bucket is out of debt."""
+        self.refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self.rate) if self.rate > 0 else 0.0
+
+
+class RateLimiter:
+    """
+    Pace requests for one API key with request and token buckets.
+
+    Capacities start from defaults and adapt to the x-ratelimit-* response
+    headers. A 429 pauses every caller sharing the key until the server's
+    Retry-After has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve capacity for one request and return the delay before sending it."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(
+                self.requests.take(1, now),
+                self.tokens.take(tokens, now),
+                self.paused_until - now,
+            )
+            return max(0.0, delay)
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until a request of the given token size may be sent."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            logger.debug(f"Rate limiter delaying request by {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def update_from_headers(self, headers):
+        """Adapt bucket capacities and levels to x-ratelimit-* response headers."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                limit = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                try:
+                    if limit is not None:
+                        bucket.refill(now)
+                        bucket.capacity = float(limit)
+                    if remaining is not None:
+                        bucket.refill(now)
+                        bucket.level = min(bucket.level, float(remaining))
+                except ValueError:
+                    continue
+
+    def pause(self, seconds: float):
+        """Hold back every caller of this key for the given time."""
+        with self._lock:
+            self.throttled += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests_per_minute": self.requests.capacity,
+                "tokens_per_minute": self.tokens.capacity,
+                "throttled": self.throttled,
+            }
+
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def stats() -> dict:
+    """Return rate limiter statistics across all API keys."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {
+        "keys": len(limiters),
+        "throttled": sum(limiter.stats()["throttled"] for limiter in limiters),
+    }
+
+
+def _key_hash(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def get_limiter(api_key: str) -> RateLimiter:
+    """Get the shared rate limiter for an API key."""
+    key = _key_hash(api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter()
+        return limiter
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Read the server-requested wait from an API error's response headers."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    retry_after = parse_reset_duration(headers.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+
+    resets = [parse_reset_duration(headers.get(f"x-ratelimit-reset-{kind}")) for kind in ("requests", "tokens")]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def _is_retryable(error: Exception) -> bool:
+    # An exhausted quota or rejected key will not recover by waiting
+    if is_key_error(error):
+        return False
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def is_key_error(error: BaseException) -> bool:
+    """
+    Check whether an error, or one it was raised from, is specific to the API key used.
+
+    True for an invalid or unauthorized key and for an exhausted quota; a
+    different key may succeed where this one failed.
+    """
+    while error is not None:
+        if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+            return True
+        if isinstance(error, openai.RateLimitError) and getattr(error, "code", None) == "insufficient_quota":
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+async def call_with_retry(
+    api_key: str,
+    fn: Callable[[], Awaitable[T]],
+    tokens: int = 0,
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+) -> T:
+    """
+    Await fn() under the API key's rate limiter, retrying 429/5xx and connection errors.
+
+    A 429 for an exhausted quota is raised at once, without pausing the key.
+
+    fn should return a raw response (``with_raw_response``) so that its
+    rate-limit headers can be read. Retries back off exponentially with full
+    jitter, or wait for the server's Retry-After when given.
+
+    Args:
+        api_key: OpenAI API key whose limiter paces the call
+        fn: Function performing the request
+        tokens: Estimated tokens the request will consume
+        max_retries: Retries before the last error is raised
+
+    Returns:
+        The value fn's awaitable resolves to
+    """
+    limiter = get_limiter(api_key)
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(tokens)
+        try:
+            response = await fn()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            retry_after = _retry_after(e)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if isinstance(e, openai.RateLimitError):
+                limiter.pause(delay)
+            logger.warning(f"OpenAI request failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            continue
+
+        headers = getattr(response, "headers", None)
+        if headers is not None:
+            limiter.update_from_headers(headers)
+        return response
+    raise RuntimeError("unreachable")
@@ -0,0 +1,80 @@
+"""Sorted index over subtitle segments for time-range queries."""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterable
+
+from app.core.segments import SegmentStore
+
+
+class SegmentIndex:
+    """
+    Segments sorted by start time in a SegmentStore, with a max tree over their end times.
+
+    A query for the window [start, end) takes the segments starting before
+    end with one binary search, then walks the max tree to the next of them
+    that ends after start. Segments that end before the window are skipped
+    a subtree at a time, so a cue spanning much of the video does not make
+    a query scan everything before it. A lookup costs O((k + 1) log n) for
+    k results.
+    """
+
+    def __init__(self, segments: Iterable[dict]):
+        self.segments = SegmentStore.from_dicts(sorted(segments, key=lambda segment: segment["start"]))
+        self.starts = self.segments.starts
+        # Leaves hold the end times, each inner node the max of its children
+        self._size = 1
+        while self._size < len(self.segments):
+            self._size *= 2
+        self._max_ends = array("d", [float("-inf")]) * (2 * self._size)
+        self._max_ends[self._size:self._size + len(self.segments)] = self.segments.ends
+        for node in range(self._size - 1, 0, -1):
+            self._max_ends[node] = max(self._max_ends[2 * node], self._max_ends[2 * node + 1])
+
+    def __len__(self) -> int:
+        return len(self.segments)
+
+    def _next_ending_after(
+        self, time: float, lo: int, hi: int, node: int = 1, node_lo: int = 0, node_hi: int | None = None
+    ) -> int | None:
+        """Return the first position in [lo, hi) whose segment ends after time, or None."""
+        if node_hi is None:
+            node_hi = self._size
+        if node_hi <= lo or hi <= node_lo or self._max_ends[node] <= time:
+            return None
+        if node_hi - node_lo == 1:
+            return node_lo
+        mid = (node_lo + node_hi) // 2
+        found = self._next_ending_after(time, lo, hi, 2 * node, node_lo, mid)
+        if found is None:
+            found = self._next_ending_after(time, lo, hi, 2 * node + 1, mid, node_hi)
+        return found
+
+    def query(
+        self,
+        start: float = 0.0,
+        end: float = float("inf"),
+        limit: int = 100,
+        cursor: int = 0,
+    ) -> tuple[list[tuple[int, dict]], int | None]:
+        """
+        Find segments overlapping [start, end).
+
+        Args:
+            start: Window start in seconds
+            end: Window end in seconds
+            limit: Maximum segments to return
+            cursor: Position to continue from, as returned by a previous query
+
+        Returns:
+            Tuple of ([(position, segment), ...], next cursor or None when done)
+        """
+        hi = bisect_left(self.starts, end)
+        found = []
+        position = self._next_ending_after(start, cursor, hi)
+        while position is not None:
+            if len(found) == limit:
+                return found, position
+            found.append((position, self.segments[position]))
+            position = self._next_ending_after(start, position + 1, hi)
+        return found, None
@@ -0,0 +1,142 @@
+"""Compact columnar storage for subtitle and transcription segments."""
+
+from array import array
+from collections.abc import Sequence
+from typing import Any, Iterable, Iterator
+
+NO_SPEAKER = -1
+
+
+class TextPool:
+    """Intern strings so that repeated texts are stored once and referenced by id."""
+
+    def __init__(self):
+        self._texts: list[str] = []
+        self._ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, text: str) -> int:
+        text_id = self._ids.get(text)
+        if text_id is None:
+            text_id = self._ids[text] = len(self._texts)
+            self._texts.append(text)
+        return text_id
+
+    def get(self, text_id: int) -> str:
+        return self._texts[text_id]
+
+    def nbytes(self) -> int:
+        return sum(len(text.encode("utf-8")) for text in self._texts)
+
+
+class SegmentStore(Sequence):
+    """
+    Segments stored as typed columns instead of one dict per segment.
+
+    start and end are float64 arrays, speaker_id an int32 array and each
+    text field an array of ids into a shared TextPool. Indexing and
+    iteration build plain dicts on the fly, so the store can be used
+    wherever a list of segment dicts is read; to_dicts() converts it for
+    JSON encoding.
+    """
+
+    def __init__(
+        self,
+        text_fields: tuple[str, ...] = ("text",),
+        with_speaker: bool = False,
+        pool: TextPool | None = None,
+    ):
+        self.text_fields = text_fields
+        self.with_speaker = with_speaker
+        self.pool = pool or TextPool()
+        self.starts = array("d")
+        self.ends = array("d")
+        self.speakers = array("i")
+        self._texts = {name: array("I") for name in text_fields}
+
+    @classmethod
+    def from_dicts(cls, segments: Iterable[dict], pool: TextPool | None = None) -> "SegmentStore":
+        """
+        Build a store from segment dicts, taking the fields from the first segment.
+
+        A store passed in is returned unchanged.
+        """
+        if isinstance(segments, SegmentStore):
+            return segments
+        segments = iter(segments)
+        first = next(segments, None)
+        if first is None:
+            return cls(pool=pool)
+        text_fields = tuple(key for key, value in first.items() if isinstance(value, str))
+        store = cls(text_fields, with_speaker="speaker_id" in first, pool=pool)
+        store.append(first)
+        store.extend(segments)
+        return store
+
+    def append(self, segment: dict):
+        self.starts.append(segment["start"])
+        self.ends.append(segment["end"])
+        if self.with_speaker:
+            speaker = segment.get("speaker_id")
+            self.speakers.append(NO_SPEAKER if speaker is None else speaker)
+        for name, ids in self._texts.items():
+            ids.append(self.pool.add(segment.get(name, "")))
+
+    def extend(self, segments: Iterable[dict]):
+        for segment in segments:
+            self.append(segment)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _segment(self, i: int) -> dict:
+        segment: dict[str, Any] = {"start": self.starts[i], "end": self.ends[i]}
+        for name, ids in self._texts.items():
+            segment[name] = self.pool.get(ids[i])
+        if self.with_speaker:
+            speaker = self.speakers[i]
+            segment["speaker_id"] = None if speaker == NO_SPEAKER else speaker
+        return segment
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._segment(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return self._segment(index)
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self._segment(i)
+
+    def text(self, i: int, name: str = "text") -> str:
+        """Return one text field without building the segment dict."""
+        return self.pool.get(self._texts[name][i])
+
+    def shifted(self, offset: float) -> "SegmentStore":
+        """Return a copy with every timestamp moved by offset seconds, sharing the text pool."""
+        store = SegmentStore(self.text_fields, self.with_speaker, self.pool)
+        store.starts = array("d", (start + offset for start in self.starts))
+        store.ends = array("d", (end + offset for end in self.ends))
+        store.speakers = array("i", self.speakers)
+        store._texts = {name: array("I", ids) for name, ids in self._texts.items()}
+        return store
+
+    def to_dicts(self) -> list[dict]:
+        return list(self)
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the text pool."""
+        columns = [self.starts, self.ends, self.speakers, *self._texts.values()]
+        return sum(column.itemsize * len(column) for column in columns) + self.pool.nbytes()
+
+
+def json_default(obj: Any) -> Any:
+    """json.dumps default hook that encodes SegmentStores as lists of dicts."""
+    if isinstance(obj, SegmentStore):
+        return obj.to_dicts()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,296 @@
+"""Storage manager: index of pipeline artifacts with reuse and disk-quota eviction."""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Artifact:
+    """An indexed file under the storage root."""
+
+    path: str
+    video_id: str
+    kind: str
+    params: dict[str, Any]
+    size: int
+    meta: dict[str, Any] = field(default_factory=dict)
+
+
+def _params_key(params: dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+class StorageManager:
+    """
+    SQLite index of the files the pipeline writes under the storage root.
+
+    Artifacts (audio, subtitles) are indexed by video ID,
+    kind and the parameters that produced them, so a later job with the same
+    parameters can reuse the file instead of redoing the stage. Once the
+    indexed files exceed quota_bytes, the least recently used are deleted.
+    Files pinned by in-flight jobs are never evicted; pins older than
+    pin_ttl are treated as left behind by a crashed process and ignored.
+
+    The index is a WAL database, so API and worker processes on the same
+    node can share it.
+    """
+
+    def __init__(self, root: str, db_path: str, quota_bytes: int = 0, pin_ttl: float = 6 * 3600):
+        self.root = root
+        self.db_path = db_path
+        self.quota_bytes = quota_bytes
+        self.pin_ttl = pin_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                path TEXT PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                params TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                meta TEXT NOT NULL DEFAULT '{}',
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_artifacts_lookup ON artifacts (video_id, kind, params);
+            CREATE INDEX IF NOT EXISTS idx_artifacts_last_used ON artifacts (last_used);
+            CREATE TABLE IF NOT EXISTS pins (
+                job_id TEXT NOT NULL,
+                path TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (job_id, path)
+            );
+            CREATE INDEX IF NOT EXISTS idx_pins_path ON pins (path);
+            """
+        )
+
+    def acquire(self, job_id: str, video_id: str, kind: str, params: dict[str, Any]) -> Artifact | None:
+        """
+        Look up an artifact and pin it for job_id.
+
+        The lookup and the pin happen in one transaction, so the file cannot
+        be evicted between them. An entry whose file has disappeared is
+        dropped and counts as a miss.
+
+        Returns:
+            The artifact, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT path, size, meta FROM artifacts WHERE video_id = ? AND kind = ? AND params = ? "
+                    "ORDER BY last_used DESC LIMIT 1",
+                    (video_id, kind, _params_key(params)),
+                ).fetchone()
+                if row is not None and not os.path.exists(row[0]):
+                    self._conn.execute("DELETE FROM artifacts WHERE path = ?", (row[0],))
+                    row = None
+                if row is not None:
+                    self._conn.execute("UPDATE artifacts SET last_used = ? WHERE path = ?", (now, row[0]))
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO pins (job_id, path, created_at) VALUES (?, ?, ?)",
+                        (job_id, row[0], now),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        logger.info(f"Reusing stored {kind} for {video_id}: {row[0]}")
+        return Artifact(row[0], video_id, kind, params, row[1], json.loads(row[2]))
+
+    def pin(self, job_id: str, path: str):
+        """Protect a file from eviction until the job is released, e.g. before it is written."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pins (job_id, path, created_at) VALUES (?, ?, ?)",
+                (job_id, os.path.abspath(path), time.time()),
+            )
+
+    def register(
+        self,
+        job_id: str,
+        video_id: str,
+        kind: str,
+        params: dict[str, Any],
+        path: str,
+        meta: dict[str, Any] | None = None,
+    ) -> Artifact:
+        """
+        Index a file written by a job, pin it for the job, and evict if over quota.
+
+        A file rewritten at the same path replaces its previous entry.
+        """
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artifacts "
+                    "(path, video_id, kind, params, size, meta, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, video_id, kind, _params_key(params), size, json.dumps(meta or {}), now, now),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pins (job_id, path, created_at) VALUES (?, ?, ?)",
+                    (job_id, path, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.evict()
+        return Artifact(path, video_id, kind, params, size, meta or {})
+
+    def release(self, job_id: str):
+        """Unpin every file pinned by a finished or failed job, and evict what the pins held over quota."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pins WHERE job_id = ?", (job_id,))
+        self.evict()
+
+    def evict(self) -> int:
+        """
+        Delete least-recently-used unpinned artifacts until the total fits the quota.
+
+        Returns:
+            Number of artifacts deleted
+        """
+        if self.quota_bytes <= 0:
+            return 0
+        victims = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+                if total > self.quota_bytes:
+                    rows = self._conn.execute(
+                        "SELECT path, size FROM artifacts WHERE path NOT IN "
+                        "(SELECT path FROM pins WHERE created_at > ?) ORDER BY last_used",
+                        (time.time() - self.pin_ttl,),
+                    ).fetchall()
+                    for path, size in rows:
+                        if total <= self.quota_bytes:
+                            break
+                        victims.append((path, size))
+                        total -= size
+                    self._conn.executemany("DELETE FROM artifacts WHERE path = ?", [(path,) for path, _ in victims])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.evicted += len(victims)
+            self.evicted_bytes += sum(size for _, size in victims)
+
+        for path, _ in victims:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._remove_empty_dir(os.path.dirname(path))
+        if victims:
+            logger.info(f"Storage evicted {len(victims)} files ({sum(size for _, size in victims)} bytes)")
+        return len(victims)
+
+    def _remove_empty_dir(self, path: str):
+        if os.path.dirname(path) != os.path.abspath(self.root):
+            return
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+    def reconcile(self, skip: tuple[str, ...] = ("_cache",)):
+        """
+        Bring the index in line with the disk at startup.
+
+        Entries whose files are gone are dropped. Files in per-video
+        directories that are not indexed, e.g. written before the index
+        existed, are indexed as kind "untracked" so the quota covers them;
+        they are never reused. Files modified within pin_ttl are left out,
+        since a job in another process may still be writing them. Expired
+        pins are cleared.
+        """
+        now = time.time()
+        root = os.path.abspath(self.root)
+        with self._lock:
+            indexed = {path for (path,) in self._conn.execute("SELECT path FROM artifacts")}
+            missing = [(path,) for path in indexed if not os.path.exists(path)]
+            untracked = []
+            for entry in os.scandir(root) if os.path.isdir(root) else ():
+                if not entry.is_dir() or entry.name in skip:
+                    continue
+                for file in os.scandir(entry.path):
+                    if not file.is_file() or file.path in indexed:
+                        continue
+                    stat = file.stat()
+                    if stat.st_mtime <= now - self.pin_ttl:
+                        untracked.append((file.path, entry.name, stat.st_size, stat.st_mtime))
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("DELETE FROM artifacts WHERE path = ?", missing)
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO artifacts "
+                    "(path, video_id, kind, params, size, meta, created_at, last_used) "
+                    "VALUES (?, ?, 'untracked', '{}', ?, '{}', ?, ?)",
+                    [(path, video_id, size, mtime, mtime) for path, video_id, size, mtime in untracked],
+                )
+                self._conn.execute("DELETE FROM pins WHERE created_at <= ?", (now - self.pin_ttl,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if missing or untracked:
+            logger.info(f"Storage index reconciled: {len(missing)} missing, {len(untracked)} untracked files")
+        self.evict()
+
+    def stats(self) -> dict:
+        """Return disk usage by artifact kind, pins, and reuse and eviction counters."""
+        with self._lock:
+            kinds = {
+                kind: {"files": files, "bytes": size}
+                for kind, files, size in self._conn.execute(
+                    "SELECT kind, COUNT(*), SUM(size) FROM artifacts GROUP BY kind"
+                )
+            }
+            (pinned,) = self._conn.execute(
+                "SELECT COUNT(DISTINCT path) FROM pins WHERE created_at > ?",
+                (time.time() - self.pin_ttl,),
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "bytes": sum(kind["bytes"] for kind in kinds.values()),
+                "quota_bytes": self.quota_bytes,
+                "files": sum(kind["files"] for kind in kinds.values()),
+                "kinds": kinds,
+                "pinned_files": pinned,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evicted": self.evicted,
+                "evicted_bytes": self.evicted_bytes,
+            }
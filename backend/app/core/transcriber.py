@@ -1,68 +1,187 @@
 """Audio transcription using OpenAI gpt-4o-transcribe API."""
 
+import os
 import json
 import logging
 import re
-from openai import OpenAI
-from app.core import config
+import tempfile
+from collections import Counter
+from typing import AsyncIterator, Callable
+import asyncio
+from openai import AsyncOpenAI
+from app.core import audio, clients, config, ratelimit
+from app.core.audio import AudioChunk
+from app.core.segments import SegmentStore, json_default
 
 logger = logging.getLogger(__name__)
 
+TRANSCRIPTION_MODEL = "gpt-4o-transcribe"
 
-def transcribe_audio(audio_path: str, api_key: str) -> dict:
+
+def _parse_speaker_id(seg) -> int:
+    """Convert a diarization label like "Speaker 2" to a zero-based ID."""
+    speaker = getattr(seg, 'speaker', None)
+    if speaker:
+        # "Speaker 1" -> 0, "Speaker 2" -> 1, etc.
+        speaker_match = re.search(r'Speaker\s*(\d+)', speaker)
+        if speaker_match:
+            return int(speaker_match.group(1)) - 1
+    return 0
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def _transcribe_file(client: AsyncOpenAI, audio_path: str) -> tuple[str | None, list[dict]]:
+    """Transcribe a single audio file and return (raw language code, segments)."""
+    # Read off the event loop; the bytes are reused across retries
+    audio_bytes = await asyncio.to_thread(_read_file, audio_path)
+    raw_response = await ratelimit.call_with_retry(
+        client.api_key,
+        lambda: client.audio.transcriptions.with_raw_response.create(
+            model=TRANSCRIPTION_MODEL,
+            file=(os.path.basename(audio_path), audio_bytes),
+            response_format="verbose_json",
+        ),
+    )
+    transcription = raw_response.parse()
+
+    segments = [
+        {
+            "start": seg.start,
+            "end": seg.end,
+            "text": seg.text.strip(),
+            "speaker_id": _parse_speaker_id(seg),
+        }
+        for seg in transcription.segments
+    ]
+    return getattr(transcription, 'language', 'en'), segments
+
+
+def _align_speakers(segments: list[dict], previous_speaker: int | None) -> None:
+    """
+    Map chunk-local speaker IDs onto the IDs used by earlier chunks.
+
+    Diarization labels restart in every request. Chunks are cut at pauses, so
+    the speaker who opens a chunk is taken to be the one who closed the
+    previous chunk; other speakers keep their own ID where it is free, or
+    swap into the ID the opening speaker gave up.
+    """
+    if not segments or previous_speaker is None:
+        return
+
+    first_local = segments[0]["speaker_id"]
+    mapping = {first_local: previous_speaker}
+    for seg in segments:
+        local = seg["speaker_id"]
+        if local not in mapping:
+            used = set(mapping.values())
+            if local not in used:
+                mapping[local] = local
+            elif first_local not in used:
+                mapping[local] = first_local
+            else:
+                mapping[local] = min(set(range(len(used) + 1)) - used)
+        seg["speaker_id"] = mapping[local]
+
+
+def _stitch_chunks(
+    chunks: list[AudioChunk],
+    results: list[tuple[str | None, list[dict]]],
+) -> tuple[str | None, list[dict]]:
+    """Offset chunk timestamps into the full-file timeline and merge segments."""
+    segments = []
+    language_counts = Counter()
+    previous_speaker = None
+
+    for chunk, (lang_code, chunk_segments) in zip(chunks, results):
+        for seg in chunk_segments:
+            seg["start"] += chunk.start
+            seg["end"] += chunk.start
+        _align_speakers(chunk_segments, previous_speaker)
+        if chunk_segments:
+            previous_speaker = chunk_segments[-1]["speaker_id"]
+            language_counts[lang_code] += len(chunk_segments)
+        segments.extend(chunk_segments)
+
+    lang_code = language_counts.most_common(1)[0][0] if language_counts else None
+    return lang_code, segments
+
+
+async def _transcribe_chunked(
+    client: AsyncOpenAI,
+    audio_path: str,
+    max_chunk_seconds: float,
+    max_chunk_bytes: int,
+    max_concurrency: int,
+    progress_callback: Callable[[int, str], None] | None = None,
+) -> tuple[str | None, list[dict]]:
+    """Split audio at silences, transcribe chunks in parallel and stitch the results."""
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(audio_path) or None) as tmp_dir:
+        chunks = await asyncio.to_thread(
+            audio.split_on_silence, audio_path, tmp_dir, max_chunk_seconds, max_chunk_bytes
+        )
+        if len(chunks) == 1:
+            return await _transcribe_file(client, chunks[0].path)
+
+        logger.info(f"Transcribing {len(chunks)} chunks with up to {max_concurrency} in flight")
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        done = 0
+
+        async def transcribe_chunk(chunk: AudioChunk) -> tuple[str | None, list[dict]]:
+            nonlocal done
+            async with semaphore:
+                result = await _transcribe_file(client, chunk.path)
+            done += 1
+            if progress_callback:
+                progress_callback(int(done / len(chunks) * 100), f"Transcribed chunk {done}/{len(chunks)}")
+            return result
+
+        results = await asyncio.gather(*(transcribe_chunk(chunk) for chunk in chunks))
+
+    return _stitch_chunks(chunks, results)
+
+
+async def transcribe_audio(
+    audio_path: str,
+    api_key: str,
+    split_on_silence: bool = False,
+    max_chunk_seconds: float = 600.0,
+    max_chunk_bytes: int = 24 * 1024 * 1024,
+    max_concurrency: int = 4,
+    progress_callback: Callable[[int, str], None] | None = None,
+) -> dict:
     """
     Transcribe audio file using OpenAI gpt-4o-transcribe API.
 
     Args:
         audio_path: Path to the audio file
         api_key: OpenAI API key
+        split_on_silence: Cut the audio at silences and transcribe the chunks in parallel
+        max_chunk_seconds: Maximum chunk duration when splitting
+        max_chunk_bytes: Maximum chunk upload size when splitting
+        max_concurrency: Maximum chunk requests in flight when splitting
+        progress_callback: Optional callback for per-chunk progress (progress%, message)
 
     Returns:
         Transcription result with segments and timestamps
     """
-    client = OpenAI(api_key=api_key)
-
     logger.info(f"Starting transcription: {audio_path}")
 
     try:
-        with open(audio_path, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model="gpt-4o-transcribe",
-                file=audio_file,
-                response_format="verbose_json",
-            )
+        async with clients.registry.lease(api_key) as client:
+            if split_on_silence:
+                lang_code, segments = await _transcribe_chunked(
+                    client, audio_path, max_chunk_seconds, max_chunk_bytes, max_concurrency,
+                    progress_callback,
+                )
+            else:
+                lang_code, segments = await _transcribe_file(client, audio_path)
         logger.info("Transcription complete")
-
-        # Parse segments and convert speaker labels to IDs
-        segments = []
-        for seg in transcription.segments:
-            # Handle speaker field if present (diarization)
-            speaker_id = 0
-            speaker = getattr(seg, 'speaker', None)
-            if speaker:
-                # "Speaker 1" -> 0, "Speaker 2" -> 1, etc.
-                speaker_match = re.search(r'Speaker\s*(\d+)', speaker)
-                if speaker_match:
-                    speaker_id = int(speaker_match.group(1)) - 1
-
-            segments.append({
-                "start": seg.start,
-                "end": seg.end,
-                "text": seg.text.strip(),
-                "speaker_id": speaker_id
-            })
-
-        # Detect language from response or default to "en"
-        lang_code = getattr(transcription, 'language', 'en')
-        standard_lang_code = config.convert_to_iso639_1(lang_code)
-
-        if standard_lang_code:
-            logger.info(f"Language code normalized: '{lang_code}' -> '{standard_lang_code}'")
-
-        return {
-            "language_code": standard_lang_code or "en",
-            "segments": segments
-        }
+        return _build_result(lang_code, segments)
 
     except FileNotFoundError:
         logger.error(f"Audio file not found: {audio_path}")
@@ -72,12 +191,95 @@ def transcribe_audio(audio_path: str, api_key: str) -> dict:
         raise ValueError(f"Transcription failed: {e}")
 
 
+async def transcribe_stream(
+    chunks: AsyncIterator[AudioChunk],
+    api_key: str,
+    max_concurrency: int = 4,
+    duration: float = 0.0,
+    progress_callback: Callable[[int, str], None] | None = None,
+) -> dict:
+    """
+    Transcribe audio chunks as they are produced, e.g. while the rest is still downloading.
+
+    Each chunk is sent as soon as the iterator yields it. The results are
+    stitched like a chunked file transcription: timestamps are offset by the
+    chunk start and speaker IDs aligned across chunks.
+
+    Args:
+        chunks: Chunks in playback order, with start/end in the full-file timeline
+        api_key: OpenAI API key
+        max_concurrency: Maximum chunk requests in flight
+        duration: Total audio duration, for progress; 0 if unknown
+        progress_callback: Optional callback for per-chunk progress (progress%, message)
+
+    Returns:
+        Transcription result with segments and timestamps, as from transcribe_audio
+    """
+    logger.info("Starting streaming transcription")
+
+    try:
+        async with clients.registry.lease(api_key) as client:
+            semaphore = asyncio.Semaphore(max(1, max_concurrency))
+            received: list[AudioChunk] = []
+            tasks: list[asyncio.Future] = []
+            transcribed = 0.0
+
+            async def transcribe_chunk(chunk: AudioChunk) -> tuple[str | None, list[dict]]:
+                nonlocal transcribed
+                async with semaphore:
+                    result = await _transcribe_file(client, chunk.path)
+                transcribed += chunk.end - chunk.start
+                if progress_callback and duration > 0:
+                    progress_callback(
+                        min(100, int(transcribed / duration * 100)),
+                        f"Transcribed {transcribed / 60:.1f}/{duration / 60:.1f} min",
+                    )
+                return result
+
+            try:
+                async for chunk in chunks:
+                    received.append(chunk)
+                    tasks.append(asyncio.ensure_future(transcribe_chunk(chunk)))
+                results = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+        logger.info(f"Streaming transcription complete: {len(received)} chunks")
+        return _build_result(*_stitch_chunks(received, results))
+
+    except Exception as e:
+        logger.error(f"OpenAI API error: {e}")
+        raise ValueError(f"Transcription failed: {e}")
+
+
+def _build_result(lang_code: str | None, segments: list[dict]) -> dict:
+    # Detect language from response or default to "en"
+    standard_lang_code = config.convert_to_iso639_1(lang_code)
+
+    if standard_lang_code:
+        logger.info(f"Language code normalized: '{lang_code}' -> '{standard_lang_code}'")
+
+    return {
+        "language_code": standard_lang_code or "en",
+        "segments": SegmentStore.from_dicts(segments)
+    }
+
+
 def save_transcription(result: dict, output_path: str):
     """Save transcription result to JSON file."""
     try:
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=4)
+            json.dump(result, f, ensure_ascii=False, indent=4, default=json_default)
         logger.info(f"Transcription saved: {output_path}")
     except Exception as e:
         logger.error(f"Failed to save transcription: {e}")
         raise
+
+
+def load_transcription(input_path: str) -> dict:
+    """Load transcription result from JSON file."""
+    with open(input_path, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    result["segments"] = SegmentStore.from_dicts(result.get("segments", []))
+    return result
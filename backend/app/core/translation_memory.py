@@ -0,0 +1,215 @@
+"""Translation memory: chunk-level translations reused across jobs."""
+
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Chunks start with a "<speaker_id>: " label that varies between videos
+_SPEAKER_LABEL_RE = re.compile(r"^\s*((?:speaker_)?\d+|unknown):\s*")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize source text for lookup: NFKC, no speaker label, single spaces."""
+    text = unicodedata.normalize("NFKC", text)
+    text = _SPEAKER_LABEL_RE.sub("", text, count=1)
+    return " ".join(text.split())
+
+
+def _split_label(text: str) -> tuple[str, str]:
+    """Split text into its leading speaker label (with separator) and the rest."""
+    match = _SPEAKER_LABEL_RE.match(text)
+    if not match:
+        return "", text
+    return match.group(0), text[match.end():]
+
+
+class TranslationMemory:
+    """
+    SQLite-backed store of (normalized source, target language, model) -> translation.
+
+    Entries beyond max_entries are evicted least-recently-used first. The
+    methods do blocking disk I/O; async callers go through a
+    TranslationMemorySession, which runs them in a worker thread.
+    """
+
+    def __init__(self, db_path: str, max_entries: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                source TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                model TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (source, target_language, model)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self._conn.commit()
+        # Upper bound on the row count, so inserts only count rows once it passes max_entries
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+
+    def get(self, source_text: str, target_language: str, model: str) -> tuple[str, int] | None:
+        """
+        Look up a translation.
+
+        Returns:
+            Tuple of (translation, tokens the original request used), with the
+            translation carrying source_text's speaker label, or None on a miss
+        """
+        return self.get_many([source_text], target_language, model)[0]
+
+    def get_many(self, source_texts: list[str], target_language: str, model: str) -> list[tuple[str, int] | None]:
+        """Look up several translations, refreshing the hits in one transaction."""
+        keys = [normalize_text(text) for text in source_texts]
+        with self._lock:
+            rows = [
+                self._conn.execute(
+                    "SELECT translation, tokens FROM translations "
+                    "WHERE source = ? AND target_language = ? AND model = ?",
+                    (key, target_language, model),
+                ).fetchone()
+                for key in keys
+            ]
+            now = time.time()
+            hits = [(now, key, target_language, model) for key, row in zip(keys, rows) if row is not None]
+            if hits:
+                self._conn.executemany(
+                    "UPDATE translations SET last_used = ? "
+                    "WHERE source = ? AND target_language = ? AND model = ?",
+                    hits,
+                )
+                self._conn.commit()
+
+        found = []
+        for text, row in zip(source_texts, rows):
+            if row is None:
+                found.append(None)
+                continue
+            label, _ = _split_label(text)
+            found.append((label + row[0], row[1]))
+        return found
+
+    def put(self, source_text: str, target_language: str, model: str, translation: str, tokens: int = 0):
+        """Store a translation, stripping the speaker label so it can be reused."""
+        self.put_many([(source_text, translation, tokens)], target_language, model)
+
+    def put_many(self, entries: list[tuple[str, str, int]], target_language: str, model: str):
+        """Store (source text, translation, tokens) entries in one transaction."""
+        now = time.time()
+        rows = []
+        for source_text, translation, tokens in entries:
+            key = normalize_text(source_text)
+            if key:
+                _, body = _split_label(translation)
+                rows.append((key, target_language, model, body.strip(), tokens, now))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations "
+                "(source, target_language, model, translation, tokens, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._count += len(rows)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Delete least-recently-used entries once there are more than max_entries.
+
+        Eviction goes down to 90% of max_entries, so a full memory is counted
+        once per tenth of its size in inserts rather than on every insert.
+        Caller holds the lock.
+        """
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        excess = count - int(self.max_entries * 0.9) if count > self.max_entries else 0
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE rowid IN "
+                "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            logger.info(f"Translation memory evicted {excess} entries")
+        self._count = count - excess
+
+    def session(self) -> "TranslationMemorySession":
+        """Start a per-job session that counts hits and savings."""
+        return TranslationMemorySession(self)
+
+    def stats(self) -> dict:
+        """Return the number of stored entries."""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        return {"entries": count, "max_entries": self.max_entries}
+
+
+class TranslationMemorySession:
+    """
+    Per-job view of a TranslationMemory that records hit-rate statistics.
+
+    Lookups and stores run in a worker thread, so the event loop never
+    waits on the database.
+    """
+
+    def __init__(self, memory: TranslationMemory):
+        self.memory = memory
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    async def get(self, source_text: str, target_language: str, model: str) -> str | None:
+        """Look up a translation and count the hit or miss."""
+        return (await self.get_many([source_text], target_language, model))[0]
+
+    async def get_many(self, source_texts: list[str], target_language: str, model: str) -> list[str | None]:
+        """Look up several translations and count the hits and misses."""
+        found = await asyncio.to_thread(self.memory.get_many, source_texts, target_language, model)
+        with self._lock:
+            for entry in found:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self.tokens_saved += entry[1]
+        return [entry[0] if entry else None for entry in found]
+
+    async def put(self, source_text: str, target_language: str, model: str, translation: str, tokens: int = 0):
+        """Store a translation."""
+        await self.put_many([(source_text, translation, tokens)], target_language, model)
+
+    async def put_many(self, entries: list[tuple[str, str, int]], target_language: str, model: str):
+        """Store (source text, translation, tokens) entries."""
+        await asyncio.to_thread(self.memory.put_many, entries, target_language, model)
+
+    def stats(self) -> dict:
+        """Return hit-rate statistics for this session."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "api_calls_saved": self.hits,
+                "tokens_saved": self.tokens_saved,
+            }
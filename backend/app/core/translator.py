@@ -1,83 +1,304 @@
 """Text translation using OpenAI GPT API."""
 
+import re
+import json
 import logging
+import asyncio
 from typing import Callable
-from openai import OpenAI
+from openai import AsyncOpenAI
+from app.core import clients, ratelimit
+from app.core.segments import SegmentStore
+from app.core.translation_memory import TranslationMemorySession
 
 logger = logging.getLogger(__name__)
 
+TRANSLATION_MODEL = "gpt-4o-mini"
 
-def _create_translation_chunks(transcription_result: dict, max_chunk_words: int = 50) -> list[dict]:
-    """Create translation chunks from segments. New chunk on speaker change or size limit."""
-    chunks = []
-    current_chunk = []
-    current_text = ""
-    current_speaker = None
 
+# Scripts written without spaces, where each character is roughly one token
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"[.?!\u2026\u3002\uff1f\uff01]['\")\u300d\u300f]*$")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the model token count of text without a tokenizer.
+
+    CJK characters count as one token each; other words count as one token
+    per four characters, and punctuation as one token.
+    """
+    cjk_count = len(_CJK_RE.findall(text))
+    if cjk_count:
+        text = _CJK_RE.sub(" ", text)
+    return cjk_count + sum((len(word) + 3) // 4 for word in _WORD_RE.findall(text))
+
+
+def _create_translation_chunks(
+    transcription_result: dict,
+    max_chunk_tokens: int = 100,
+    pause_threshold: float = 1.0,
+    min_fill: float = 0.6,
+) -> list[dict]:
+    """
+    Create translation chunks from segments in a single pass.
+
+    A new chunk starts on speaker change or when the next segment would exceed
+    max_chunk_tokens. Once a chunk is min_fill full, it is closed early at a
+    sentence end or at a pause of at least pause_threshold seconds.
+    """
+    chunks = []
     segments = transcription_result.get('segments', [])
     if not segments:
         return []
 
+    current_texts: list[str] = []
+    current_tokens = 0
+    current_speaker = None
+    chunk_start = chunk_end = 0.0
+
     def finalize_chunk():
-        nonlocal current_chunk, current_text, current_speaker
-        if current_chunk:
+        nonlocal current_texts, current_tokens, current_speaker
+        if current_texts:
             chunks.append({
-                "source_text": current_text.strip(),
-                "start_time": current_chunk[0]['start'],
-                "end_time": current_chunk[-1]['end']
+                "source_text": f"{current_speaker}: " + " ".join(current_texts),
+                "start_time": chunk_start,
+                "end_time": chunk_end
             })
-            current_chunk = []
-            current_text = ""
-            current_speaker = None
+        current_texts = []
+        current_tokens = 0
+        current_speaker = None
 
-    for segment in segments:
+    for i, segment in enumerate(segments):
         speaker = segment.get('speaker_id', 0)
-        text = segment.get('text', '')
-        word_count = len(text.split())
+        text = segment.get('text', '').strip()
+        tokens = estimate_tokens(text)
 
         # New chunk on speaker change or size limit
-        if (speaker != current_speaker and current_speaker is not None) or \
-           (len(current_text.split()) + word_count > max_chunk_words):
+        if current_texts and (speaker != current_speaker or current_tokens + tokens > max_chunk_tokens):
             finalize_chunk()
 
-        if current_speaker is None:
+        if not current_texts:
             current_speaker = speaker
-            current_text += f"{speaker}: "
+            chunk_start = segment['start']
 
-        current_chunk.append(segment)
-        current_text += text + " "
+        current_texts.append(text)
+        current_tokens += tokens
+        chunk_end = segment['end']
+
+        # Prefer closing a well-filled chunk at a sentence end or pause
+        if current_tokens >= max_chunk_tokens * min_fill:
+            next_start = segments[i + 1]['start'] if i + 1 < len(segments) else None
+            at_pause = next_start is not None and next_start - segment['end'] >= pause_threshold
+            if at_pause or _SENTENCE_END_RE.search(text):
+                finalize_chunk()
 
     finalize_chunk()
     return chunks
 
 
-def translate_text(
-    transcription_result: dict,
+def _system_prompt(target_language: str) -> str:
+    """Build the translator system prompt."""
+    return (
+        f"You are a professional translator. Translate the following dialogue "
+        f"into natural {target_language}. Maintain the speaker labels "
+        f"(e.g., speaker_1:) and translate only the content."
+    )
+
+
+def _source_context_prompt(chunks: list[dict], start: int, stop: int, history_size: int) -> str | None:
+    """Describe the source chunks around chunks[start:stop] for context."""
+    before = [c["source_text"] for c in chunks[max(0, start - history_size):start]]
+    after = [c["source_text"] for c in chunks[stop:stop + 1]]
+    if not before and not after:
+        return None
+
+    parts = ["Surrounding dialogue, for context only. Do not translate it."]
+    if before:
+        parts.append("Before:\n" + "\n".join(before))
+    if after:
+        parts.append("After:\n" + "\n".join(after))
+    return "\n\n".join(parts)
+
+
+def _batch_system_prompt(target_language: str) -> str:
+    """Build the system prompt for batched requests with JSON output."""
+    return _system_prompt(target_language) + (
+        " The input is a JSON object whose \"chunks\" field maps chunk IDs to "
+        "dialogue chunks. Translate each chunk on its own and respond with a "
+        "JSON object {\"translations\": {\"<chunk ID>\": \"<translation>\"}} "
+        "containing every chunk ID."
+    )
+
+
+def _translated_segment(chunk: dict, translated_text: str) -> dict:
+    """Build a translated segment from a chunk."""
+    return {
+        "start": chunk["start_time"],
+        "end": chunk["end_time"],
+        "translated_text": translated_text,
+        "source_text": chunk["source_text"]
+    }
+
+
+def _failed_segment(chunk: dict) -> dict:
+    """Build the fallback segment for a chunk that could not be translated."""
+    return _translated_segment(chunk, f"[Translation failed] {chunk['source_text']}")
+
+
+def _estimate_request_tokens(messages: list[dict]) -> int:
+    """Estimate prompt plus completion tokens of a translation request."""
+    prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+    completion_tokens = estimate_tokens(messages[-1]["content"]) * 2
+    return prompt_tokens + completion_tokens
+
+
+async def _request_translation(client: AsyncOpenAI, messages: list[dict]) -> tuple[str, int]:
+    """Send one chat completion request and return (translated text, total tokens)."""
+    raw_response = await ratelimit.call_with_retry(
+        client.api_key,
+        lambda: client.chat.completions.with_raw_response.create(
+            model=TRANSLATION_MODEL,
+            messages=messages,
+            temperature=0.3,
+        ),
+        tokens=_estimate_request_tokens(messages),
+    )
+    response = raw_response.parse()
+    tokens = response.usage.total_tokens if response.usage else 0
+    return response.choices[0].message.content.strip(), tokens
+
+
+async def _request_batch_translation(client: AsyncOpenAI, messages: list[dict]) -> tuple[dict, int]:
+    """Send one JSON-mode chat completion request and return (parsed object, total tokens)."""
+    raw_response = await ratelimit.call_with_retry(
+        client.api_key,
+        lambda: client.chat.completions.with_raw_response.create(
+            model=TRANSLATION_MODEL,
+            messages=messages,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        ),
+        tokens=_estimate_request_tokens(messages),
+    )
+    response = raw_response.parse()
+    tokens = response.usage.total_tokens if response.usage else 0
+    return json.loads(response.choices[0].message.content), tokens
+
+
+async def _translate_chunk(
+    client: AsyncOpenAI,
+    chunk: dict,
+    messages: list[dict],
     target_language: str,
-    api_key: str,
-    history_size: int = 3,
-    progress_callback: Callable[[int, str], None] | None = None
-) -> list[dict]:
+    memory: TranslationMemorySession | None,
+) -> str:
+    """Translate one chunk, consulting the translation memory before the API."""
+    if memory:
+        cached = await memory.get(chunk["source_text"], target_language, TRANSLATION_MODEL)
+        if cached is not None:
+            return cached
+
+    translated_text, tokens = await _request_translation(client, messages)
+    if memory:
+        await memory.put(chunk["source_text"], target_language, TRANSLATION_MODEL, translated_text, tokens)
+    return translated_text
+
+
+def _single_chunk_messages(chunks: list[dict], index: int, target_language: str, history_size: int) -> list[dict]:
+    """Build the request for one chunk with neighbouring source chunks as context."""
+    messages = [{"role": "system", "content": _system_prompt(target_language)}]
+    context = _source_context_prompt(chunks, index, index + 1, history_size)
+    if context:
+        messages.append({"role": "system", "content": context})
+    messages.append({"role": "user", "content": chunks[index]["source_text"]})
+    return messages
+
+
+async def _translate_batch(
+    client: AsyncOpenAI,
+    chunks: list[dict],
+    indices: list[int],
+    target_language: str,
+    history_size: int,
+    memory: TranslationMemorySession | None,
+) -> dict[int, dict]:
     """
-    Translate transcribed text using GPT-4o-mini.
+    Translate consecutive chunks in one JSON-mode request.
 
-    Args:
-        transcription_result: Transcription result from OpenAI
-        target_language: Target language name (e.g., "Korean", "Japanese")
-        api_key: OpenAI API key
-        history_size: Number of previous chunks to keep for context
-        progress_callback: Optional callback for progress updates (progress%, message)
+    Chunks found in the translation memory are left out of the request, and
+    new translations are stored in one write after the batch.
+    Chunks missing or malformed in the response are retried on their own.
 
     Returns:
-        List of translated segments
+        Mapping of chunk index to translated segment
     """
-    client = OpenAI(api_key=api_key)
-    chunks = _create_translation_chunks(transcription_result)
+    results = {}
+    pending = []
+    cached_texts = [None] * len(indices)
+    if memory:
+        cached_texts = await memory.get_many(
+            [chunks[index]["source_text"] for index in indices], target_language, TRANSLATION_MODEL
+        )
+    for index, cached in zip(indices, cached_texts):
+        if cached is not None:
+            results[index] = _translated_segment(chunks[index], cached)
+        else:
+            pending.append(index)
+    if not pending:
+        return results
+
+    translations = {}
+    tokens = 0
+    if len(pending) > 1:
+        messages = [{"role": "system", "content": _batch_system_prompt(target_language)}]
+        context = _source_context_prompt(chunks, indices[0], indices[-1] + 1, history_size)
+        if context:
+            messages.append({"role": "system", "content": context})
+        payload = {"chunks": {str(index): chunks[index]["source_text"] for index in pending}}
+        messages.append({"role": "user", "content": json.dumps(payload, ensure_ascii=False)})
+        try:
+            response, tokens = await _request_batch_translation(client, messages)
+            translations = response.get("translations", {}) if isinstance(response, dict) else {}
+        except Exception as e:
+            logger.error(f"Batch translation error: {e}")
+
+    returned = [i for i in pending if isinstance(translations.get(str(i)), str) and translations[str(i)].strip()]
+    new_entries = []
+    for index in pending:
+        chunk = chunks[index]
+        try:
+            if index in returned:
+                translated_text = translations[str(index)].strip()
+                chunk_tokens = tokens // len(returned)
+            else:
+                if len(pending) > 1:
+                    logger.warning(f"Chunk {index+1} missing from batch response, retrying alone")
+                messages = _single_chunk_messages(chunks, index, target_language, history_size)
+                translated_text, chunk_tokens = await _request_translation(client, messages)
+            new_entries.append((chunk["source_text"], translated_text, chunk_tokens))
+            results[index] = _translated_segment(chunk, translated_text)
+        except Exception as e:
+            logger.error(f"Translation error: {e}")
+            results[index] = _failed_segment(chunk)
+
+    if memory and new_entries:
+        await memory.put_many(new_entries, target_language, TRANSLATION_MODEL)
+    return results
+
+
+async def _translate_sequential(
+    client: AsyncOpenAI,
+    chunks: list[dict],
+    target_language: str,
+    history_size: int,
+    progress_callback: Callable[[int, str], None] | None,
+    memory: TranslationMemorySession | None,
+) -> list[dict]:
+    """Translate chunks one by one, feeding earlier translations back as history."""
     translated_segments = []
     conversation_history = []
-
     total_chunks = len(chunks)
-    logger.info(f"Translating {total_chunks} chunks to '{target_language}'...")
 
     for i, chunk in enumerate(chunks):
         try:
@@ -87,30 +308,12 @@ def translate_text(
 
             logger.info(f"Translating chunk {i+1}/{total_chunks}...")
 
-            system_prompt = (
-                f"You are a professional translator. Translate the following dialogue "
-                f"into natural {target_language}. Maintain the speaker labels "
-                f"(e.g., speaker_1:) and translate only the content."
-            )
-
-            messages_to_send = [{"role": "system", "content": system_prompt}]
+            messages_to_send = [{"role": "system", "content": _system_prompt(target_language)}]
             messages_to_send.extend(conversation_history)
             messages_to_send.append({"role": "user", "content": chunk["source_text"]})
 
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages_to_send,
-                temperature=0.3,
-            )
-
-            translated_text = response.choices[0].message.content.strip()
-
-            translated_segments.append({
-                "start": chunk["start_time"],
-                "end": chunk["end_time"],
-                "translated_text": translated_text,
-                "source_text": chunk["source_text"]
-            })
+            translated_text = await _translate_chunk(client, chunk, messages_to_send, target_language, memory)
+            translated_segments.append(_translated_segment(chunk, translated_text))
 
             conversation_history.append({"role": "user", "content": chunk["source_text"]})
             conversation_history.append({"role": "assistant", "content": translated_text})
@@ -120,15 +323,111 @@ def translate_text(
 
         except Exception as e:
             logger.error(f"Translation error: {e}")
-            translated_segments.append({
-                "start": chunk["start_time"],
-                "end": chunk["end_time"],
-                "translated_text": f"[Translation failed] {chunk['source_text']}",
-                "source_text": chunk["source_text"]
-            })
+            translated_segments.append(_failed_segment(chunk))
+
+    return translated_segments
+
+
+async def _translate_concurrent(
+    client: AsyncOpenAI,
+    chunks: list[dict],
+    target_language: str,
+    history_size: int,
+    max_concurrency: int,
+    batch_size: int,
+    progress_callback: Callable[[int, str], None] | None,
+    memory: TranslationMemorySession | None,
+) -> list[dict]:
+    """
+    Translate chunks with up to max_concurrency requests in flight.
+
+    Each request carries up to batch_size chunks and the neighbouring source
+    chunks as context instead of earlier translations, so requests do not
+    depend on each other.
+    """
+    total_chunks = len(chunks)
+    batches = [
+        list(range(start, min(start + batch_size, total_chunks)))
+        for start in range(0, total_chunks, batch_size)
+    ]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def translate_batch(batch: list[int]) -> tuple[list[int], dict[int, dict] | None]:
+        async with semaphore:
+            try:
+                return batch, await _translate_batch(client, chunks, batch, target_language, history_size, memory)
+            except Exception as e:
+                logger.error(f"Translation error: {e}")
+                return batch, None
+
+    translated_segments: list[dict | None] = [None] * total_chunks
+    if progress_callback:
+        progress_callback(0, f"Translating chunk 1/{total_chunks}")
+
+    done = 0
+    for next_done in asyncio.as_completed([translate_batch(batch) for batch in batches]):
+        batch, results = await next_done
+        for index in batch:
+            translated_segments[index] = results[index] if results else _failed_segment(chunks[index])
+
+        done += len(batch)
+        logger.info(f"Translated chunks {batch[0]+1}-{batch[-1]+1} ({done}/{total_chunks} done)")
+        if progress_callback and done < total_chunks:
+            progress = int((done / total_chunks) * 100)
+            progress_callback(progress, f"Translating chunk {done+1}/{total_chunks}")
+
+    return translated_segments
+
+
+async def translate_text(
+    transcription_result: dict,
+    target_language: str,
+    api_key: str,
+    history_size: int = 3,
+    progress_callback: Callable[[int, str], None] | None = None,
+    max_concurrency: int = 1,
+    memory: TranslationMemorySession | None = None,
+    max_chunk_tokens: int = 100,
+    batch_size: int = 1,
+) -> SegmentStore:
+    """
+    Translate transcribed text using GPT-4o-mini.
+
+    Args:
+        transcription_result: Transcription result from OpenAI
+        target_language: Target language name (e.g., "Korean", "Japanese")
+        api_key: OpenAI API key
+        history_size: Number of previous chunks to keep for context
+        progress_callback: Optional callback for progress updates (progress%, message)
+        max_concurrency: Maximum requests in flight. 1 translates sequentially
+            with translation history; higher values translate chunks
+            concurrently using neighbouring source chunks as context.
+        memory: Optional translation memory session checked before each API call
+        max_chunk_tokens: Approximate source token budget per chunk
+        batch_size: Chunks packed into one JSON-mode request. Values above 1
+            translate concurrently, like max_concurrency > 1.
+
+    Returns:
+        Translated segments (start, end, translated_text, source_text)
+    """
+    chunks = _create_translation_chunks(transcription_result, max_chunk_tokens)
+
+    total_chunks = len(chunks)
+    logger.info(f"Translating {total_chunks} chunks to '{target_language}'...")
+
+    async with clients.registry.lease(api_key) as client:
+        if (max_concurrency > 1 or batch_size > 1) and total_chunks > 1:
+            translated_segments = await _translate_concurrent(
+                client, chunks, target_language, history_size, max(1, max_concurrency),
+                max(1, batch_size), progress_callback, memory
+            )
+        else:
+            translated_segments = await _translate_sequential(
+                client, chunks, target_language, history_size, progress_callback, memory
+            )
 
     if progress_callback:
         progress_callback(100, "Translation complete")
 
     logger.info("Translation complete")
-    return translated_segments
+    return SegmentStore.from_dicts(translated_segments)
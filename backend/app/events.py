@@ -0,0 +1,235 @@
+"""Progress event bus bridging worker threads and the event loop, and the event log for replay."""
+
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBus:
+    """
+    Collect job events from any thread and deliver them on the event loop.
+
+    publish() is cheap and thread-safe: calls from other threads are handed
+    to the loop with call_soon_threadsafe. Progress events for a job are
+    merged so that at most max_rate per second are delivered, keeping only
+    the latest. Other events (completed, error) are delivered immediately
+    and supersede any progress still pending for the job. Events are
+    delivered in order by a single task.
+    """
+
+    def __init__(self, deliver: Callable[[str, dict], Awaitable[None]], max_rate: float = 4.0):
+        self._deliver = deliver
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+        self._outbox: asyncio.Queue | None = None
+        self._sender: asyncio.Task | None = None
+        self._pending: dict[str, dict] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._last_sent: dict[str, float] = {}
+        self.published = 0
+        self.merged = 0
+        self.delivered = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Set the event loop that events are delivered on."""
+        with self._lock:
+            self._loop = loop
+
+    def publish(self, job_id: str, data: dict):
+        """Publish an event for a job. Safe to call from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        with self._lock:
+            if running is not None:
+                self._loop = running
+            loop = self._loop
+
+        if loop is None or loop.is_closed():
+            logger.warning(f"Progress bus has no event loop, dropping event for job {job_id}")
+            return
+        if running is loop:
+            self._publish(job_id, data)
+        else:
+            loop.call_soon_threadsafe(self._publish, job_id, data)
+
+    def _publish(self, job_id: str, data: dict):
+        self.published += 1
+        if data.get("type") != "progress":
+            self._cancel_timer(job_id)
+            if self._pending.pop(job_id, None) is not None:
+                self.merged += 1
+            self._last_sent.pop(job_id, None)
+            self._enqueue(job_id, data)
+            return
+
+        if job_id in self._pending:
+            self.merged += 1
+        self._pending[job_id] = data
+        if job_id in self._timers:
+            return
+
+        loop = asyncio.get_running_loop()
+        delay = self._last_sent.get(job_id, float("-inf")) + self.min_interval - loop.time()
+        if delay <= 0:
+            self._flush(job_id)
+        else:
+            self._timers[job_id] = loop.call_later(delay, self._flush, job_id)
+
+    def _cancel_timer(self, job_id: str):
+        timer = self._timers.pop(job_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _flush(self, job_id: str):
+        self._timers.pop(job_id, None)
+        data = self._pending.pop(job_id, None)
+        if data is None:
+            return
+        self._last_sent[job_id] = asyncio.get_running_loop().time()
+        self._enqueue(job_id, data)
+
+    def _enqueue(self, job_id: str, data: dict):
+        loop = asyncio.get_running_loop()
+        if self._sender is None or self._sender.done() or self._sender.get_loop() is not loop:
+            self._outbox = asyncio.Queue()
+            self._sender = loop.create_task(self._send_loop(self._outbox))
+        self._outbox.put_nowait((job_id, data))
+
+    async def _send_loop(self, outbox: asyncio.Queue):
+        while True:
+            job_id, data = await outbox.get()
+            try:
+                await self._deliver(job_id, data)
+                self.delivered += 1
+            except Exception as e:
+                logger.error(f"Failed to deliver event for job {job_id}: {e}")
+            finally:
+                outbox.task_done()
+
+    async def close(self, timeout: float = 5.0):
+        """Deliver events still waiting in the outbox and stop the sender task."""
+        for job_id in list(self._timers):
+            self._cancel_timer(job_id)
+        if self._sender is None:
+            return
+        try:
+            await asyncio.wait_for(self._outbox.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out delivering remaining progress events")
+        self._sender.cancel()
+        await asyncio.gather(self._sender, return_exceptions=True)
+        self._sender = None
+
+    def stats(self) -> dict:
+        """Return event counts."""
+        return {
+            "published": self.published,
+            "merged": self.merged,
+            "delivered": self.delivered,
+            "pending": len(self._pending),
+        }
+
+
+class EventSubscriber:
+    """Bounded queue of events for one streaming client."""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+
+class EventLog:
+    """
+    Bounded per-job ring buffers of delivered events, numbered per job from 1.
+
+    Events relayed from the broker keep the broker's global sequence number
+    instead, so the numbers survive API restarts and agree between API
+    processes. Clients that (re)connect pass the last sequence number they saw and get
+    only the newer events. Superseded progress events are left out of the
+    replay, so a reconnect costs at most one progress event plus the
+    completion or error. Logs of the least recently active jobs are dropped
+    beyond max_jobs.
+    """
+
+    def __init__(self, max_events: int = 100, max_jobs: int = 1000, subscriber_queue_size: int = 64):
+        self.max_events = max_events
+        self.max_jobs = max_jobs
+        self.subscriber_queue_size = subscriber_queue_size
+        self._logs: OrderedDict[str, deque[dict]] = OrderedDict()
+        self._next_seq: dict[str, int] = {}
+        self._subscribers: dict[str, set[EventSubscriber]] = {}
+        self.appended = 0
+        self.replayed = 0
+
+    def append(self, job_id: str, data: dict, seq: int | None = None) -> dict:
+        """Record an event and return it with its sequence number, the next for the job unless given."""
+        if seq is None:
+            seq = self._next_seq.get(job_id, 0) + 1
+        self._next_seq[job_id] = seq
+        event = {**data, "seq": seq}
+
+        log = self._logs.get(job_id)
+        if log is None:
+            log = self._logs[job_id] = deque(maxlen=self.max_events)
+        self._logs.move_to_end(job_id)
+        log.append(event)
+        self.appended += 1
+        while len(self._logs) > self.max_jobs:
+            evicted, _ = self._logs.popitem(last=False)
+            self._next_seq.pop(evicted, None)
+
+        for subscriber in list(self._subscribers.get(job_id, ())):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The client reconnects with its last sequence number
+                subscriber.overflowed = True
+                self.unsubscribe(job_id, subscriber)
+        return event
+
+    def last_seq(self, job_id: str) -> int:
+        """Return the sequence number of the job's latest event, or 0 if none is logged."""
+        return self._next_seq.get(job_id, 0)
+
+    def since(self, job_id: str, seq: int = 0) -> list[dict]:
+        """Return events after seq, keeping only the latest of consecutive progress events."""
+        events = [event for event in self._logs.get(job_id, ()) if event["seq"] > seq]
+        replay = [
+            event for i, event in enumerate(events)
+            if event.get("type") != "progress"
+            or i + 1 == len(events)
+            or events[i + 1].get("type") != "progress"
+        ]
+        self.replayed += len(replay)
+        return replay
+
+    def subscribe(self, job_id: str) -> EventSubscriber:
+        """Register a subscriber for new events of a job."""
+        subscriber = EventSubscriber(self.subscriber_queue_size)
+        self._subscribers.setdefault(job_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id: str, subscriber: EventSubscriber):
+        subscribers = self._subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[job_id]
+
+    def stats(self) -> dict:
+        """Return log size and replay counters."""
+        return {
+            "jobs": len(self._logs),
+            "events": sum(len(log) for log in self._logs.values()),
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+        }
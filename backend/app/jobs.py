@@ -1,11 +1,25 @@
-"""In-memory job management."""
+"""Job management with pluggable storage backends."""
 
-from dataclasses import dataclass, field
-from datetime import datetime
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
 from enum import Enum
-from typing import Any
+from typing import Any, Collection
+import os
+import asyncio
+import json
+import sqlite3
+import logging
+import threading
+import time
 import uuid
 
+from app.core import config
+from app.core.segments import json_default
+
+logger = logging.getLogger(__name__)
+
 
 class JobStatus(str, Enum):
     PENDING = "pending"
@@ -17,12 +31,20 @@ class JobStatus(str, Enum):
     FAILED = "failed"
 
 
+FINISHED_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+# Small result fields returned by default; the rest (transcription, segments,
+# translations) are only loaded when asked for
+SUMMARY_FIELDS = ("video_id", "source_language", "has_source_srt", "has_translated_srt", "translated_languages")
+
+
 @dataclass
 class JobInfo:
     id: str
     youtube_url: str
     target_language: str
     srt_type: str
+    target_languages: list[str] = field(default_factory=list)
     status: JobStatus = JobStatus.PENDING
     progress: int = 0
     message: str = ""
@@ -32,26 +54,319 @@ class JobInfo:
     updated_at: datetime = field(default_factory=datetime.now)
 
 
-# In-memory job storage
-jobs: dict[str, JobInfo] = {}
+class JobStore(ABC):
+    """Storage backend interface for jobs."""
+
+    @abstractmethod
+    def add(self, job: JobInfo):
+        """Add a new job."""
+
+    @abstractmethod
+    def get(self, job_id: str, fields: Collection[str] | None = None) -> JobInfo | None:
+        """Get a job, with only the given result fields unless fields is None."""
+
+    @abstractmethod
+    def update(
+        self,
+        job_id: str,
+        status: JobStatus | None = None,
+        progress: int | None = None,
+        message: str | None = None,
+        error: str | None = None,
+        result: dict[str, Any] | None = None,
+    ) -> JobInfo | None:
+        """Update a job's status fields and merge the given result fields."""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> bool:
+        """Delete a job. Returns whether it existed."""
+
+    @abstractmethod
+    def evict_expired(self, ttl_seconds: float) -> int:
+        """Delete finished jobs not updated within ttl_seconds. Returns the number deleted."""
+
+
+class MemoryJobStore(JobStore):
+    """Keep jobs in a process-local dict. Used for tests and single-process setups."""
+
+    def __init__(self):
+        self.jobs: dict[str, JobInfo] = {}
+
+    def add(self, job: JobInfo):
+        self.jobs[job.id] = job
+
+    def get(self, job_id: str, fields: Collection[str] | None = None) -> JobInfo | None:
+        job = self.jobs.get(job_id)
+        if job is None or fields is None:
+            return job
+        return replace(job, result={key: job.result[key] for key in fields if key in job.result})
+
+    def update(self, job_id, status=None, progress=None, message=None, error=None, result=None):
+        job = self.jobs.get(job_id)
+        if not job:
+            return None
+
+        if status is not None:
+            job.status = status
+        if progress is not None:
+            job.progress = progress
+        if message is not None:
+            job.message = message
+        if error is not None:
+            job.error = error
+        if result is not None:
+            job.result.update(result)
+        job.updated_at = datetime.now()
+
+        return job
+
+    def delete(self, job_id: str) -> bool:
+        if job_id in self.jobs:
+            del self.jobs[job_id]
+            return True
+        return False
+
+    def evict_expired(self, ttl_seconds: float) -> int:
+        cutoff = datetime.now() - timedelta(seconds=ttl_seconds)
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.status in FINISHED_STATUSES and job.updated_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Persist jobs in SQLite (WAL mode).
+
+    Status and progress live in a small, indexed jobs row that is cheap to
+    update on every progress tick. The result dict, which holds transcriptions
+    and segments, is stored one field per row in job_result_fields, so updates
+    rewrite only the changed fields and readers load only the fields they need.
+    """
+
+    def __init__(self, db_path: str, fail_interrupted: bool = True):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                youtube_url TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                target_languages TEXT NOT NULL,
+                srt_type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                progress INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs (created_at);
+            CREATE TABLE IF NOT EXISTS job_result_fields (
+                job_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (job_id, key)
+            );
+            """
+        )
+        if fail_interrupted:
+            self._fail_interrupted()
+
+    def _write_result(self, job_id: str, result: dict[str, Any]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO job_result_fields VALUES (?, ?, ?)",
+            [
+                (job_id, key, json.dumps(value, ensure_ascii=False, default=json_default))
+                for key, value in result.items()
+            ],
+        )
+
+    def _read_result(self, job_id: str, fields: Collection[str] | None) -> dict[str, Any]:
+        if fields is None:
+            rows = self._conn.execute(
+                "SELECT key, value FROM job_result_fields WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        elif fields:
+            fields = list(fields)
+            rows = self._conn.execute(
+                f"SELECT key, value FROM job_result_fields WHERE job_id = ? AND key IN ({', '.join('?' * len(fields))})",
+                (job_id, *fields),
+            ).fetchall()
+        else:
+            rows = []
+        return {key: json.loads(value) for key, value in rows}
+
+    def _fail_interrupted(self):
+        """Mark jobs left running by a previous process as failed."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE status NOT IN (?, ?)",
+                (
+                    JobStatus.FAILED.value,
+                    "Interrupted by server restart",
+                    datetime.now().isoformat(),
+                    *(s.value for s in FINISHED_STATUSES),
+                ),
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.warning(f"Marked {cursor.rowcount} interrupted jobs as failed")
+
+    @staticmethod
+    def _row_to_job(row: tuple, result: dict[str, Any]) -> JobInfo:
+        return JobInfo(
+            id=row[0],
+            youtube_url=row[1],
+            target_language=row[2],
+            target_languages=json.loads(row[3]),
+            srt_type=row[4],
+            status=JobStatus(row[5]),
+            progress=row[6],
+            message=row[7],
+            error=row[8],
+            result=result,
+            created_at=datetime.fromisoformat(row[9]),
+            updated_at=datetime.fromisoformat(row[10]),
+        )
+
+    def add(self, job: JobInfo):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id, job.youtube_url, job.target_language, json.dumps(job.target_languages),
+                    job.srt_type, job.status.value, job.progress, job.message, job.error,
+                    job.created_at.isoformat(), job.updated_at.isoformat(),
+                ),
+            )
+            self._write_result(job.id, job.result)
+            self._conn.commit()
+
+    def get(self, job_id: str, fields: Collection[str] | None = None) -> JobInfo | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            return self._row_to_job(row, self._read_result(job_id, fields))
+
+    def update(self, job_id, status=None, progress=None, message=None, error=None, result=None):
+        """
+        Update the hot row, and the given result fields only.
+
+        To keep progress ticks cheap, the returned job's result holds only
+        the fields that were given.
+        """
+        fields = {"updated_at": datetime.now().isoformat()}
+        if status is not None:
+            fields["status"] = status.value
+        if progress is not None:
+            fields["progress"] = progress
+        if message is not None:
+            fields["message"] = message
+        if error is not None:
+            fields["error"] = error
+
+        with self._lock:
+            assignments = ", ".join(f"{name} = ?" for name in fields)
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            if cursor.rowcount == 0:
+                return None
+
+            if result is not None:
+                self._write_result(job_id, result)
+            self._conn.commit()
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            return self._row_to_job(row, dict(result or {}))
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            self._conn.execute("DELETE FROM job_result_fields WHERE job_id = ?", (job_id,))
+            cursor = self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def evict_expired(self, ttl_seconds: float) -> int:
+        cutoff = (datetime.now() - timedelta(seconds=ttl_seconds)).isoformat()
+        statuses = [s.value for s in FINISHED_STATUSES]
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM job_result_fields WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE updated_at < ? AND status IN (?, ?))",
+                (cutoff, *statuses),
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE updated_at < ? AND status IN (?, ?)",
+                (cutoff, *statuses),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+
+def create_store(backend: str = config.JOB_STORE) -> JobStore:
+    """Create the configured job store backend."""
+    if backend == "memory":
+        if config.RUN_MODE != "inline":
+            raise ValueError("The memory job store cannot be shared between processes")
+        return MemoryJobStore()
+    if backend == "sqlite":
+        # With separate API and worker processes, a restarting process must not
+        # fail jobs that another process is still running
+        return SQLiteJobStore(config.JOB_DB_PATH, fail_interrupted=config.RUN_MODE == "inline")
+    raise ValueError(f"Unknown job store backend: {backend}")
 
 
-def create_job(youtube_url: str, target_language: str, srt_type: str) -> JobInfo:
+store: JobStore = create_store()
+_last_eviction = 0.0
+
+
+def _evict_expired_jobs():
+    """Apply the job TTL, at most once a minute."""
+    global _last_eviction
+    now = time.monotonic()
+    if now - _last_eviction < 60:
+        return
+    _last_eviction = now
+    evicted = store.evict_expired(config.JOB_TTL_SECONDS)
+    if evicted:
+        logger.info(f"Evicted {evicted} expired jobs")
+
+
+def create_job(
+    youtube_url: str,
+    target_language: str,
+    srt_type: str,
+    target_languages: list[str] | None = None,
+) -> JobInfo:
     """Create a new job."""
+    _evict_expired_jobs()
     job_id = str(uuid.uuid4())
     job = JobInfo(
         id=job_id,
         youtube_url=youtube_url,
         target_language=target_language,
         srt_type=srt_type,
+        target_languages=target_languages or [target_language],
     )
-    jobs[job_id] = job
+    store.add(job)
     return job
 
 
-def get_job(job_id: str) -> JobInfo | None:
-    """Get job by ID."""
-    return jobs.get(job_id)
+def get_job(job_id: str, fields: Collection[str] | None = None) -> JobInfo | None:
+    """Get job by ID, loading only the given result fields unless fields is None."""
+    return store.get(job_id, fields)
 
 
 def update_job(
@@ -63,31 +378,79 @@ def update_job(
     result: dict[str, Any] | None = None,
 ) -> JobInfo | None:
     """Update job status and progress."""
-    job = jobs.get(job_id)
-    if not job:
-        return None
-
-    if status is not None:
-        job.status = status
-    if progress is not None:
-        job.progress = progress
-    if message is not None:
-        job.message = message
-    if error is not None:
-        job.error = error
-    if result is not None:
-        job.result.update(result)
-    job.updated_at = datetime.now()
-
-    return job
+    return store.update(job_id, status, progress, message, error, result)
 
 
 def delete_job(job_id: str) -> bool:
     """Delete job by ID."""
-    if job_id in jobs:
-        del jobs[job_id]
-        return True
-    return False
+    return store.delete(job_id)
+
+
+# The functions above block on the store: SQLite I/O and JSON encoding of
+# results that can be megabytes. Async code uses the variants below, which run
+# them in worker threads. Writes share one thread so they apply in the order
+# they were made, and an earlier progress update never overwrites a later one.
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-writer")
+
+
+def _log_failed_update(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Job update failed: {future.exception()}")
+
+
+def submit_update(
+    job_id: str,
+    status: JobStatus | None = None,
+    progress: int | None = None,
+    message: str | None = None,
+    error: str | None = None,
+    result: dict[str, Any] | None = None,
+) -> Future:
+    """Queue a job update without waiting for it, e.g. from a progress callback on the event loop."""
+    future = _writer.submit(update_job, job_id, status, progress, message, error, result)
+    future.add_done_callback(_log_failed_update)
+    return future
+
+
+async def create_job_async(
+    youtube_url: str,
+    target_language: str,
+    srt_type: str,
+    target_languages: list[str] | None = None,
+) -> JobInfo:
+    """Create a new job from async code."""
+    return await asyncio.wrap_future(
+        _writer.submit(create_job, youtube_url, target_language, srt_type, target_languages)
+    )
+
+
+async def get_job_async(job_id: str, fields: Collection[str] | None = None) -> JobInfo | None:
+    """Get job by ID from async code; see get_job."""
+    return await asyncio.to_thread(store.get, job_id, fields)
+
+
+async def update_job_async(
+    job_id: str,
+    status: JobStatus | None = None,
+    progress: int | None = None,
+    message: str | None = None,
+    error: str | None = None,
+    result: dict[str, Any] | None = None,
+) -> JobInfo | None:
+    """Update job status and progress from async code."""
+    return await asyncio.wrap_future(
+        _writer.submit(update_job, job_id, status, progress, message, error, result)
+    )
+
+
+async def delete_job_async(job_id: str) -> bool:
+    """Delete job by ID from async code."""
+    return await asyncio.wrap_future(_writer.submit(delete_job, job_id))
+
+
+def result_summary(result: dict[str, Any]) -> dict[str, Any]:
+    """Return the summary fields of a job result."""
+    return {key: result[key] for key in SUMMARY_FIELDS if key in result}
 
 
 def job_to_dict(job: JobInfo) -> dict:
@@ -96,6 +459,7 @@ def job_to_dict(job: JobInfo) -> dict:
         "id": job.id,
         "youtube_url": job.youtube_url,
         "target_language": job.target_language,
+        "target_languages": job.target_languages,
         "srt_type": job.srt_type,
         "status": job.status.value,
         "progress": job.progress,
@@ -1,10 +1,14 @@
 """FastAPI application entry point."""
 
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import process, websocket
+from app.broker import get_broker
+from app.core import clients, config
 from app.core.config import SUPPORTED_LANGUAGES
 
 # Configure logging
@@ -13,10 +17,34 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown."""
+    websocket.progress_bus.bind(asyncio.get_running_loop())
+    clients.registry.start_reaper()
+    if config.RUN_MODE == "api":
+        # Jobs run in worker processes; forward their progress to our websockets
+        task = asyncio.create_task(
+            get_broker().relay_events(websocket.deliver_event, config.BROKER_POLL_INTERVAL)
+        )
+        yield
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    else:
+        await asyncio.to_thread(process.storage.reconcile)
+        process.scheduler.start()
+        yield
+        await process.scheduler.stop()
+    await websocket.progress_bus.close()
+    await clients.registry.close_all()
+
+
 app = FastAPI(
     title="YouTube Caption Generator API",
     description="Generate subtitles for YouTube videos with translation",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware for frontend
@@ -0,0 +1,102 @@
+"""JSON responses with fast encoding, compression and ETag revalidation."""
+
+import gzip
+import json
+import hashlib
+from typing import Any
+
+from fastapi import Request, Response
+
+from app.core.segments import json_default
+
+# orjson and brotli are dependencies; fall back to the standard library and
+# to brotlicffi (the same API) where they are not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, default=json_default)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8")
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from the values a response depends on."""
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match already matches etag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip() for tag in header.split(",")}
+    # Weak comparison: W/"x" matches "x"
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def _accepted_encodings(request: Request) -> set[str]:
+    encodings = set()
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, *params = (part.strip() for part in item.split(";"))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if name and quality > 0:
+            encodings.add(name.lower())
+    return encodings
+
+
+def json_response(
+    request: Request,
+    data: Any,
+    etag: str | None = None,
+    min_compress_size: int = 1024,
+) -> Response:
+    """
+    Encode data as JSON, compressing large bodies with brotli or gzip.
+
+    Args:
+        request: Incoming request, for Accept-Encoding and If-None-Match
+        data: JSON-serializable response data
+        etag: ETag of the response; a matching If-None-Match gets a 304
+        min_compress_size: Smallest body in bytes worth compressing
+
+    Returns:
+        JSON response, or an empty 304 response
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if etag is not None:
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "no-cache"
+        if not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+
+    body = dumps(data)
+    if len(body) >= min_compress_size:
+        encodings = _accepted_encodings(request)
+        if brotli is not None and "br" in encodings:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in encodings:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
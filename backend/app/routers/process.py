@@ -1,33 +1,85 @@
 """Processing API router."""
 
 import os
+import time
 import asyncio
 import logging
-from fastapi import APIRouter, BackgroundTasks, Header, HTTPException
-from fastapi.responses import FileResponse
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
 from app import jobs
+from app.broker import get_broker
 from app.jobs import JobStatus, job_to_dict
-from app.core import downloader, transcriber, translator, captioner
+from app.core import clients, config, downloader, ratelimit, transcriber, translator, captioner
+from app.core.audio import AudioChunk, SilenceChunker
+from app.core.cache import TranscriptionCache
 from app.core.config import get_language_name
-from app.routers.websocket import send_progress, send_completed, send_error
+from app.core.segment_index import SegmentIndex
+from app.core.segments import SegmentStore
+from app.core.storage import StorageManager
+from app.core.translation_memory import TranslationMemory
+from app.responses import json_response, make_etag, not_modified
+from app.scheduler import QueueFullError, Scheduler, Stage
+from app.singleflight import SingleFlight
+from app.routers.websocket import event_log, manager, progress_bus, publish_progress, send_progress, send_completed, send_error
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 # Storage directory
-STORAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "storage")
+STORAGE_DIR = config.STORAGE_DIR
 os.makedirs(STORAGE_DIR, exist_ok=True)
 
+transcription_cache = TranscriptionCache(
+    os.path.join(STORAGE_DIR, "_cache", "transcriptions"),
+    max_bytes=int(config.TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024),
+)
+translation_memory = TranslationMemory(
+    os.path.join(STORAGE_DIR, "_cache", "translation_memory.db"),
+    max_entries=config.TRANSLATION_MEMORY_MAX_ENTRIES,
+)
+
+# Index of the audio, transcriptions and subtitles under STORAGE_DIR, for reuse and quota eviction
+storage = StorageManager(
+    STORAGE_DIR,
+    config.STORAGE_INDEX_PATH,
+    quota_bytes=int(config.STORAGE_QUOTA_MB * 1024 * 1024),
+    pin_ttl=config.STORAGE_PIN_TTL_SECONDS,
+)
+
+# Transcriptions sending audio to the API at once: transcribe-stage jobs and
+# streaming ingests share the transcribe stage's worker count
+transcribe_slots = asyncio.Semaphore(config.TRANSCRIBE_WORKERS)
+
+# Deduplicates download/transcription of the same video across concurrent jobs;
+# worker processes also take a file lock per flight so they do not duplicate each other
+pipeline_flights = SingleFlight(
+    os.path.join(STORAGE_DIR, "_cache", "locks") if config.RUN_MODE == "worker" else None
+)
+
+# Segment indexes of recently queried tracks: (job_id, track) -> (updated_at, index).
+# Built in worker threads, hence the lock.
+segment_indexes: OrderedDict[tuple[str, str], tuple[str, SegmentIndex]] = OrderedDict()
+segment_indexes_lock = threading.Lock()
+
 
 class ProcessRequest(BaseModel):
     youtube_url: str
     target_language: str = "ko"
+    target_languages: list[str] | None = None  # overrides target_language when set
     srt_type: str = "both"  # source, translated, both
     max_line_length: int = 80
     pause_threshold: float = 1.0
+    priority: int = 0  # higher runs first
+    start: float | None = None  # clip window in seconds; only this part is processed
+    end: float | None = None
+    clip_timestamps: str = "relative"  # relative (to start), absolute (video time)
 
 
 class ProcessResponse(BaseModel):
@@ -35,60 +87,274 @@ class ProcessResponse(BaseModel):
     status: str
 
 
-@router.post("/process", response_model=ProcessResponse)
+@router.post(
+    "/process",
+    response_model=ProcessResponse,
+    responses={503: {"description": "Job queue is full; retry after the Retry-After header"}},
+)
 async def start_processing(
     request: ProcessRequest,
-    background_tasks: BackgroundTasks,
     x_openai_key: str = Header(..., alias="X-OpenAI-Key"),
 ):
-    """Start video processing job."""
-    # Validate language
-    lang_name = get_language_name(request.target_language)
-    if not lang_name:
-        raise HTTPException(status_code=400, detail=f"Unsupported language: {request.target_language}")
+    """Queue a video processing job."""
+    # Validate languages
+    target_languages = list(dict.fromkeys(request.target_languages or [request.target_language]))
+    if not target_languages:
+        raise HTTPException(status_code=400, detail="No target language given")
+    for code in target_languages:
+        if not get_language_name(code):
+            raise HTTPException(status_code=400, detail=f"Unsupported language: {code}")
+
+    # Validate clip window
+    clip_start = request.start or 0.0
+    if clip_start < 0 or (request.end is not None and request.end <= clip_start):
+        raise HTTPException(status_code=400, detail="Invalid clip window: need 0 <= start < end")
+    if request.clip_timestamps not in ("relative", "absolute"):
+        raise HTTPException(status_code=400, detail=f"Invalid clip_timestamps: {request.clip_timestamps}")
+
+    # Reject before creating the job so a full queue leaves nothing behind
+    if _queue_full():
+        raise _queue_full_error(config.QUEUE_RETRY_AFTER)
 
     # Create job
-    job = jobs.create_job(
+    job = await jobs.create_job_async(
         youtube_url=request.youtube_url,
-        target_language=request.target_language,
+        target_language=target_languages[0],
         srt_type=request.srt_type,
+        target_languages=target_languages,
     )
 
-    # Start background processing
-    background_tasks.add_task(
-        run_pipeline,
+    # Queue for background processing
+    ctx = PipelineJob(
         job.id,
         request.youtube_url,
-        request.target_language,
+        target_languages,
         request.srt_type,
         request.max_line_length,
         request.pause_threshold,
         x_openai_key,
+        clip_start=clip_start,
+        clip_end=request.end,
+        clip_timestamps=request.clip_timestamps,
     )
+    # Set before enqueueing so a worker's first update is not overwritten
+    await jobs.update_job_async(job.id, message="Queued")
+    try:
+        if config.RUN_MODE == "api":
+            # Worker processes claim the job from the shared broker queue
+            get_broker().enqueue(job.id, ctx.payload(), x_openai_key, priority=request.priority)
+        else:
+            scheduler.submit(job.id, ctx, priority=request.priority)
+    except QueueFullError as e:
+        await jobs.delete_job_async(job.id)
+        raise _queue_full_error(e.retry_after)
 
     return ProcessResponse(job_id=job.id, status=job.status.value)
 
 
+def _queue_full() -> bool:
+    if config.RUN_MODE == "api":
+        return get_broker().queued_count() >= config.MAX_QUEUED_JOBS
+    return scheduler.queues[0].full()
+
+
+def _queue_full_error(retry_after: int) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Job queue is full",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def _queue_position(job_id: str) -> dict | None:
+    if config.RUN_MODE == "api":
+        position = get_broker().queue_position(job_id)
+        return {"stage": "queued", "position": position} if position is not None else None
+    return scheduler.queue_position(job_id)
+
+
 @router.get("/jobs/{job_id}")
-async def get_job_status(job_id: str):
-    """Get job status."""
-    job = jobs.get_job(job_id)
+async def get_job_status(job_id: str, request: Request, fields: str | None = None):
+    """
+    Get job status.
+
+    The result holds only the summary fields (video_id, source_language, ...)
+    unless fields names more result fields, comma-separated, or "*" for the
+    whole result. Responses carry an ETag; a matching If-None-Match returns
+    304 without loading the result.
+    """
+    if fields == "*":
+        selected = None
+    else:
+        extra = [name.strip() for name in (fields or "").split(",") if name.strip()]
+        selected = list(dict.fromkeys([*jobs.SUMMARY_FIELDS, *extra]))
+
+    job = await jobs.get_job_async(job_id, fields=())
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    queue = _queue_position(job_id)
+    etag = make_etag(job.id, job.updated_at.isoformat(), selected, queue)
+    if not_modified(request, etag):
+        return json_response(request, None, etag=etag)
+
+    # The job may have changed since the check; tag what is actually returned
+    job = await jobs.get_job_async(job_id, fields=selected)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    data = job_to_dict(job)
+    data["queue"] = queue
+    etag = make_etag(job.id, job.updated_at.isoformat(), selected, queue)
+    return json_response(request, data, etag=etag, min_compress_size=config.COMPRESS_MIN_BYTES)
+
+
+@router.get("/stats")
+async def get_stats():
+    """Get queue, progress event, websocket, event log, cache, storage, client pool and rate limiter statistics."""
+    return {
+        "queues": (
+            {"queued": {"queued": await asyncio.to_thread(get_broker().queued_count)}}
+            if config.RUN_MODE == "api"
+            else scheduler.stats()
+        ),
+        "progress_events": progress_bus.stats(),
+        "websockets": manager.stats(),
+        "event_log": event_log.stats(),
+        "openai_clients": clients.registry.stats(),
+        "rate_limiter": ratelimit.stats(),
+        "transcription_cache": await asyncio.to_thread(transcription_cache.stats),
+        "translation_memory": await asyncio.to_thread(translation_memory.stats),
+        "storage": await asyncio.to_thread(storage.stats),
+    }
+
+
+def _load_track(job_id: str, track: str) -> tuple[jobs.JobInfo, list[dict]]:
+    """Load the subtitle segments of a job's track, loading no other result fields."""
+    field_name = f"{track}_segments" if track in ("source", "translated") else "translations"
+    job = jobs.get_job(job_id, fields=["video_id", field_name])
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return job_to_dict(job)
+
+    if track in ("source", "translated"):
+        segments = job.result.get(field_name)
+    else:
+        translation = job.result.get("translations", {}).get(track)
+        segments = translation["translated_segments"] if translation else None
+    if segments is None:
+        raise HTTPException(status_code=404, detail=f"Track not found: {track}")
+    return job, segments
+
+
+def _segment_index(job_id: str, track: str) -> tuple[str, SegmentIndex]:
+    """
+    Get the sorted index of a job's track, building it on first use.
+
+    Building sorts the whole track, so call this from a worker thread.
+
+    Returns:
+        Tuple of (job version the index was built from, index)
+    """
+    job = jobs.get_job(job_id, fields=())
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    key = (job_id, track)
+    with segment_indexes_lock:
+        cached = segment_indexes.get(key)
+        if cached is not None and cached[0] == job.updated_at.isoformat():
+            segment_indexes.move_to_end(key)
+            return cached
+
+    job, segments = _load_track(job_id, track)
+    entry = (job.updated_at.isoformat(), SegmentIndex(segments))
+    with segment_indexes_lock:
+        segment_indexes[key] = entry
+        while len(segment_indexes) > config.SEGMENT_INDEX_CACHE_SIZE:
+            segment_indexes.popitem(last=False)
+    return entry
+
+
+def _warm_segment_indexes(job_id: str, tracks: list[str]):
+    """Build the segment indexes of a finished job's tracks before the first query asks for them."""
+    for track in tracks:
+        try:
+            _segment_index(job_id, track)
+        except HTTPException as e:
+            logger.warning(f"Could not index track {track} of job {job_id}: {e.detail}")
+
+
+@router.get("/jobs/{job_id}/segments")
+async def get_segments(
+    job_id: str,
+    request: Request,
+    track: str = "source",
+    start: float = Query(0.0, ge=0),
+    end: float | None = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+):
+    """
+    Get the segments of a track that overlap the time window [start, end).
+
+    track is "source", "translated" (first target language) or a target
+    language code. When more segments match than limit, next_cursor is set;
+    pass it as cursor to get the next page.
+    """
+    try:
+        position = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if position < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    version, index = await asyncio.to_thread(_segment_index, job_id, track)
+    found, next_position = index.query(start, float("inf") if end is None else end, limit, position)
+    data = {
+        "track": track,
+        "total": len(index),
+        "segments": [{"index": i, **segment} for i, segment in found],
+        "next_cursor": str(next_position) if next_position is not None else None,
+    }
+    etag = make_etag(job_id, track, version, start, end, limit, position)
+    return json_response(request, data, etag=etag, min_compress_size=config.COMPRESS_MIN_BYTES)
+
+
+@router.get("/jobs/{job_id}/subtitles/{track}")
+async def stream_subtitles(job_id: str, track: str, format: str = "srt"):
+    """
+    Stream a track's subtitles as SRT, WebVTT ("vtt") or JSON lines ("jsonl").
+
+    track is "source", "translated" (first target language) or a target
+    language code. The file is serialized block by block while it is sent.
+    """
+    if format not in captioner.SUBTITLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format: {format}")
+
+    job, segments = await asyncio.to_thread(_load_track, job_id, track)
+    _, media_type, extension = captioner.SUBTITLE_FORMATS[format]
+    filename = f"{job.result.get('video_id', job_id)}_{track}.{extension}"
+    return StreamingResponse(
+        captioner.iter_subtitle_blocks(segments, format),
+        media_type=f"{media_type}; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/jobs/{job_id}/download/{file_type}")
 async def download_file(job_id: str, file_type: str):
-    """Download generated file."""
-    job = jobs.get_job(job_id)
+    """
+    Download generated file.
+
+    file_type is "source_srt", "translated_srt" (first target language) or
+    "translated_<lang>_srt" for a specific target language.
+    """
+    file_key = f"{file_type}_path"
+    job = await jobs.get_job_async(job_id, fields=[file_key])
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
 
     if job.status != JobStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Job not completed")
 
-    file_key = f"{file_type}_path"
     if file_key not in job.result:
         raise HTTPException(status_code=404, detail=f"File not found: {file_type}")
 
@@ -100,143 +366,615 @@ async def download_file(job_id: str, file_type: str):
     return FileResponse(filepath, filename=filename)
 
 
-async def run_pipeline(
-    job_id: str,
-    youtube_url: str,
-    target_language: str,
-    srt_type: str,
-    max_line_length: int,
-    pause_threshold: float,
-    openai_key: str,
-):
-    """Run the processing pipeline in background."""
-    try:
-        # Get video ID and create output directory
-        video_id = downloader.get_video_id(youtube_url)
-        output_dir = os.path.join(STORAGE_DIR, video_id)
-        os.makedirs(output_dir, exist_ok=True)
-
-        result = {"video_id": video_id}
-
-        # Step 1: Download audio (0-25%)
-        jobs.update_job(job_id, status=JobStatus.DOWNLOADING, progress=0, message="Downloading audio...")
-        await send_progress(job_id, "downloading", 0, "Downloading audio...")
-
-        # Run sync function in thread pool
-        loop = asyncio.get_event_loop()
-        audio_path = await loop.run_in_executor(
-            None,
-            downloader.download_youtube_audio,
+def _job_progress_writer(job_id: str):
+    """
+    Make a (progress%, message) function that records progress in the job store.
+
+    Writes are throttled like progress events, to PROGRESS_MAX_RATE per
+    second, and queued without waiting, so it can be called from worker
+    threads and from the event loop.
+    """
+    min_interval = 1.0 / config.PROGRESS_MAX_RATE if config.PROGRESS_MAX_RATE > 0 else 0.0
+    last_write = float("-inf")
+    lock = threading.Lock()
+
+    def write(progress: int, message: str):
+        nonlocal last_write
+        now = time.monotonic()
+        with lock:
+            if now - last_write < min_interval:
+                return
+            last_write = now
+        jobs.submit_update(job_id, progress=progress, message=message)
+    return write
+
+
+def _scaled_progress(job_id: str, status: str, start: int, end: int):
+    """Make a (progress%, message) callback that reports progress scaled into [start, end]."""
+    write = _job_progress_writer(job_id)
+
+    def callback(progress: int, message: str):
+        scaled = start + int(progress * (end - start) / 100)
+        publish_progress(job_id, status, scaled, message)
+        write(scaled, message)
+    return callback
+
+
+async def _download_audio(
+    youtube_url: str, output_dir: str, file_stem: str, section=None, progress_callback=None
+) -> downloader.AudioDownload:
+    """Download and convert audio with the configured profile in the thread pool."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None,
+        lambda: downloader.download_audio(
             youtube_url,
             output_dir,
-            video_id,
-        )
-        result["audio_path"] = audio_path
+            file_stem,
+            profile=config.AUDIO_PROFILE,
+            codec=config.SPEECH_AUDIO_CODEC,
+            sample_rate=config.SPEECH_SAMPLE_RATE,
+            bitrate=config.SPEECH_AUDIO_BITRATE,
+            section=section,
+            progress_callback=progress_callback,
+        ),
+    )
 
-        jobs.update_job(job_id, progress=25, message="Audio download complete")
-        await send_progress(job_id, "downloading", 25, "Audio download complete")
 
-        # Step 2: Transcribe (25-50%)
-        jobs.update_job(job_id, status=JobStatus.TRANSCRIBING, progress=25, message="Transcribing audio...")
-        await send_progress(job_id, "transcribing", 25, "Transcribing audio...")
+async def _transcribe_audio(
+    audio_path: str, openai_key: str, progress_callback=None, source_key: str | None = None
+) -> tuple[dict, str]:
+    """
+    Transcribe audio, using the transcription cache when possible.
 
-        transcription = await loop.run_in_executor(
-            None,
-            transcriber.transcribe_audio,
+    A new transcription is cached under the audio's hash and source_key.
+
+    Returns:
+        Tuple of (transcription, cache status "hit" or "miss")
+    """
+    loop = asyncio.get_event_loop()
+    cache_key = await loop.run_in_executor(None, transcription_cache.key, audio_path)
+    transcription = await loop.run_in_executor(None, transcription_cache.get, cache_key)
+    if transcription is not None:
+        return transcription, "hit"
+
+    async with transcribe_slots:
+        transcription = await transcriber.transcribe_audio(
             audio_path,
             openai_key,
+            split_on_silence=config.TRANSCRIPTION_SPLIT_ON_SILENCE,
+            max_chunk_seconds=config.TRANSCRIPTION_MAX_CHUNK_SECONDS,
+            max_chunk_bytes=int(config.TRANSCRIPTION_MAX_CHUNK_MB * 1024 * 1024),
+            max_concurrency=config.TRANSCRIPTION_MAX_CONCURRENCY,
+            progress_callback=progress_callback,
         )
-        result["transcription"] = transcription
-        result["source_language"] = transcription.get("language_code", "en")
+    await loop.run_in_executor(None, transcription_cache.put, cache_key, transcription, source_key)
+    return transcription, "miss"
 
-        jobs.update_job(job_id, progress=50, message="Transcription complete")
-        await send_progress(job_id, "transcribing", 50, "Transcription complete")
 
-        # Step 3: Translate (50-75%) - only if needed
-        if srt_type in ["translated", "both"]:
-            jobs.update_job(job_id, status=JobStatus.TRANSLATING, progress=50, message="Translating...")
-            await send_progress(job_id, "translating", 50, "Translating...")
-
-            lang_name = get_language_name(target_language)
-
-            def translate_with_progress():
-                def progress_callback(progress: int, message: str):
-                    # Scale progress from 0-100 to 50-75
-                    scaled = 50 + int(progress * 0.25)
-                    jobs.update_job(job_id, progress=scaled, message=message)
-                    # Note: Can't await in sync callback, so we skip WebSocket here
-                    # Progress will be sent via polling
+async def _stream_ingest(
+    youtube_url: str,
+    output_dir: str,
+    file_stem: str,
+    openai_key: str,
+    section=None,
+    progress_callback=None,
+    source_key: str | None = None,
+) -> tuple[downloader.AudioDownload, dict]:
+    """
+    Download audio and transcribe it chunk by chunk as it arrives, so the two overlap.
+
+    ffmpeg writes short fixed-length parts; they are regrouped into chunks
+    cut at silences within the same duration and size budget as a chunked
+    file transcription. The transcription is stored in the transcription
+    cache under the finished audio file and source_key, like a
+    transcription of the downloaded file.
+
+    Returns:
+        Tuple of (download, transcription)
+    """
+    loop = asyncio.get_running_loop()
+    stream = await loop.run_in_executor(None, downloader.resolve_audio_stream, youtube_url, config.AUDIO_PROFILE)
+
+    # Download and transcription each make up half of the progress
+    parts = {"download": 0, "transcribe": 0}
+
+    def part_progress(part: str):
+        def callback(progress: int, message: str):
+            parts[part] = progress
+            if progress_callback:
+                progress_callback(sum(parts.values()) // 2, message)
+        return callback
+
+    segments: asyncio.Queue[AudioChunk | None] = asyncio.Queue()
+    stop = threading.Event()
+    failed = threading.Event()
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as segment_dir:
+        chunker = SilenceChunker(
+            segment_dir,
+            min(config.STREAMING_SEGMENT_SECONDS, config.TRANSCRIPTION_MAX_CHUNK_SECONDS),
+            int(config.TRANSCRIPTION_MAX_CHUNK_MB * 1024 * 1024),
+        )
 
-                return translator.translate_text(
-                    transcription,
-                    lang_name,
+        async def finished_chunks():
+            while (segment := await segments.get()) is not None:
+                for chunk in await loop.run_in_executor(None, chunker.add, segment):
+                    yield chunk
+            if not failed.is_set():
+                for chunk in await loop.run_in_executor(None, chunker.finish):
+                    yield chunk
+
+        def ingest() -> downloader.AudioDownload:
+            try:
+                return downloader.stream_audio(
+                    stream,
+                    output_dir,
+                    file_stem,
+                    segment_dir,
+                    config.STREAMING_PART_SECONDS,
+                    profile=config.AUDIO_PROFILE,
+                    codec=config.SPEECH_AUDIO_CODEC,
+                    sample_rate=config.SPEECH_SAMPLE_RATE,
+                    bitrate=config.SPEECH_AUDIO_BITRATE,
+                    section=section,
+                    on_segment=lambda segment: loop.call_soon_threadsafe(segments.put_nowait, segment),
+                    progress_callback=part_progress("download"),
+                    stop=stop,
+                )
+            except BaseException:
+                failed.set()
+                raise
+            finally:
+                loop.call_soon_threadsafe(segments.put_nowait, None)
+
+        download_task = loop.run_in_executor(None, ingest)
+        try:
+            async with transcribe_slots:
+                transcription = await transcriber.transcribe_stream(
+                    finished_chunks(),
                     openai_key,
-                    progress_callback=progress_callback,
+                    max_concurrency=config.TRANSCRIPTION_MAX_CONCURRENCY,
+                    duration=downloader.section_duration(stream["duration"], section),
+                    progress_callback=part_progress("transcribe"),
                 )
+        except BaseException:
+            # Stop ffmpeg and let it exit before its segment directory is removed
+            stop.set()
+            await asyncio.wait([download_task])
+            raise
+        download = await download_task
 
-            translated_segments = await loop.run_in_executor(None, translate_with_progress)
-            result["translated_segments"] = translated_segments
+    cache_key = await loop.run_in_executor(None, transcription_cache.key, download.path)
+    await loop.run_in_executor(None, transcription_cache.put, cache_key, transcription, source_key)
+    return download, transcription
 
-            jobs.update_job(job_id, progress=75, message="Translation complete")
-            await send_progress(job_id, "translating", 75, "Translation complete")
-        else:
-            jobs.update_job(job_id, progress=75, message="Skipping translation")
-            await send_progress(job_id, "translating", 75, "Skipping translation")
 
-        # Step 4: Generate SRT (75-100%)
-        jobs.update_job(job_id, status=JobStatus.CAPTIONING, progress=75, message="Generating subtitles...")
-        await send_progress(job_id, "captioning", 75, "Generating subtitles...")
+@dataclass
+class PipelineJob:
+    """State carried by a job through the pipeline stages."""
 
-        # Source SRT
-        if srt_type in ["source", "both"]:
-            source_lang = transcription.get("language_code", "en")
-            srt_path, segments = await loop.run_in_executor(
-                None,
-                lambda: captioner.create_srt_file(
-                    transcription,
-                    "source",
-                    video_id,
-                    source_lang,
-                    output_dir,
-                    max_line_length,
-                    pause_threshold,
-                ),
+    job_id: str
+    youtube_url: str
+    target_languages: list[str]
+    srt_type: str
+    max_line_length: int
+    pause_threshold: float
+    openai_key: str
+    clip_start: float = 0.0
+    clip_end: float | None = None
+    clip_timestamps: str = "relative"
+    video_id: str = ""
+    file_stem: str = ""
+    output_dir: str = ""
+    audio_path: str = ""
+    transcription: dict = field(default_factory=dict)
+    result: dict = field(default_factory=dict)
+
+    def payload(self) -> dict:
+        """Return the request fields needed to rebuild the job in a worker process, except the API key."""
+        return {
+            "youtube_url": self.youtube_url,
+            "target_languages": self.target_languages,
+            "srt_type": self.srt_type,
+            "max_line_length": self.max_line_length,
+            "pause_threshold": self.pause_threshold,
+            "clip_start": self.clip_start,
+            "clip_end": self.clip_end,
+            "clip_timestamps": self.clip_timestamps,
+        }
+
+    def audio_params(self) -> dict:
+        """Parameters that determine the audio file, as indexed by the storage manager."""
+        params = {"profile": config.AUDIO_PROFILE, "section": self.section}
+        if config.AUDIO_PROFILE == "speech":
+            params.update(
+                codec=config.SPEECH_AUDIO_CODEC,
+                sample_rate=config.SPEECH_SAMPLE_RATE,
+                bitrate=config.SPEECH_AUDIO_BITRATE,
             )
-            result["source_srt_path"] = srt_path
-            result["source_segments"] = segments
+        return params
+
+    def transcription_params(self) -> dict:
+        """Parameters that determine the (clip-relative) transcription."""
+        return {"model": transcriber.TRANSCRIPTION_MODEL, "audio": self.audio_params()}
+
+    def transcription_source_key(self) -> str:
+        """Transcription cache key for the job's video and settings, known before the audio exists."""
+        return TranscriptionCache.source_key(self.video_id, self.transcription_params())
+
+    def subtitle_params(self, track: str, language: str) -> dict:
+        """Parameters that determine a subtitle file."""
+        params = {
+            "track": track,
+            "language": language,
+            "max_line_length": self.max_line_length,
+            "clip_timestamps": self.clip_timestamps,
+            "transcription": self.transcription_params(),
+        }
+        if track == "source":
+            params["pause_threshold"] = self.pause_threshold
+        return params
+
+    @property
+    def section(self) -> tuple[float, float | None] | None:
+        """Clip window as a (start, end) download section, or None for the whole video."""
+        if self.clip_start or self.clip_end is not None:
+            return self.clip_start, self.clip_end
+        return None
+
+
+async def _stage_download(ctx: PipelineJob):
+    """Step 1: Download audio (0-25%), unless the transcription is cached."""
+    # Get video ID and create output directory
+    ctx.video_id = downloader.get_video_id(ctx.youtube_url)
+    ctx.output_dir = os.path.join(STORAGE_DIR, ctx.video_id)
+    os.makedirs(ctx.output_dir, exist_ok=True)
+    ctx.result["video_id"] = ctx.video_id
+    # Clips get their own audio and subtitle files next to the full video's
+    ctx.file_stem = ctx.video_id
+    if ctx.section:
+        end = "end" if ctx.clip_end is None else f"{ctx.clip_end:g}"
+        ctx.file_stem = f"{ctx.video_id}_{ctx.clip_start:g}-{end}"
+        ctx.result["clip"] = {"start": ctx.clip_start, "end": ctx.clip_end, "timestamps": ctx.clip_timestamps}
+
+    # A cached transcription covers step 2, and no later step needs the audio
+    if await _load_cached_transcription(ctx):
+        await jobs.update_job_async(
+            ctx.job_id, status=JobStatus.DOWNLOADING, progress=25, message="Reusing cached transcription"
+        )
+        await send_progress(ctx.job_id, "downloading", 25, "Reusing cached transcription")
+        return
+
+    audio_params = ctx.audio_params()
+    stored = await asyncio.to_thread(storage.acquire, ctx.job_id, ctx.video_id, "audio", audio_params)
+    if stored is not None:
+        ctx.audio_path = stored.path
+        ctx.result["audio_path"] = ctx.audio_path
+        ctx.result["audio"] = {**stored.meta, "stored": True}
+        await jobs.update_job_async(
+            ctx.job_id, status=JobStatus.DOWNLOADING, progress=25, message="Reusing stored audio"
+        )
+        await send_progress(ctx.job_id, "downloading", 25, "Reusing stored audio")
+        return
+
+    # Pin the file before it is written, so evicting an older entry at the same path cannot delete it
+    audio_path = os.path.join(
+        ctx.output_dir, downloader.audio_filename(ctx.file_stem, config.AUDIO_PROFILE, config.SPEECH_AUDIO_CODEC)
+    )
+    await asyncio.to_thread(storage.pin, ctx.job_id, audio_path)
+
+    if config.STREAMING_INGEST:
+        # Transcribe segments while the download continues; covers steps 1 and 2 (0-50%)
+        await jobs.update_job_async(
+            ctx.job_id, status=JobStatus.DOWNLOADING, progress=0, message="Downloading and transcribing audio..."
+        )
+        await send_progress(ctx.job_id, "downloading", 0, "Downloading and transcribing audio...")
+        (download, ctx.transcription), shared = await pipeline_flights.run(
+            ("ingest", ctx.file_stem),
+            lambda report: _ingest_once(ctx, audio_params, report),
+            _scaled_progress(ctx.job_id, "downloading", 0, 50),
+            owner=ctx.openai_key,
+            retry_on=ratelimit.is_key_error,
+        )
+        ctx.result["transcription_cache"] = "shared" if shared else "streamed"
+        progress = 50
+    else:
+        await jobs.update_job_async(
+            ctx.job_id, status=JobStatus.DOWNLOADING, progress=0, message="Downloading audio..."
+        )
+        await send_progress(ctx.job_id, "downloading", 0, "Downloading audio...")
+        download, shared = await pipeline_flights.run(
+            ("download", ctx.file_stem),
+            lambda report: _download_once(ctx, audio_params, report),
+            _scaled_progress(ctx.job_id, "downloading", 0, 25),
+        )
+        progress = 25
+    ctx.audio_path = download.path
+    ctx.result["audio_path"] = ctx.audio_path
+    # Size and timing of the (possibly shared) download, e.g. bytes_saved and transcode_seconds
+    ctx.result["audio"] = download.stats()
+    await asyncio.to_thread(
+        storage.register, ctx.job_id, ctx.video_id, "audio", audio_params, download.path, ctx.result["audio"]
+    )
+
+    message = "Audio download complete (shared)" if shared else "Audio download complete"
+    await jobs.update_job_async(ctx.job_id, progress=progress, message=message)
+    await send_progress(ctx.job_id, "downloading", progress, message)
+
+
+async def _stored_by_other_process(ctx: PipelineJob, audio_params: dict) -> downloader.AudioDownload | None:
+    """Audio that a worker process holding the flight lock before this one stored, if any."""
+    if not pipeline_flights.lock_dir:
+        return None
+    stored = await asyncio.to_thread(storage.acquire, ctx.job_id, ctx.video_id, "audio", audio_params)
+    if stored is None:
+        return None
+    return downloader.AudioDownload.from_stats(stored.path, stored.meta)
+
+
+async def _download_once(ctx: PipelineJob, audio_params: dict, report) -> downloader.AudioDownload:
+    """Flight body of the download: reuse audio stored meanwhile, or download it."""
+    download = await _stored_by_other_process(ctx, audio_params)
+    if download is None:
+        download = await _download_audio(ctx.youtube_url, ctx.output_dir, ctx.file_stem, ctx.section, report)
+    return download
+
+
+async def _ingest_once(ctx: PipelineJob, audio_params: dict, report) -> tuple[downloader.AudioDownload, dict]:
+    """Flight body of the streaming ingest: transcribe audio stored meanwhile, or ingest it."""
+    download = await _stored_by_other_process(ctx, audio_params)
+    if download is not None:
+        # Usually a transcription cache hit
+        transcription, _ = await _transcribe_audio(
+            download.path, ctx.openai_key, report, ctx.transcription_source_key()
+        )
+        return download, transcription
+    return await _stream_ingest(
+        ctx.youtube_url,
+        ctx.output_dir,
+        ctx.file_stem,
+        ctx.openai_key,
+        ctx.section,
+        report,
+        ctx.transcription_source_key(),
+    )
+
+
+async def _load_cached_transcription(ctx: PipelineJob) -> bool:
+    """Load the job's transcription from the transcription cache by video and settings."""
+    transcription = await asyncio.to_thread(transcription_cache.get_by_source, ctx.transcription_source_key())
+    if transcription is None:
+        return False
+    ctx.transcription = transcription
+    ctx.result["transcription_cache"] = "hit"
+    return True
+
+
+async def _stage_transcribe(ctx: PipelineJob):
+    """Step 2: Transcribe (25-50%), unless streaming ingest already did or it is cached."""
+    if not ctx.transcription:
+        await jobs.update_job_async(
+            ctx.job_id, status=JobStatus.TRANSCRIBING, progress=25, message="Transcribing audio..."
+        )
+        await send_progress(ctx.job_id, "transcribing", 25, "Transcribing audio...")
+
+        # Jobs attaching to an in-flight transcription share the leader's API call
+        (ctx.transcription, cache_status), shared = await pipeline_flights.run(
+            ("transcribe", ctx.file_stem),
+            lambda report: _transcribe_audio(ctx.audio_path, ctx.openai_key, report, ctx.transcription_source_key()),
+            _scaled_progress(ctx.job_id, "transcribing", 25, 50),
+            # A follower with its own key retries after the leader's key is rejected
+            owner=ctx.openai_key,
+            retry_on=ratelimit.is_key_error,
+        )
+        ctx.result["transcription_cache"] = "shared" if shared else cache_status
+    if ctx.clip_start and ctx.clip_timestamps == "absolute":
+        # The clip's audio starts at 0; move segments to video time. The
+        # cached and shared transcription stays clip-relative.
+        segments = SegmentStore.from_dicts(ctx.transcription["segments"])
+        ctx.transcription = {**ctx.transcription, "segments": segments.shifted(ctx.clip_start)}
+    ctx.result["transcription"] = ctx.transcription
+    ctx.result["source_language"] = ctx.transcription.get("language_code", "en")
+
+    await jobs.update_job_async(ctx.job_id, progress=50, message="Transcription complete")
+    await send_progress(ctx.job_id, "transcribing", 50, "Transcription complete")
+
+
+async def _stage_translate(ctx: PipelineJob):
+    """Step 3: Translate (50-75%) - only if needed."""
+    job_id, target_languages = ctx.job_id, ctx.target_languages
+    if ctx.srt_type not in ["translated", "both"]:
+        await jobs.update_job_async(job_id, progress=75, message="Skipping translation")
+        await send_progress(job_id, "translating", 75, "Skipping translation")
+        return
+
+    await jobs.update_job_async(job_id, status=JobStatus.TRANSLATING, progress=50, message="Translating...")
+    await send_progress(job_id, "translating", 50, "Translating...")
+
+    # Translate into every target language concurrently
+    language_progress = {code: 0 for code in target_languages}
+    write_progress = _job_progress_writer(job_id)
+
+    async def translate_language(lang_code: str) -> tuple[list[dict], dict]:
+        lang_name = get_language_name(lang_code)
+        memory_session = translation_memory.session()
+
+        def progress_callback(progress: int, message: str):
+            # Scale the average progress across languages from 0-100 to 50-75
+            language_progress[lang_code] = progress
+            overall = sum(language_progress.values()) / len(language_progress)
+            scaled = 50 + int(overall * 0.25)
+            if len(target_languages) > 1:
+                message = f"[{lang_code}] {message}"
+            publish_progress(job_id, "translating", scaled, message)
+            write_progress(scaled, message)
+
+        translated = await translator.translate_text(
+            ctx.transcription,
+            lang_name,
+            ctx.openai_key,
+            progress_callback=progress_callback,
+            max_concurrency=config.TRANSLATION_MAX_CONCURRENCY,
+            memory=memory_session,
+            max_chunk_tokens=config.TRANSLATION_CHUNK_TOKENS,
+            batch_size=config.TRANSLATION_BATCH_SIZE,
+        )
+        return translated, memory_session.stats()
+
+    outcomes = await asyncio.gather(*(translate_language(code) for code in target_languages))
+    translations = {
+        code: {"translated_segments": translated, "translation_memory": memory_stats}
+        for code, (translated, memory_stats) in zip(target_languages, outcomes)
+    }
+    ctx.result["translations"] = translations
+
+    # The first language also fills the single-language result keys
+    primary = translations[target_languages[0]]
+    ctx.result["translated_segments"] = primary["translated_segments"]
+    ctx.result["translation_memory"] = primary["translation_memory"]
+
+    await jobs.update_job_async(job_id, progress=75, message="Translation complete")
+    await send_progress(job_id, "translating", 75, "Translation complete")
+
+
+async def _stage_caption(ctx: PipelineJob):
+    """Step 4: Generate SRT (75-100%) and complete the job."""
+    job_id, result = ctx.job_id, ctx.result
+    await jobs.update_job_async(job_id, status=JobStatus.CAPTIONING, progress=75, message="Generating subtitles...")
+    await send_progress(job_id, "captioning", 75, "Generating subtitles...")
+    loop = asyncio.get_event_loop()
+
+    # Source SRT
+    if ctx.srt_type in ["source", "both"]:
+        source_lang = ctx.transcription.get("language_code", "en")
+        # Pin each file before it is written, so a concurrent eviction of its old entry cannot delete it
+        await asyncio.to_thread(
+            storage.pin,
+            job_id,
+            captioner.srt_path(ctx.output_dir, ctx.file_stem, ctx.transcription.get("language_code", "source")),
+        )
+        srt_path, segments = await loop.run_in_executor(
+            None,
+            lambda: captioner.create_srt_file(
+                ctx.transcription,
+                "source",
+                ctx.file_stem,
+                source_lang,
+                ctx.output_dir,
+                ctx.max_line_length,
+                ctx.pause_threshold,
+            ),
+        )
+        result["source_srt_path"] = srt_path
+        result["source_segments"] = segments
+        await asyncio.to_thread(
+            storage.register, job_id, ctx.video_id, "subtitles", ctx.subtitle_params("source", source_lang), srt_path
+        )
 
-        # Translated SRT
-        if srt_type in ["translated", "both"]:
+    # Translated SRT, one per language
+    if ctx.srt_type in ["translated", "both"]:
+        for lang_code, translation in result["translations"].items():
+            await asyncio.to_thread(storage.pin, job_id, captioner.srt_path(ctx.output_dir, ctx.file_stem, lang_code))
             srt_path, segments = await loop.run_in_executor(
                 None,
-                lambda: captioner.create_srt_file(
-                    result["translated_segments"],
-                    "translated",
-                    video_id,
-                    target_language,
-                    output_dir,
-                    max_line_length,
-                ),
+                captioner.create_srt_file,
+                translation["translated_segments"],
+                "translated",
+                ctx.file_stem,
+                lang_code,
+                ctx.output_dir,
+                ctx.max_line_length,
+            )
+            translation["srt_path"] = srt_path
+            translation["translated_segments"] = segments
+            result[f"translated_{lang_code}_srt_path"] = srt_path
+            await asyncio.to_thread(
+                storage.register,
+                job_id,
+                ctx.video_id,
+                "subtitles",
+                ctx.subtitle_params("translated", lang_code),
+                srt_path,
             )
-            result["translated_srt_path"] = srt_path
-            result["translated_segments"] = segments
 
-        # Complete
-        jobs.update_job(
-            job_id,
-            status=JobStatus.COMPLETED,
-            progress=100,
-            message="Processing complete",
-            result=result,
-        )
-        await send_completed(job_id, {
-            "video_id": video_id,
-            "source_language": result.get("source_language"),
-            "has_source_srt": "source_srt_path" in result,
-            "has_translated_srt": "translated_srt_path" in result,
-        })
+        primary = result["translations"][ctx.target_languages[0]]
+        result["translated_srt_path"] = primary["srt_path"]
+        result["translated_segments"] = primary["translated_segments"]
+
+    result["has_source_srt"] = "source_srt_path" in result
+    result["has_translated_srt"] = "translated_srt_path" in result
+    result["translated_languages"] = list(result.get("translations", {}))
+
+    # Complete
+    await jobs.update_job_async(
+        job_id,
+        status=JobStatus.COMPLETED,
+        progress=100,
+        message="Processing complete",
+        result=result,
+    )
+    await send_completed(job_id, jobs.result_summary(result))
+    await _finish_job(job_id)
+
+    if config.RUN_MODE == "inline":
+        # Segment queries are answered by this process; index the tracks now, off the event loop
+        tracks = (["source"] if result["has_source_srt"] else []) + (
+            ["translated", *result["translated_languages"]] if result["has_translated_srt"] else []
+        )
+        await asyncio.to_thread(_warm_segment_indexes, job_id, tracks)
+
+
+async def _fail_pipeline(ctx: PipelineJob, error: Exception):
+    """Mark a job as failed and notify clients."""
+    await jobs.update_job_async(ctx.job_id, status=JobStatus.FAILED, error=str(error))
+    await send_error(ctx.job_id, str(error))
+    await _finish_job(ctx.job_id)
+
+
+async def _finish_job(job_id: str):
+    """Unpin a finished or failed job's files and, in a worker, drop it and its API key from the broker."""
+    await asyncio.to_thread(storage.release, job_id)
+    if config.RUN_MODE == "worker":
+        await asyncio.to_thread(get_broker().ack, job_id)
 
+
+PIPELINE_STAGES = [
+    Stage("download", _stage_download, config.DOWNLOAD_WORKERS),
+    Stage("transcribe", _stage_transcribe, config.TRANSCRIBE_WORKERS),
+    Stage("translate", _stage_translate, config.TRANSLATE_WORKERS),
+    Stage("caption", _stage_caption, config.CAPTION_WORKERS),
+]
+
+scheduler = Scheduler(
+    PIPELINE_STAGES,
+    on_error=_fail_pipeline,
+    max_queued=config.MAX_QUEUED_JOBS,
+    stage_queue_size=config.STAGE_QUEUE_SIZE,
+    retry_after=config.QUEUE_RETRY_AFTER,
+)
+
+
+async def run_pipeline(
+    job_id: str,
+    youtube_url: str,
+    target_languages: list[str],
+    srt_type: str,
+    max_line_length: int,
+    pause_threshold: float,
+    openai_key: str,
+    clip_start: float = 0.0,
+    clip_end: float | None = None,
+    clip_timestamps: str = "relative",
+):
+    """Run every pipeline stage for a job directly, without the scheduler."""
+    ctx = PipelineJob(
+        job_id, youtube_url, target_languages, srt_type, max_line_length, pause_threshold, openai_key,
+        clip_start, clip_end, clip_timestamps,
+    )
+    try:
+        for stage in PIPELINE_STAGES:
+            await stage.handler(ctx)
     except Exception as e:
         logger.exception(f"Pipeline error: {e}")
-        jobs.update_job(job_id, status=JobStatus.FAILED, error=str(e))
-        await send_error(job_id, str(e))
+        await _fail_pipeline(ctx, e)
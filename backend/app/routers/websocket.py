@@ -1,66 +1,252 @@
 """WebSocket router for real-time progress updates."""
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Set
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from collections import deque
+from typing import Callable
+import asyncio
+import json
 import logging
 
+from app import jobs
+from app.core import config
+from app.broker import get_broker
+from app.events import EventLog, ProgressBus
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+class ClientConnection:
+    """
+    One WebSocket client with a bounded outbound queue drained by its own sender task.
+
+    A queued progress message is replaced by a newer one, since only the
+    latest progress matters. Sends that exceed send_timeout count against
+    the connection; after max_timeouts in a row, or when the queue overflows
+    with messages that cannot be merged, the client is evicted.
+    """
+
+    def __init__(self, websocket: WebSocket, job_id: str, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.job_id = job_id
+        self.manager = manager
+        self.queue: deque[tuple[str, bool]] = deque()
+        self.timeouts = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._send_loop())
+
+    def offer(self, text: str, is_progress: bool = False) -> bool:
+        """Queue a serialized message. Returns False if the client must be evicted."""
+        if is_progress:
+            merged = [item for item in self.queue if item[1]]
+            if merged:
+                self.queue = deque(item for item in self.queue if not item[1])
+                self.manager.merged += len(merged)
+        if len(self.queue) >= self.manager.queue_size:
+            return False
+        self.queue.append((text, is_progress))
+        self._ready.set()
+        return True
+
+    async def _send_loop(self):
+        while True:
+            await self._ready.wait()
+            if not self.queue:
+                self._ready.clear()
+                continue
+            text, _ = self.queue.popleft()
+            try:
+                await asyncio.wait_for(self.websocket.send_text(text), self.manager.send_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                self.manager.send_timeouts += 1
+                if self.timeouts >= self.manager.max_timeouts:
+                    await self.manager.evict(self, "send timeout")
+                    return
+                continue
+            except Exception:
+                self.manager.discard(self)
+                return
+            self.timeouts = 0
+            self.manager.sent += 1
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        """Stop sending and close the socket, without waiting on an unresponsive client."""
+        self.closed = True
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self.manager.send_timeout)
+        except Exception:
+            pass
+
+    def cancel(self):
+        self.closed = True
+        self._task.cancel()
+
+
 class ConnectionManager:
     """Manage WebSocket connections per job."""
 
-    def __init__(self):
-        self.active_connections: dict[str, Set[WebSocket]] = {}
+    def __init__(self, send_timeout: float = 5.0, queue_size: int = 32, max_timeouts: int = 3):
+        self.send_timeout = send_timeout
+        self.queue_size = queue_size
+        self.max_timeouts = max_timeouts
+        self.active_connections: dict[str, dict[WebSocket, ClientConnection]] = {}
+        self.broadcasts = 0
+        self.sent = 0
+        self.merged = 0
+        self.send_timeouts = 0
+        self.evicted = 0
 
-    async def connect(self, websocket: WebSocket, job_id: str):
-        """Accept and register a WebSocket connection."""
+    async def connect(
+        self,
+        websocket: WebSocket,
+        job_id: str,
+        replay: Callable[[], list[dict]] | None = None,
+    ) -> ClientConnection:
+        """
+        Accept and register a WebSocket connection.
+
+        Events returned by replay are queued before the connection starts
+        receiving broadcasts, with no await in between, so none are missed
+        or sent twice.
+        """
         await websocket.accept()
-        if job_id not in self.active_connections:
-            self.active_connections[job_id] = set()
-        self.active_connections[job_id].add(websocket)
+        connection = ClientConnection(websocket, job_id, self)
+        for event in replay() if replay else ():
+            connection.offer(json.dumps(event, ensure_ascii=False))
+        self.active_connections.setdefault(job_id, {})[websocket] = connection
         logger.info(f"WebSocket connected: job_id={job_id}")
+        return connection
 
     def disconnect(self, websocket: WebSocket, job_id: str):
         """Remove a WebSocket connection."""
-        if job_id in self.active_connections:
-            self.active_connections[job_id].discard(websocket)
-            if not self.active_connections[job_id]:
+        connections = self.active_connections.get(job_id)
+        if connections is not None:
+            connection = connections.pop(websocket, None)
+            if connection is not None:
+                connection.cancel()
+            if not connections:
                 del self.active_connections[job_id]
         logger.info(f"WebSocket disconnected: job_id={job_id}")
 
+    def discard(self, connection: ClientConnection):
+        """Forget a connection whose socket has failed."""
+        connections = self.active_connections.get(connection.job_id)
+        if connections is not None and connections.get(connection.websocket) is connection:
+            del connections[connection.websocket]
+            if not connections:
+                del self.active_connections[connection.job_id]
+        connection.closed = True
+
+    async def evict(self, connection: ClientConnection, reason: str):
+        """Drop a client that cannot keep up."""
+        if connection.closed:
+            return
+        self.evicted += 1
+        self.discard(connection)
+        logger.warning(f"Evicting slow WebSocket client: job_id={connection.job_id}, reason={reason}")
+        await connection.close(code=1013, reason="Client too slow")
+
     async def broadcast(self, job_id: str, data: dict):
-        """Broadcast message to all connections for a job."""
-        if job_id not in self.active_connections:
+        """
+        Broadcast message to all connections for a job.
+
+        The message is serialized once and queued on every connection; each
+        connection sends on its own task, so a slow client never delays others.
+        """
+        connections = self.active_connections.get(job_id)
+        if not connections:
             return
 
-        disconnected = set()
-        for connection in self.active_connections[job_id]:
-            try:
-                await connection.send_json(data)
-            except Exception:
-                disconnected.add(connection)
+        self.broadcasts += 1
+        text = json.dumps(data, ensure_ascii=False)
+        is_progress = data.get("type") == "progress"
+        overflowed = [
+            connection for connection in list(connections.values())
+            if not connection.offer(text, is_progress)
+        ]
+        for connection in overflowed:
+            await self.evict(connection, "send queue full")
+
+    def stats(self) -> dict:
+        """Return connection and delivery counters."""
+        return {
+            "connections": sum(len(connections) for connections in self.active_connections.values()),
+            "broadcasts": self.broadcasts,
+            "sent": self.sent,
+            "merged": self.merged,
+            "send_timeouts": self.send_timeouts,
+            "evicted": self.evicted,
+        }
+
+
+manager = ConnectionManager(
+    send_timeout=config.WS_SEND_TIMEOUT,
+    queue_size=config.WS_SEND_QUEUE_SIZE,
+    max_timeouts=config.WS_MAX_SEND_TIMEOUTS,
+)
+
 
-        for connection in disconnected:
-            self.active_connections[job_id].discard(connection)
+# Recent events per job, replayed to clients that connect late or reconnect
+event_log = EventLog(
+    max_events=config.EVENT_LOG_MAX_EVENTS,
+    max_jobs=config.EVENT_LOG_MAX_JOBS,
+)
 
 
-manager = ConnectionManager()
+def _replay(job_id: str, last_seq: int, job: jobs.JobInfo | None) -> list[dict]:
+    """
+    Return the events a client that saw up to last_seq has missed.
+
+    A last_seq beyond the job's log was issued by an earlier server process
+    or for a log since evicted, so the whole log is replayed. A finished job
+    whose log has no final event (evicted, or lost in a restart) gets one
+    built from job, its summary loaded from the job store beforehand. If the
+    job finishes after that load, its final event is in the log.
+    """
+    latest = event_log.last_seq(job_id)
+    if last_seq > latest:
+        last_seq = 0
+    events = event_log.since(job_id, last_seq)
+    if events and events[-1]["type"] != "progress":
+        return events
+
+    if job is None or job.status not in jobs.FINISHED_STATUSES:
+        return events
+    if job.status == jobs.JobStatus.COMPLETED:
+        final = {
+            "type": "completed",
+            "status": "completed",
+            "progress": 100,
+            "result": jobs.result_summary(job.result),
+        }
+    else:
+        final = {"type": "error", "status": "failed", "error": job.error}
+    return [*events, {**final, "seq": max(last_seq, latest) + 1}]
 
 
 @router.websocket("/ws/{job_id}")
-async def websocket_endpoint(websocket: WebSocket, job_id: str):
-    """WebSocket endpoint for job progress updates."""
-    await manager.connect(websocket, job_id)
+async def websocket_endpoint(websocket: WebSocket, job_id: str, last_seq: int = 0):
+    """
+    WebSocket endpoint for job progress updates.
+
+    Every message carries a per-job "seq". A client reconnecting with
+    ?last_seq=<seq> first receives the events it missed.
+    """
+    job = await jobs.get_job_async(job_id, fields=jobs.SUMMARY_FIELDS)
+    connection = await manager.connect(websocket, job_id, lambda: _replay(job_id, last_seq, job))
     try:
         while True:
             # Keep connection alive, wait for client messages
             data = await websocket.receive_text()
-            # Echo back for ping/pong
-            if data == "ping":
-                await websocket.send_text("pong")
+            # Echo back for ping/pong, through the send queue so writes never interleave
+            if data == "ping" and not connection.offer("pong"):
+                await manager.evict(connection, "send queue full")
     except WebSocketDisconnect:
         manager.disconnect(websocket, job_id)
     except Exception as e:
@@ -68,9 +254,82 @@ async def websocket_endpoint(websocket: WebSocket, job_id: str):
         manager.disconnect(websocket, job_id)
 
 
-async def send_progress(job_id: str, status: str, progress: int, message: str = ""):
-    """Send progress update to all connected clients."""
-    await manager.broadcast(job_id, {
+def _format_sse(event: dict) -> str:
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@router.get("/api/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    last_seq: int = 0,
+    last_event_id: str | None = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events stream of job progress updates.
+
+    Resumes after the Last-Event-ID header (sent by EventSource when it
+    reconnects) or the last_seq query parameter. The stream ends after the
+    completed or error event.
+    """
+    if last_event_id and last_event_id.isdigit():
+        last_seq = int(last_event_id)
+    job = await jobs.get_job_async(job_id, fields=jobs.SUMMARY_FIELDS)
+    if not event_log.last_seq(job_id) and job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        # Subscribe before replaying so nothing falls in between
+        subscriber = event_log.subscribe(job_id)
+        try:
+            seq = last_seq
+            for event in _replay(job_id, last_seq, job):
+                seq = event["seq"]
+                yield _format_sse(event)
+                if event["type"] != "progress":
+                    return
+            while not subscriber.overflowed:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), config.SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["seq"] <= seq:
+                    continue
+                seq = event["seq"]
+                yield _format_sse(event)
+                if event["type"] != "progress":
+                    return
+        finally:
+            event_log.unsubscribe(job_id, subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def deliver_event(job_id: str, data: dict, seq: int | None = None):
+    """Number an event (unless relayed with the broker's seq), record it for replay, and send it to clients."""
+    event = event_log.append(job_id, data, seq)
+    await manager.broadcast(job_id, event)
+
+
+async def _publish(job_id: str, data: dict):
+    """Deliver an event to local clients, or through the broker from a worker process."""
+    if config.RUN_MODE == "worker":
+        await asyncio.to_thread(get_broker().publish, job_id, data)
+    else:
+        await deliver_event(job_id, data)
+
+
+# Merges bursts of progress updates and delivers events from any thread
+progress_bus = ProgressBus(_publish, max_rate=config.PROGRESS_MAX_RATE)
+
+
+def publish_progress(job_id: str, status: str, progress: int, message: str = ""):
+    """Queue a progress update for connected clients. Safe to call from worker threads."""
+    progress_bus.publish(job_id, {
         "type": "progress",
         "status": status,
         "progress": progress,
@@ -78,9 +337,14 @@ async def send_progress(job_id: str, status: str, progress: int, message: str =
     })
 
 
+async def send_progress(job_id: str, status: str, progress: int, message: str = ""):
+    """Send progress update to all connected clients."""
+    publish_progress(job_id, status, progress, message)
+
+
 async def send_completed(job_id: str, result: dict):
     """Send completion message to all connected clients."""
-    await manager.broadcast(job_id, {
+    progress_bus.publish(job_id, {
         "type": "completed",
         "status": "completed",
         "progress": 100,
@@ -90,7 +354,7 @@ async def send_completed(job_id: str, result: dict):
 
 async def send_error(job_id: str, error: str):
     """Send error message to all connected clients."""
-    await manager.broadcast(job_id, {
+    progress_bus.publish(job_id, {
         "type": "error",
         "status": "failed",
         "error": error,
@@ -0,0 +1,178 @@
+"""Staged job scheduler with bounded priority queues and worker pools."""
+
+import heapq
+import asyncio
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a job cannot be admitted because the queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class StageQueue:
+    """
+    Bounded priority queue. Higher priority first, FIFO within a priority.
+
+    Unlike asyncio.PriorityQueue it can report an entry's position.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._heap: list[tuple[int, int, str, Any]] = []
+        self._counter = itertools.count()
+        self._not_empty = asyncio.Condition()
+        self._not_full = asyncio.Condition()
+        # Keep notify tasks referenced until done; the loop only holds weak references
+        self._notifies: set[asyncio.Future] = set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def full(self) -> bool:
+        return len(self._heap) >= self.maxsize
+
+    def _push(self, job_id: str, item: Any, priority: int):
+        heapq.heappush(self._heap, (-priority, next(self._counter), job_id, item))
+
+    def put_nowait(self, job_id: str, item: Any, priority: int = 0):
+        """Add an item, raising asyncio.QueueFull if the queue is full."""
+        if self.full():
+            raise asyncio.QueueFull
+        self._push(job_id, item, priority)
+        task = asyncio.ensure_future(self._notify(self._not_empty))
+        self._notifies.add(task)
+        task.add_done_callback(self._notifies.discard)
+
+    async def put(self, job_id: str, item: Any, priority: int = 0):
+        """Add an item, waiting while the queue is full."""
+        async with self._not_full:
+            await self._not_full.wait_for(lambda: not self.full())
+            self._push(job_id, item, priority)
+        await self._notify(self._not_empty)
+
+    async def get(self) -> tuple[str, Any]:
+        """Remove and return the highest-priority (job_id, item)."""
+        async with self._not_empty:
+            await self._not_empty.wait_for(lambda: bool(self._heap))
+            _, _, job_id, item = heapq.heappop(self._heap)
+        await self._notify(self._not_full)
+        return job_id, item
+
+    @staticmethod
+    async def _notify(condition: asyncio.Condition):
+        async with condition:
+            condition.notify()
+
+    def position(self, job_id: str) -> int | None:
+        """Return the 1-based position of a job in the queue, or None if absent."""
+        entry = next((e for e in self._heap if e[2] == job_id), None)
+        if entry is None:
+            return None
+        return 1 + sum(1 for e in self._heap if e[:2] < entry[:2])
+
+
+@dataclass
+class Stage:
+    name: str
+    handler: Callable[[Any], Awaitable[None]]
+    workers: int
+
+
+class Scheduler:
+    """
+    Run jobs through a fixed sequence of stages.
+
+    Each stage has its own queue and worker pool. Jobs are admitted into the
+    first stage's queue; when a worker finishes a stage the job moves to the
+    next stage's queue, waiting if that queue is full. A failing stage hands
+    the job to on_error and drops it.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        on_error: Callable[[Any, Exception], Awaitable[None]],
+        max_queued: int,
+        stage_queue_size: int,
+        retry_after: int,
+    ):
+        self.stages = stages
+        self.on_error = on_error
+        self.retry_after = retry_after
+        self.queues = [
+            StageQueue(max_queued if i == 0 else stage_queue_size)
+            for i in range(len(stages))
+        ]
+        self._workers: list[asyncio.Task] = []
+
+    def start(self):
+        """Start the worker tasks of every stage."""
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                task = asyncio.create_task(self._worker(index), name=f"{stage.name}-worker-{n}")
+                self._workers.append(task)
+        logger.info(
+            "Scheduler started: "
+            + ", ".join(f"{stage.name}={stage.workers}" for stage in self.stages)
+        )
+
+    async def stop(self):
+        """Cancel all worker tasks."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
+    def submit(self, job_id: str, item: Any, priority: int = 0):
+        """
+        Admit a job into the first stage.
+
+        Raises:
+            QueueFullError: The first stage's queue is full
+        """
+        try:
+            self.queues[0].put_nowait(job_id, (item, priority), priority)
+        except asyncio.QueueFull:
+            raise QueueFullError(self.retry_after)
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        queue = self.queues[index]
+        while True:
+            job_id, (item, priority) = await queue.get()
+            try:
+                await stage.handler(item)
+            except Exception as e:
+                logger.exception(f"Stage {stage.name} failed for job {job_id}: {e}")
+                try:
+                    await self.on_error(item, e)
+                except Exception as handler_error:
+                    # Keep the worker alive even if reporting the failure fails
+                    logger.exception(f"Error handler failed for job {job_id}: {handler_error}")
+                continue
+            if index + 1 < len(self.stages):
+                await self.queues[index + 1].put(job_id, (item, priority), priority)
+
+    def queue_position(self, job_id: str) -> dict | None:
+        """Return {"stage", "position"} if the job is waiting in a queue."""
+        for stage, queue in zip(self.stages, self.queues):
+            position = queue.position(job_id)
+            if position is not None:
+                return {"stage": stage.name, "position": position}
+        return None
+
+    def stats(self) -> dict:
+        """Return queue lengths per stage."""
+        return {
+            stage.name: {"queued": len(queue), "workers": stage.workers}
+            for stage, queue in zip(self.stages, self.queues)
+        }
@@ -0,0 +1,151 @@
+"""Single-flight coordination of duplicate in-flight work."""
+
+import os
+import asyncio
+import hashlib
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable, TypeVar
+
+try:
+    import fcntl
+except ImportError:  # Windows: flights are only deduplicated within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ProgressCallback = Callable[[int, str], None]
+
+
+class _Flight:
+    """A running call and the progress callbacks of every caller attached to it."""
+
+    def __init__(self, owner: Hashable):
+        self.owner = owner
+        self.task: asyncio.Task | None = None
+        self.subscribers: list[ProgressCallback] = []
+        self.last: tuple[int, str] | None = None
+
+    def report(self, progress: int, message: str):
+        """Fan a progress update out to every attached caller; safe to call from worker threads."""
+        self.last = (progress, message)
+        for callback in tuple(self.subscribers):
+            callback(progress, message)
+
+    def subscribe(self, callback: ProgressCallback):
+        self.subscribers.append(callback)
+        if self.last is not None:
+            # A late caller starts from the flight's current progress
+            callback(*self.last)
+
+
+@asynccontextmanager
+async def file_lock(path: str, poll_interval: float = 0.2) -> AsyncIterator[None]:
+    """
+    Hold an exclusive lock on a file, shared by every process on the node.
+
+    The lock is released by the OS if the holding process dies. Waiting
+    polls instead of blocking a thread, so it can be cancelled.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(poll_interval)
+        yield
+    finally:
+        # Closing the descriptor releases the lock
+        os.close(fd)
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time.
+
+    Callers that arrive while a call for the same key is running attach to it
+    and receive its result (or exception) instead of starting their own.
+    Progress reported by the call reaches every attached caller.
+
+    With lock_dir set, the call also holds a file lock for its key, so
+    processes sharing lock_dir run the same key one after another. The call
+    should then first check whether another process already stored the
+    result it is about to produce.
+    """
+
+    def __init__(self, lock_dir: str | None = None):
+        self.lock_dir = lock_dir
+        self._inflight: dict[Hashable, _Flight] = {}
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def is_inflight(self, key: Hashable) -> bool:
+        """Check whether a call for key is currently running."""
+        return key in self._inflight
+
+    async def run(
+        self,
+        key: Hashable,
+        fn: Callable[[ProgressCallback], Awaitable[T]],
+        progress_callback: ProgressCallback | None = None,
+        owner: Hashable = None,
+        retry_on: Callable[[BaseException], bool] | None = None,
+    ) -> tuple[T, bool]:
+        """
+        Run fn(report) for key, or attach to the call already running for it.
+
+        Args:
+            key: Identity of the work
+            fn: Function starting the work; it is passed a (progress%, message)
+                callback that reports to every attached caller
+            progress_callback: This caller's progress callback
+            owner: Credentials the caller would run fn with, e.g. its API key
+            retry_on: Predicate for errors tied to the running call's owner,
+                e.g. an invalid API key. An attached caller with a different
+                owner runs the work again instead of inheriting such an error.
+
+        Returns:
+            Tuple of (result, shared), where shared is True if this caller
+            attached to another caller's work
+        """
+        while True:
+            flight = self._inflight.get(key)
+            shared = flight is not None
+            if flight is None:
+                flight = _Flight(owner)
+                flight.task = asyncio.ensure_future(self._call(key, fn, flight.report))
+                self._inflight[key] = flight
+                flight.task.add_done_callback(lambda done, flight=flight: self._forget(key, flight))
+            else:
+                logger.info(f"Attaching to in-flight work: {key}")
+            if progress_callback is not None:
+                flight.subscribe(progress_callback)
+
+            try:
+                # Shield so a cancelled caller does not cancel work others wait on
+                return await asyncio.shield(flight.task), shared
+            except Exception as e:
+                if not (shared and retry_on is not None and flight.owner != owner and retry_on(e)):
+                    raise
+                logger.info(f"In-flight work {key} failed with its owner's credentials, retrying with own: {e}")
+            finally:
+                if progress_callback is not None:
+                    flight.subscribers.remove(progress_callback)
+
+    async def _call(
+        self, key: Hashable, fn: Callable[[ProgressCallback], Awaitable[T]], report: ProgressCallback
+    ) -> T:
+        if not self.lock_dir:
+            return await fn(report)
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+        async with file_lock(os.path.join(self.lock_dir, f"{digest}.lock")):
+            return await fn(report)
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
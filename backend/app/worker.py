@@ -0,0 +1,137 @@
+"""
+Pipeline worker process.
+
+Claims jobs from the local broker queue and runs them through the staged
+scheduler. Claimed jobs are leased: on shutdown a worker hands its
+unfinished jobs back to the queue, and the jobs of a worker that died are
+claimed again once their lease expires. Start any number of workers next to an API server running with
+RUN_MODE=api:
+
+    python -m app.worker
+"""
+
+import os
+import uuid
+import signal
+import socket
+import asyncio
+import logging
+
+# Must be set before app modules read the configuration
+os.environ.setdefault("RUN_MODE", "worker")
+
+from app import jobs  # noqa: E402
+from app.broker import Broker, get_broker  # noqa: E402
+from app.core import clients, config  # noqa: E402
+from app.jobs import FINISHED_STATUSES, JobStatus  # noqa: E402
+from app.routers import process, websocket  # noqa: E402
+from app.scheduler import Scheduler  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+async def feed_scheduler(
+    broker: Broker, scheduler: Scheduler, worker_id: str, stop: asyncio.Event, poll_interval: float
+):
+    """
+    Move jobs from the broker into the scheduler's first stage until stop is set.
+
+    Only as many jobs as the first stage has workers are held locally, so
+    waiting jobs stay in the shared queue for whichever worker frees up first.
+    """
+    first_queue, first_stage = scheduler.queues[0], scheduler.stages[0]
+    while not stop.is_set():
+        if len(first_queue) >= first_stage.workers:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        claim = await asyncio.to_thread(broker.claim, worker_id, config.BROKER_LEASE_SECONDS)
+        if claim is None:
+            await asyncio.sleep(poll_interval)
+            continue
+
+        job = await jobs.get_job_async(claim.job_id, fields=())
+        if job is None or job.status in FINISHED_STATUSES:
+            # Finished just before its worker died, or deleted
+            await asyncio.to_thread(broker.ack, claim.job_id)
+            continue
+        ctx = process.PipelineJob(claim.job_id, openai_key=claim.api_key, **claim.payload)
+        if claim.lost_leases >= config.BROKER_MAX_LOST_LEASES:
+            logger.error(f"Job {claim.job_id} lost {claim.lost_leases} workers, failing it")
+            await scheduler.on_error(ctx, RuntimeError("Interrupted: the workers running this job stopped"))
+            await asyncio.to_thread(broker.ack, claim.job_id)
+            continue
+        logger.info(f"Claimed job {claim.job_id}")
+        scheduler.submit(claim.job_id, ctx, claim.priority)
+
+
+def renew_leases(broker: Broker, worker_id: str):
+    """Acknowledge the worker's finished jobs and extend the leases of the rest."""
+    for job_id in broker.claimed(worker_id):
+        job = jobs.get_job(job_id, fields=())
+        if job is None or job.status in FINISHED_STATUSES:
+            broker.ack(job_id)
+    broker.renew(worker_id, config.BROKER_LEASE_SECONDS)
+
+
+async def keep_leases(broker: Broker, worker_id: str):
+    """Renew the worker's leases until cancelled."""
+    while True:
+        await asyncio.sleep(config.BROKER_LEASE_SECONDS / 3)
+        try:
+            await asyncio.to_thread(renew_leases, broker, worker_id)
+        except Exception as e:
+            logger.error(f"Lease renewal failed: {e}")
+
+
+def requeue_jobs(broker: Broker, worker_id: str):
+    """Hand the worker's unfinished jobs back to the queue for other workers."""
+    renew_leases(broker, worker_id)
+    # Reset the jobs before releasing them, so a worker claiming one is not overwritten
+    for job_id in broker.claimed(worker_id):
+        jobs.update_job(job_id, status=JobStatus.PENDING, progress=0, message="Queued")
+        process.storage.release(job_id)
+    requeued = broker.release(worker_id)
+    if requeued:
+        logger.info(f"Requeued {len(requeued)} unfinished jobs: {', '.join(requeued)}")
+
+
+async def main():
+    if config.RUN_MODE != "worker":
+        raise SystemExit(f"RUN_MODE must be 'worker' to run a worker, got {config.RUN_MODE!r}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    broker = get_broker()
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    websocket.progress_bus.bind(loop)
+    clients.registry.start_reaper()
+    await asyncio.to_thread(process.storage.reconcile)
+    process.scheduler.start()
+    feeder = asyncio.create_task(
+        feed_scheduler(broker, process.scheduler, worker_id, stop, config.BROKER_POLL_INTERVAL)
+    )
+    keeper = asyncio.create_task(keep_leases(broker, worker_id))
+    logger.info(f"Worker {worker_id} started")
+
+    await stop.wait()
+    logger.info(f"Worker {worker_id} stopping")
+    # Let a claim in progress finish, so it is requeued below rather than lost
+    await feeder
+    keeper.cancel()
+    await asyncio.gather(keeper, return_exceptions=True)
+    await process.scheduler.stop()
+    await asyncio.to_thread(requeue_jobs, broker, worker_id)
+    await websocket.progress_bus.close()
+    await clients.registry.close_all()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(main())
@@ -0,0 +1,39 @@
+"""Tests for silence-based chunk planning."""
+
+import pytest
+
+from app.core import audio
+
+
+def test_short_audio_is_one_chunk():
+    assert audio.plan_cut_points(30.0, [(10.0, 11.0)], 60.0) == [0.0, 30.0]
+
+
+def test_cuts_in_the_middle_of_the_latest_fitting_silence():
+    silences = [(10.0, 12.0), (40.0, 42.0), (70.0, 72.0), (130.0, 132.0)]
+    assert audio.plan_cut_points(150.0, silences, 60.0) == [0.0, 41.0, 71.0, 131.0, 150.0]
+
+
+def test_cuts_hard_at_the_budget_without_silence():
+    assert audio.plan_cut_points(130.0, [], 60.0) == [0.0, 60.0, 120.0, 130.0]
+
+
+def test_skips_silences_before_the_last_cut():
+    # The silence at 61s lies past the first budget, so the first cut is hard at 60s
+    silences = [(60.5, 61.5), (100.0, 101.0)]
+    assert audio.plan_cut_points(150.0, silences, 60.0) == [0.0, 60.0, 100.5, 150.0]
+
+
+@pytest.mark.parametrize("duration", [59.0, 60.0, 61.0, 299.0, 1000.0])
+def test_chunks_fit_the_budget(duration):
+    silences = [(t, t + 0.8) for t in range(7, int(duration), 13)]
+    cuts = audio.plan_cut_points(duration, silences, 60.0)
+    assert cuts[0] == 0.0 and cuts[-1] == duration
+    assert all(0 < end - start <= 60.0 for start, end in zip(cuts, cuts[1:]))
+
+
+def test_chunk_budget_applies_the_size_limit():
+    # 1000 bytes/s: a 45000-byte limit fits 40.5s after 10% headroom
+    assert audio.chunk_seconds_budget(60.0, 45_000, 100_000, 100.0) == pytest.approx(40.5)
+    assert audio.chunk_seconds_budget(60.0, 10**9, 100_000, 100.0) == 60.0
+    assert audio.chunk_seconds_budget(60.0, 45_000, 0, 0.0) == 60.0
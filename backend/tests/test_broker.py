@@ -0,0 +1,87 @@
+"""Tests for the shared job queue."""
+
+import os
+import stat
+
+import pytest
+
+from app.broker import Broker
+
+
+@pytest.fixture
+def broker(tmp_path):
+    return Broker(str(tmp_path / "broker.db"))
+
+
+def test_claim_returns_the_payload_and_key(broker):
+    broker.enqueue("job-1", {"url": "https://example.com"}, "sk-test", priority=1)
+    claim = broker.claim("worker-a", lease_seconds=60)
+    assert claim.job_id == "job-1"
+    assert claim.payload == {"url": "https://example.com"}
+    assert claim.api_key == "sk-test"
+    assert claim.lost_leases == 0
+    assert broker.claim("worker-b", lease_seconds=60) is None
+
+
+def test_database_is_private(broker):
+    assert stat.S_IMODE(os.stat(broker.db_path).st_mode) == 0o600
+
+
+def test_claims_follow_priority_then_order(broker):
+    broker.enqueue("low", {}, "sk", priority=0)
+    broker.enqueue("high", {}, "sk", priority=5)
+    broker.enqueue("low-2", {}, "sk", priority=0)
+    claimed = [broker.claim("worker", 60).job_id for _ in range(3)]
+    assert claimed == ["high", "low", "low-2"]
+
+
+def test_expired_lease_is_claimed_again(broker):
+    broker.enqueue("job-1", {}, "sk-test")
+    assert broker.claim("worker-a", lease_seconds=-1).lost_leases == 0
+
+    claim = broker.claim("worker-b", lease_seconds=60)
+    assert claim.job_id == "job-1"
+    assert claim.api_key == "sk-test"
+    assert claim.lost_leases == 1
+    assert broker.claimed("worker-a") == []
+    assert broker.claimed("worker-b") == ["job-1"]
+
+
+def test_renewed_lease_is_not_claimed(broker):
+    broker.enqueue("job-1", {}, "sk")
+    broker.claim("worker-a", lease_seconds=-1)
+    broker.renew("worker-a", lease_seconds=60)
+    assert broker.claim("worker-b", lease_seconds=60) is None
+
+
+def test_release_requeues_without_a_lost_lease(broker):
+    broker.enqueue("job-1", {}, "sk")
+    broker.enqueue("job-2", {}, "sk")
+    broker.claim("worker-a", 60)
+    broker.claim("worker-a", 60)
+
+    assert sorted(broker.release("worker-a")) == ["job-1", "job-2"]
+    assert broker.queued_count() == 2
+    claim = broker.claim("worker-b", 60)
+    assert claim.job_id == "job-1"
+    assert claim.lost_leases == 0
+
+
+def test_ack_removes_the_job(broker):
+    broker.enqueue("job-1", {}, "sk")
+    broker.claim("worker-a", -1)
+    broker.ack("job-1")
+    assert broker.claim("worker-b", 60) is None
+    assert broker.claimed("worker-a") == []
+
+
+def test_queue_position_skips_leased_jobs(broker):
+    for job_id in ("job-1", "job-2", "job-3"):
+        broker.enqueue(job_id, {}, "sk")
+    broker.claim("worker-a", 60)
+
+    assert broker.queued_count() == 2
+    assert broker.queue_position("job-1") is None
+    assert broker.queue_position("job-2") == 1
+    assert broker.queue_position("job-3") == 2
+    assert broker.queue_position("missing") is None
@@ -0,0 +1,127 @@
+"""Tests for the pooled OpenAI client registry."""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.clients import ClientRegistry
+
+
+class ModelsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        body = json.dumps({"object": "list", "data": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """A local keep-alive HTTP server standing in for the OpenAI API."""
+    ModelsHandler.connections = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ModelsHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{httpd.server_port}/v1")
+    yield ModelsHandler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_requests_on_one_key_reuse_client_and_connection(server):
+    registry = ClientRegistry()
+
+    async def main():
+        for _ in range(5):
+            async with registry.lease("sk-a") as client:
+                await client.models.list()
+        async with registry.lease("sk-a") as first, registry.lease("sk-a") as second:
+            assert first is second
+        await registry.close_all()
+
+    asyncio.run(main())
+    stats = registry.stats()
+    assert stats["clients_created"] == 1
+    assert stats["requests"] == 5
+    assert stats["connections_opened"] == 1
+    assert stats["connection_reuse_rate"] == pytest.approx(0.8)
+    assert server.connections == 1
+
+
+def test_keys_get_separate_clients(server):
+    registry = ClientRegistry()
+
+    async def main():
+        async with registry.lease("sk-a") as a, registry.lease("sk-b") as b:
+            assert a is not b
+            await asyncio.gather(a.models.list(), b.models.list())
+        assert registry.stats()["clients"] == 2
+        await registry.close_all()
+
+    asyncio.run(main())
+    assert registry.stats()["clients"] == 0
+    assert registry.stats()["clients_closed"] == 2
+
+
+def test_reaper_closes_idle_clients_but_not_leased_ones():
+    registry = ClientRegistry(idle_timeout=0.05)
+
+    async def main():
+        registry.start_reaper(interval=0.02)
+        async with registry.lease("sk-idle") as idle:
+            pass
+        async with registry.lease("sk-busy"):
+            await asyncio.sleep(0.2)
+            assert registry.stats()["clients"] == 1
+            assert idle.is_closed()
+        # Released clients idle again until the reaper closes them
+        await asyncio.sleep(0.2)
+        assert registry.stats()["clients"] == 0
+        await registry.close_all()
+
+    asyncio.run(main())
+    assert registry.stats()["clients_closed"] == 2
+
+
+def test_close_all_stops_reaper():
+    registry = ClientRegistry()
+
+    async def main():
+        registry.start_reaper(interval=0.01)
+        reaper = registry._reaper
+        await registry.close_all()
+        return reaper
+
+    reaper = asyncio.run(main())
+    assert reaper.cancelled()
+    assert registry._reaper is None
+
+
+def test_least_recently_used_clients_are_evicted_beyond_max():
+    registry = ClientRegistry(max_clients=2)
+
+    async def main():
+        for key in ("sk-a", "sk-b", "sk-c"):
+            async with registry.lease(key):
+                pass
+        keys = list(registry._entries)
+        await registry.close_all()
+        return keys
+
+    keys = asyncio.run(main())
+    assert keys == [ClientRegistry._key_hash("sk-b"), ClientRegistry._key_hash("sk-c")]
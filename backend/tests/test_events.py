@@ -0,0 +1,77 @@
+"""Tests for the per-job event log used for replay."""
+
+import asyncio
+
+from app.events import EventLog
+
+
+def progress(value: int) -> dict:
+    return {"type": "progress", "progress": value}
+
+
+def test_events_are_numbered_per_job():
+    log = EventLog()
+    assert log.last_seq("a") == 0
+    assert log.append("a", progress(10))["seq"] == 1
+    assert log.append("a", progress(20))["seq"] == 2
+    assert log.append("b", progress(10))["seq"] == 1
+    assert log.last_seq("a") == 2
+
+
+def test_explicit_sequence_numbers_are_kept():
+    log = EventLog()
+    log.append("a", progress(10), seq=41)
+    assert log.append("a", progress(20))["seq"] == 42
+    assert [event["seq"] for event in log.since("a", 41)] == [42]
+
+
+def test_replay_keeps_the_latest_of_consecutive_progress_events():
+    log = EventLog()
+    for value in (10, 20, 30):
+        log.append("a", progress(value))
+    log.append("a", {"type": "status", "status": "translating"})
+    for value in (60, 70):
+        log.append("a", progress(value))
+    log.append("a", {"type": "complete"})
+
+    replay = log.since("a")
+    assert [event["seq"] for event in replay] == [3, 4, 6, 7]
+    assert replay[0]["progress"] == 30 and replay[2]["progress"] == 70
+    assert [event["seq"] for event in log.since("a", 4)] == [6, 7]
+    assert log.since("a", 7) == []
+
+
+def test_log_keeps_the_latest_events():
+    log = EventLog(max_events=3)
+    for value in range(5):
+        log.append("a", {"type": "status", "step": value})
+    assert [event["seq"] for event in log.since("a")] == [3, 4, 5]
+
+
+def test_evicted_job_starts_numbering_again():
+    log = EventLog(max_jobs=2)
+    log.append("a", progress(10))
+    log.append("a", progress(20))
+    log.append("b", progress(10))
+    log.append("c", progress(10))
+
+    assert log.since("a") == []
+    assert log.last_seq("a") == 0
+    assert log.append("a", progress(30))["seq"] == 1
+    # Appending to "a" again evicted "b", the least recently active job
+    assert log.since("b") == []
+    assert log.last_seq("c") == 1
+
+
+def test_subscriber_overflow_unsubscribes():
+    async def main():
+        log = EventLog(subscriber_queue_size=2)
+        subscriber = log.subscribe("a")
+        for value in range(3):
+            log.append("a", progress(value))
+        assert subscriber.overflowed
+        assert subscriber.queue.qsize() == 2
+        log.append("a", progress(99))
+        assert subscriber.queue.qsize() == 2
+
+    asyncio.run(main())
@@ -0,0 +1,272 @@
+"""Tests for the shared OpenAI rate limiter and retry loop."""
+
+import asyncio
+import json
+
+import httpx
+import openai
+import pytest
+
+from app.core import ratelimit
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiters", {})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the delays the limiter and retry loop wait for, advancing a fake clock instead of waiting."""
+    clock = FakeClock()
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        wake = clock.now + delay
+        await real_sleep(0)
+        clock.now = max(clock.now, wake)
+
+    monkeypatch.setattr(ratelimit, "time", clock)
+    monkeypatch.setattr(ratelimit.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+def make_client(handler) -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://openai.test/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def completion(headers: dict | None = None) -> httpx.Response:
+    body = {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}
+        ],
+    }
+    return httpx.Response(200, json=body, headers=headers or {})
+
+
+def rate_limited(headers: dict) -> httpx.Response:
+    error = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+    return httpx.Response(429, content=json.dumps(error), headers={"content-type": "application/json", **headers})
+
+
+def create(client: openai.AsyncOpenAI):
+    return lambda: client.chat.completions.with_raw_response.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}]
+    )
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("6m0s", 360.0), ("1.5s", 1.5), ("20ms", 0.02), ("1h2m", 3720.0), ("7", 7.0), ("soon", None), (None, None)],
+)
+def test_parse_reset_duration(value, seconds):
+    assert ratelimit.parse_reset_duration(value) == seconds
+
+
+def test_retry_after_429_pauses_every_caller_of_the_key(sleeps):
+    responses = [rate_limited({"retry-after": "2"}), completion()]
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return responses.pop(0)
+
+    async def main():
+        client = make_client(handler)
+        return await ratelimit.call_with_retry("key", create(client), base_delay=0.001)
+
+    response = asyncio.run(main())
+    assert response.http_response.status_code == 200
+    assert len(requests) == 2
+    assert sleeps == [2.0]
+    assert ratelimit.get_limiter("key").stats()["throttled"] == 1
+    # The pause is held by the key's shared limiter, from the 429 until Retry-After passed
+    assert ratelimit.get_limiter("key").paused_until == pytest.approx(1002.0)
+
+
+def test_pause_delays_other_callers(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    limiter = ratelimit.get_limiter("key")
+    limiter.pause(5.0)
+    clock.now += 2.0
+    assert ratelimit.get_limiter("key").reserve() == pytest.approx(3.0)
+    clock.now += 3.0
+    assert limiter.reserve() == 0.0
+
+
+def test_retry_after_ms_takes_precedence(sleeps):
+    responses = [rate_limited({"retry-after-ms": "250", "retry-after": "9"}), completion()]
+
+    async def main():
+        client = make_client(lambda request: responses.pop(0))
+        await ratelimit.call_with_retry("key", create(client), base_delay=0.001)
+
+    asyncio.run(main())
+    assert sleeps == [0.25]
+
+
+def test_backoff_without_retry_after_is_capped_exponential(sleeps, monkeypatch):
+    # Full jitter picks uniformly below the cap; take the cap itself
+    monkeypatch.setattr(ratelimit.random, "uniform", lambda low, high: high)
+    statuses = [500, 502, 503, 200]
+
+    def handler(request):
+        status = statuses.pop(0)
+        return completion() if status == 200 else httpx.Response(status, json={"error": {"message": "down"}})
+
+    async def main():
+        client = make_client(handler)
+        return await ratelimit.call_with_retry("key", create(client), base_delay=1.0, max_delay=3.0)
+
+    response = asyncio.run(main())
+    assert response.http_response.status_code == 200
+    assert sleeps == [1.0, 2.0, 3.0]
+    # Server errors back off without pausing the key
+    assert ratelimit.get_limiter("key").stats()["throttled"] == 0
+
+
+def test_gives_up_after_max_retries(sleeps):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return rate_limited({"retry-after": "1"})
+
+    async def main():
+        client = make_client(handler)
+        await ratelimit.call_with_retry("key", create(client), max_retries=2, base_delay=0.001)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(main())
+    assert len(calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried(sleeps):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": {"message": "bad request"}})
+
+    async def main():
+        client = make_client(handler)
+        await ratelimit.call_with_retry("key", create(client))
+
+    with pytest.raises(openai.BadRequestError):
+        asyncio.run(main())
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_exhausted_quota_is_not_retried(sleeps):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        error = {"error": {"message": "Quota exceeded", "type": "insufficient_quota", "code": "insufficient_quota"}}
+        return httpx.Response(429, json=error, headers={"retry-after": "1"})
+
+    async def main():
+        client = make_client(handler)
+        await ratelimit.call_with_retry("key", create(client), base_delay=0.001)
+
+    with pytest.raises(openai.RateLimitError):
+        asyncio.run(main())
+    assert len(calls) == 1
+    assert sleeps == []
+    # Other jobs on the key are not paused either
+    assert ratelimit.get_limiter("key").stats()["throttled"] == 0
+    assert ratelimit.get_limiter("key").reserve() == 0.0
+
+
+def test_headers_adapt_request_limit(sleeps):
+    headers = {
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-limit-tokens": "1000",
+        "x-ratelimit-remaining-tokens": "1000",
+    }
+
+    async def main():
+        client = make_client(lambda request: completion(headers))
+        await ratelimit.call_with_retry("key", create(client))
+
+    asyncio.run(main())
+    limiter = ratelimit.get_limiter("key")
+    assert limiter.stats()["requests_per_minute"] == 60
+    assert limiter.stats()["tokens_per_minute"] == 1000
+    # No requests left: the next one waits about one refill interval (1s at 60/min)
+    assert limiter.reserve() == pytest.approx(1.0)
+
+
+def test_concurrent_callers_are_paced_by_request_limit(sleeps):
+    limiter = ratelimit.get_limiter("key")
+    limiter.requests = ratelimit.TokenBucket(3)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return completion()
+
+    async def main():
+        client = make_client(handler)
+        await asyncio.gather(*(ratelimit.call_with_retry("key", create(client)) for _ in range(6)))
+
+    asyncio.run(main())
+    assert len(calls) == 6
+    # Three requests fit the bucket; the rest are spaced 20s apart (3 per minute)
+    assert len(sleeps) == 3
+    assert sleeps == pytest.approx([20.0, 40.0, 60.0])
+
+
+def test_token_budget_delays_large_requests():
+    limiter = ratelimit.RateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+    assert limiter.reserve(tokens=600) == 0.0
+    # 300 tokens over budget at 10 tokens/s
+    assert limiter.reserve(tokens=300) == pytest.approx(30.0, abs=0.1)
+
+
+def test_limiters_are_shared_per_key():
+    assert ratelimit.get_limiter("a") is ratelimit.get_limiter("a")
+    assert ratelimit.get_limiter("a") is not ratelimit.get_limiter("b")
+    assert ratelimit.stats()["keys"] == 2
+
+
+def test_is_key_error_looks_through_wrapping():
+    request = httpx.Request("POST", "http://openai.test/v1/audio/transcriptions")
+    quota = openai.RateLimitError(
+        "quota", response=httpx.Response(429, request=request), body={"code": "insufficient_quota"}
+    )
+    busy = openai.RateLimitError(
+        "busy", response=httpx.Response(429, request=request), body={"code": "rate_limit_exceeded"}
+    )
+    try:
+        try:
+            raise quota
+        except Exception as e:
+            raise ValueError(f"Transcription failed: {e}")
+    except ValueError as wrapped:
+        assert ratelimit.is_key_error(wrapped)
+    assert not ratelimit.is_key_error(busy)
+    assert ratelimit.is_key_error(openai.AuthenticationError("bad", response=httpx.Response(401, request=request), body=None))
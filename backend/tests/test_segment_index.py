@@ -0,0 +1,80 @@
+"""Tests for the time-range segment index."""
+
+import random
+
+import pytest
+
+from app.core.segment_index import SegmentIndex
+
+
+def make_segments(rng: random.Random, count: int, duration: float = 600.0) -> list[dict]:
+    segments = []
+    for i in range(count):
+        start = rng.uniform(0, duration)
+        # Mostly short cues, with the occasional one spanning much of the video
+        length = rng.uniform(0.5, 5.0) if rng.random() < 0.95 else rng.uniform(60, duration)
+        segments.append({"start": start, "end": start + length, "text": f"line {i}"})
+    return segments
+
+
+def overlapping(index: SegmentIndex, start: float, end: float) -> list[int]:
+    """Positions of the segments overlapping [start, end), by brute force."""
+    return [
+        position for position, segment in enumerate(index.segments)
+        if segment["start"] < end and segment["end"] > start
+    ]
+
+
+def collect(index: SegmentIndex, start: float, end: float, limit: int) -> list[int]:
+    """Page through a query with its cursor and return every position found."""
+    positions, cursor = [], 0
+    while cursor is not None:
+        found, cursor = index.query(start, end, limit, cursor)
+        assert len(found) <= limit
+        positions += [position for position, _ in found]
+    return positions
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 7, 64, 300])
+def test_query_matches_brute_force(count):
+    rng = random.Random(count)
+    index = SegmentIndex(make_segments(rng, count))
+    for _ in range(50):
+        start = rng.uniform(-10, 620)
+        end = start + rng.uniform(0, 120)
+        found, cursor = index.query(start, end, limit=10_000)
+        assert [position for position, _ in found] == overlapping(index, start, end)
+        assert cursor is None
+
+
+def test_paging_returns_every_match_once():
+    rng = random.Random(42)
+    index = SegmentIndex(make_segments(rng, 500))
+    for limit in (1, 3, 25):
+        assert collect(index, 100.0, 250.0, limit) == overlapping(index, 100.0, 250.0)
+
+
+def test_segments_are_sorted_by_start():
+    index = SegmentIndex([
+        {"start": 5.0, "end": 6.0, "text": "b"},
+        {"start": 1.0, "end": 2.0, "text": "a"},
+    ])
+    assert [segment["text"] for segment in index.segments] == ["a", "b"]
+
+
+def test_window_bounds_are_half_open():
+    index = SegmentIndex([
+        {"start": 0.0, "end": 1.0, "text": "ends at start"},
+        {"start": 1.0, "end": 2.0, "text": "inside"},
+        {"start": 2.0, "end": 3.0, "text": "starts at end"},
+    ])
+    found, _ = index.query(1.0, 2.0)
+    assert [segment["text"] for _, segment in found] == ["inside"]
+
+
+def test_long_cue_is_found_from_any_window():
+    segments = [{"start": 0.0, "end": 1000.0, "text": "long"}]
+    segments += [{"start": float(t), "end": t + 0.5, "text": f"short {t}"} for t in range(1, 1000)]
+    index = SegmentIndex(segments)
+    found, _ = index.query(900.6, 900.8)
+    assert [segment["text"] for _, segment in found] == ["long"]
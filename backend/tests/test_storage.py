@@ -0,0 +1,98 @@
+"""Tests for the storage index and its quota eviction."""
+
+import os
+
+import pytest
+
+from app.core.storage import StorageManager
+
+PARAMS = {"profile": "speech"}
+
+
+@pytest.fixture
+def root(tmp_path):
+    return tmp_path / "storage"
+
+
+def make_storage(root, quota_bytes: int = 0) -> StorageManager:
+    return StorageManager(str(root), str(root / "_cache" / "storage.db"), quota_bytes=quota_bytes)
+
+
+def write(root, video_id: str, name: str, size: int) -> str:
+    directory = root / video_id
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def test_acquire_reuses_matching_artifacts(root):
+    storage = make_storage(root)
+    path = write(root, "vid", "audio.opus", 10)
+    storage.register("job-1", "vid", "audio", PARAMS, path, meta={"duration": 3.0})
+
+    artifact = storage.acquire("job-2", "vid", "audio", PARAMS)
+    assert artifact.path == path
+    assert artifact.size == 10
+    assert artifact.meta == {"duration": 3.0}
+    assert storage.acquire("job-2", "vid", "audio", {"profile": "mp3"}) is None
+    assert storage.acquire("job-2", "other", "audio", PARAMS) is None
+    assert (storage.hits, storage.misses) == (1, 2)
+
+
+def test_acquire_drops_missing_files(root):
+    storage = make_storage(root)
+    path = write(root, "vid", "audio.opus", 10)
+    storage.register("job-1", "vid", "audio", PARAMS, path)
+    os.remove(path)
+
+    assert storage.acquire("job-2", "vid", "audio", PARAMS) is None
+    assert storage.stats()["files"] == 0
+
+
+def test_eviction_skips_pinned_files(root):
+    storage = make_storage(root, quota_bytes=25)
+    first = write(root, "a", "audio.opus", 10)
+    storage.register("job-1", "a", "audio", PARAMS, first)
+    second = write(root, "b", "audio.opus", 10)
+    storage.register("job-2", "b", "audio", PARAMS, second)
+    storage.release("job-2")
+
+    # The least recently used file is still pinned by job-1, so the next one goes
+    third = write(root, "c", "audio.opus", 10)
+    storage.register("job-3", "c", "audio", PARAMS, third)
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert not os.path.exists(root / "b")
+    assert storage.evicted == 1
+
+
+def test_pinned_files_may_exceed_the_quota(root):
+    storage = make_storage(root, quota_bytes=15)
+    first = write(root, "a", "audio.opus", 10)
+    storage.register("job-1", "a", "audio", PARAMS, first)
+    second = write(root, "b", "audio.opus", 10)
+    storage.register("job-1", "b", "audio", PARAMS, second)
+    assert storage.stats()["bytes"] == 20
+
+    storage.release("job-1")
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+    assert storage.stats()["bytes"] == 10
+
+
+def test_acquire_pins_and_refreshes(root):
+    storage = make_storage(root, quota_bytes=25)
+    first = write(root, "a", "audio.opus", 10)
+    storage.register("job-1", "a", "audio", PARAMS, first)
+    second = write(root, "b", "audio.opus", 10)
+    storage.register("job-1", "b", "audio", PARAMS, second)
+    storage.release("job-1")
+
+    # Reusing the older file makes the newer one the least recently used
+    storage.acquire("job-2", "a", "audio", PARAMS)
+    storage.release("job-2")
+    third = write(root, "c", "audio.opus", 10)
+    storage.register("job-3", "c", "audio", PARAMS, third)
+    assert os.path.exists(first)
+    assert not os.path.exists(second)
@@ -0,0 +1,168 @@
+"""Tests for translation chunking and batch retries."""
+
+import asyncio
+
+import pytest
+
+from app.core import translator
+
+
+def segment(start: float, end: float, text: str, speaker: int = 1) -> dict:
+    return {"start": start, "end": end, "text": text, "speaker_id": speaker}
+
+
+def chunk_texts(segments: list[dict], **kwargs) -> list[str]:
+    chunks = translator._create_translation_chunks({"segments": segments}, **kwargs)
+    return [chunk["source_text"] for chunk in chunks]
+
+
+def test_no_segments_make_no_chunks():
+    assert translator._create_translation_chunks({"segments": []}) == []
+    assert translator._create_translation_chunks({}) == []
+
+
+def test_speaker_change_starts_a_chunk():
+    segments = [segment(0, 1, "aaaa"), segment(1, 2, "bbbb"), segment(2, 3, "cccc", speaker=2)]
+    chunks = translator._create_translation_chunks({"segments": segments})
+    assert [chunk["source_text"] for chunk in chunks] == ["1: aaaa bbbb", "2: cccc"]
+    assert (chunks[0]["start_time"], chunks[0]["end_time"]) == (0, 2)
+    assert (chunks[1]["start_time"], chunks[1]["end_time"]) == (2, 3)
+
+
+def test_token_limit_starts_a_chunk():
+    # Two tokens per segment, no sentence ends or pauses
+    segments = [segment(i, i + 1, "aaaa bbbb") for i in range(5)]
+    assert chunk_texts(segments, max_chunk_tokens=4) == [
+        "1: aaaa bbbb aaaa bbbb", "1: aaaa bbbb aaaa bbbb", "1: aaaa bbbb",
+    ]
+
+
+def test_filled_chunk_closes_at_a_sentence_end():
+    segments = [segment(0, 1, "aaaa bbbb cccc dddd"), segment(1, 2, "eeee ffff."), segment(2, 3, "gggg")]
+    assert chunk_texts(segments, max_chunk_tokens=10) == ["1: aaaa bbbb cccc dddd eeee ffff.", "1: gggg"]
+
+
+def test_sentence_end_before_min_fill_does_not_close():
+    segments = [segment(0, 1, "aaaa."), segment(1, 2, "bbbb.")]
+    assert chunk_texts(segments, max_chunk_tokens=10) == ["1: aaaa. bbbb."]
+
+
+def test_filled_chunk_closes_at_a_pause():
+    segments = [segment(0, 2, "aaaa bbbb cccc dddd"), segment(2, 4, "eeee ffff gggg"), segment(5.5, 6, "hhhh")]
+    assert chunk_texts(segments, max_chunk_tokens=10) == ["1: aaaa bbbb cccc dddd eeee ffff gggg", "1: hhhh"]
+    assert chunk_texts(segments, max_chunk_tokens=10, pause_threshold=2.0) == [
+        "1: aaaa bbbb cccc dddd eeee ffff gggg hhhh"
+    ]
+
+
+def make_chunks(count: int) -> list[dict]:
+    return [
+        {"source_text": f"1: line {i}", "start_time": float(i), "end_time": i + 1.0}
+        for i in range(count)
+    ]
+
+
+class FakeMemory:
+    """Translation memory session with a fixed set of cached translations."""
+
+    def __init__(self, cached: dict[str, str] | None = None):
+        self.cached = cached or {}
+        self.stored = []
+
+    async def get_many(self, source_texts, target_language, model):
+        return [self.cached.get(text) for text in source_texts]
+
+    async def put_many(self, entries, target_language, model):
+        self.stored += entries
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Fake the API: the batch request returns the response under test, single requests echo their chunk."""
+    calls = {"batch": [], "single": [], "response": {}, "fail": set()}
+
+    async def request_batch_translation(client, messages):
+        calls["batch"].append(messages)
+        if isinstance(calls["response"], Exception):
+            raise calls["response"]
+        return calls["response"], 30
+
+    async def request_translation(client, messages):
+        source_text = messages[-1]["content"]
+        calls["single"].append(source_text)
+        if source_text in calls["fail"]:
+            raise RuntimeError("boom")
+        return f"single {source_text}", 7
+
+    monkeypatch.setattr(translator, "_request_batch_translation", request_batch_translation)
+    monkeypatch.setattr(translator, "_request_translation", request_translation)
+    return calls
+
+
+def translate(chunks, indices, memory=None) -> dict[int, dict]:
+    return asyncio.run(translator._translate_batch(None, chunks, indices, "Korean", 0, memory))
+
+
+def test_batch_response_is_used(api):
+    chunks = make_chunks(3)
+    api["response"] = {"translations": {"0": "zero", "1": "one", "2": " two "}}
+    memory = FakeMemory()
+    results = translate(chunks, [0, 1, 2], memory)
+
+    assert [results[i]["translated_text"] for i in range(3)] == ["zero", "one", "two"]
+    assert results[1]["start"] == 1.0 and results[1]["source_text"] == "1: line 1"
+    assert len(api["batch"]) == 1 and api["single"] == []
+    assert memory.stored == [("1: line 0", "zero", 10), ("1: line 1", "one", 10), ("1: line 2", "two", 10)]
+
+
+def test_missing_and_malformed_chunks_are_retried_alone(api):
+    chunks = make_chunks(4)
+    api["response"] = {"translations": {"0": "zero", "1": "", "2": ["two"]}}
+    results = translate(chunks, [0, 1, 2, 3])
+
+    assert results[0]["translated_text"] == "zero"
+    assert api["single"] == ["1: line 1", "1: line 2", "1: line 3"]
+    assert [results[i]["translated_text"] for i in (1, 2, 3)] == [
+        "single 1: line 1", "single 1: line 2", "single 1: line 3",
+    ]
+
+
+@pytest.mark.parametrize("response", [["not", "an", "object"], {"chunks": {}}, RuntimeError("bad json")])
+def test_unusable_batch_response_retries_every_chunk(api, response):
+    chunks = make_chunks(2)
+    api["response"] = response
+    results = translate(chunks, [0, 1])
+    assert api["single"] == ["1: line 0", "1: line 1"]
+    assert results[1]["translated_text"] == "single 1: line 1"
+
+
+def test_failed_retry_keeps_the_source_text(api):
+    chunks = make_chunks(2)
+    api["fail"] = {"1: line 1"}
+    memory = FakeMemory()
+    results = translate(chunks, [0, 1], memory)
+
+    assert results[0]["translated_text"] == "single 1: line 0"
+    assert results[1]["translated_text"] == "[Translation failed] 1: line 1"
+    assert memory.stored == [("1: line 0", "single 1: line 0", 7)]
+
+
+def test_cached_chunks_are_left_out_of_the_request(api):
+    chunks = make_chunks(3)
+    api["response"] = {"translations": {"0": "zero", "2": "two"}}
+    memory = FakeMemory({"1: line 1": "cached one"})
+    results = translate(chunks, [0, 1, 2], memory)
+
+    assert results[1]["translated_text"] == "cached one"
+    assert '"1"' not in api["batch"][0][-1]["content"]
+    assert [text for text, _, _ in memory.stored] == ["1: line 0", "1: line 2"]
+
+
+def test_single_pending_chunk_skips_the_batch_request(api):
+    chunks = make_chunks(2)
+    memory = FakeMemory({"1: line 0": "cached zero"})
+    results = translate(chunks, [0, 1], memory)
+
+    assert api["batch"] == []
+    assert api["single"] == ["1: line 1"]
+    assert results[0]["translated_text"] == "cached zero"
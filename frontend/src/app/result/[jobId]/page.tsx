@@ -40,7 +40,7 @@ export default function ResultPage() {
   useEffect(() => {
     async function loadJob() {
       try {
-        const data = await getJobStatus(jobId);
+        const data = await getJobStatus(jobId, ['source_segments', 'translated_segments']);
         setJob(data);
 
         // Extract segments from job result
@@ -5,6 +5,7 @@ import { createWebSocket } from '@/lib/api';
 
 export interface ProgressMessage {
   type: 'progress' | 'completed' | 'error';
+  seq: number;
   status: string;
   progress: number;
   message?: string;
@@ -19,13 +20,15 @@ export interface ProgressMessage {
 
 export function useWebSocket(jobId: string | null) {
   const wsRef = useRef<WebSocket | null>(null);
+  // Last event received, so a reconnect only replays what was missed
+  const lastSeqRef = useRef(0);
   const [isConnected, setIsConnected] = useState(false);
   const [lastMessage, setLastMessage] = useState<ProgressMessage | null>(null);
 
   const connect = useCallback(() => {
     if (!jobId || wsRef.current) return;
 
-    const ws = createWebSocket(jobId);
+    const ws = createWebSocket(jobId, lastSeqRef.current);
 
     ws.onopen = () => {
       setIsConnected(true);
@@ -35,6 +38,8 @@ export function useWebSocket(jobId: string | null) {
     ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data) as ProgressMessage;
+        // Events arrive in order; after a server restart numbering may start over
+        lastSeqRef.current = data.seq ?? lastSeqRef.current;
         setLastMessage(data);
       } catch (e) {
         console.error('Failed to parse WebSocket message:', e);
@@ -62,6 +67,7 @@ export function useWebSocket(jobId: string | null) {
   }, []);
 
   useEffect(() => {
+    lastSeqRef.current = 0;
     if (jobId) {
       connect();
     }
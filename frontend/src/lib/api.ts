@@ -4,9 +4,15 @@ const WS_URL = process.env.NEXT_PUBLIC_WS_URL || 'ws://localhost:8000';
 export interface ProcessRequest {
   youtube_url: string;
   target_language: string;
+  target_languages?: string[];
   srt_type: 'source' | 'translated' | 'both';
   max_line_length?: number;
   pause_threshold?: number;
+  priority?: number;
+  // Clip window in seconds; only this part of the video is processed
+  start?: number;
+  end?: number;
+  clip_timestamps?: 'relative' | 'absolute';
 }
 
 export interface SubtitleSegment {
@@ -20,6 +26,7 @@ export interface JobResult {
   source_language?: string;
   has_source_srt?: boolean;
   has_translated_srt?: boolean;
+  translated_languages?: string[];
   source_segments?: SubtitleSegment[];
   translated_segments?: SubtitleSegment[];
 }
@@ -28,12 +35,14 @@ export interface JobStatus {
   id: string;
   youtube_url: string;
   target_language: string;
+  target_languages: string[];
   srt_type: string;
   status: string;
   progress: number;
   message: string;
   error: string | null;
   result: JobResult;
+  queue: { stage: string; position: number } | null;
   created_at: string;
   updated_at: string;
 }
@@ -64,8 +73,11 @@ export async function startProcessing(
   return response.json();
 }
 
-export async function getJobStatus(jobId: string): Promise<JobStatus> {
-  const response = await fetch(`${API_URL}/api/jobs/${jobId}`);
+export async function getJobStatus(jobId: string, fields: string[] = []): Promise<JobStatus> {
+  // The result only has summary fields unless heavier ones are requested
+  const query = fields.length ? `?fields=${fields.join(',')}` : '';
+  // Revalidate with the ETag so unchanged status polls return 304
+  const response = await fetch(`${API_URL}/api/jobs/${jobId}${query}`, { cache: 'no-cache' });
 
   if (!response.ok) {
     throw new Error('Failed to get job status');
@@ -84,10 +96,39 @@ export async function getLanguages(): Promise<{ languages: Language[] }> {
   return response.json();
 }
 
+export interface SegmentPage {
+  track: string;
+  total: number;
+  segments: (SubtitleSegment & { index: number })[];
+  next_cursor: string | null;
+}
+
+export async function getSegments(
+  jobId: string,
+  params: { track?: string; start?: number; end?: number; limit?: number; cursor?: string }
+): Promise<SegmentPage> {
+  const query = new URLSearchParams(
+    Object.entries(params)
+      .filter(([, value]) => value !== undefined)
+      .map(([key, value]) => [key, String(value)])
+  );
+  const response = await fetch(`${API_URL}/api/jobs/${jobId}/segments?${query}`, { cache: 'no-cache' });
+
+  if (!response.ok) {
+    throw new Error('Failed to get segments');
+  }
+
+  return response.json();
+}
+
 export function getDownloadUrl(jobId: string, fileType: string): string {
   return `${API_URL}/api/jobs/${jobId}/download/${fileType}`;
 }
 
-export function createWebSocket(jobId: string): WebSocket {
-  return new WebSocket(`${WS_URL}/ws/${jobId}`);
+export function getSubtitlesUrl(jobId: string, track: string, format: 'srt' | 'vtt' | 'jsonl' = 'srt'): string {
+  return `${API_URL}/api/jobs/${jobId}/subtitles/${track}?format=${format}`;
+}
+
+export function createWebSocket(jobId: string, lastSeq = 0): WebSocket {
+  return new WebSocket(`${WS_URL}/ws/${jobId}?last_seq=${lastSeq}`);
 }